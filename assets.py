@@ -0,0 +1,99 @@
+"""
+Static assets for CUR8tr - fingerprinted URLs, immutable caching, precompressed files
+
+`python build_assets.py` copies static/ into static/dist/ under
+content-hashed names and writes a manifest. When the manifest exists, a
+url_defaults hook rewrites static URLs, so plain url_for calls in templates
+and code return the hashed file. For example,
+url_for('static', filename='css/layout.css') returns
+/static/dist/css/layout.<hash>.css.
+
+A hashed URL changes whenever its content does, so those files are served
+with a one-year `immutable` Cache-Control. When the client accepts brotli or
+gzip, the prebuilt .br/.gz sibling is served instead of compressing on each
+request.
+
+Without a manifest, or with the app in debug mode, the plain files are served
+exactly as before, so edits show up without a rebuild.
+
+Category icons come from one sprite (svg/category-icons.svg, also generated
+by build_assets.py). Templates reference an icon with
+`<use href="{{ category_icon_url(name) }}">`.
+"""
+
+import os
+import json
+import mimetypes
+from flask import request, url_for, send_from_directory
+from compression import choose_encoding
+
+DIST_DIR = "dist"
+MANIFEST_FILE = "manifest.json"
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Category name -> icon in static/svg (and symbol id in the sprite)
+CATEGORY_ICONS = {
+    'Apps': 'apps',
+    'Books': 'books',
+    'Festivals': 'festivals',
+    'Food': 'food',
+    'Products': 'products',
+    'Where To Stay': 'stay',
+    'YouTube Channels': 'youtube',
+}
+DEFAULT_CATEGORY_ICON = 'default'
+CATEGORY_SPRITE = 'svg/category-icons.svg'
+
+
+def load_manifest(static_folder):
+    """Plain path -> fingerprinted path, or {} when the assets haven't been built"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as manifest:
+        return json.load(manifest)
+
+
+def category_icon_url(category_name):
+    """Sprite URL with the fragment for a category's icon, for <use href>"""
+    icon = CATEGORY_ICONS.get(category_name, DEFAULT_CATEGORY_ICON)
+    return f"{url_for('static', filename=CATEGORY_SPRITE)}#{icon}"
+
+
+def init_assets(app):
+    """Fingerprint static URLs from the build manifest and serve built files for long-term caching"""
+    manifest = load_manifest(app.static_folder)
+    serve_plain = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and manifest and not app.debug:
+            values['filename'] = manifest.get(values.get('filename'), values.get('filename'))
+
+    def static(filename):
+        if not filename.startswith(DIST_DIR + "/"):
+            return serve_plain(filename=filename)
+
+        response = None
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding:
+            sibling = filename + PRECOMPRESSED_SUFFIXES[encoding]
+            if os.path.isfile(os.path.join(app.static_folder, sibling)):
+                response = send_from_directory(app.static_folder, sibling,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+        if response is None:
+            response = serve_plain(filename=filename)
+
+        response.vary.add('Accept-Encoding')
+        if response.status_code in (200, 304):
+            # The name changes with the content, so this URL's bytes never do
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+    app.jinja_env.globals['category_icon_url'] = category_icon_url
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start cost of `import app` (what Vercel pays on every new instance).
+
+Each run starts a fresh interpreter with `-X importtime`, imports the app in
+lazy-init mode against a throwaway SQLite file and reports wall time plus the
+slowest imports by cumulative time. It fails (exit code 1) when:
+
+- a module that should be deferred to first use (PIL, qrcode, smtplib,
+  alembic) is imported at startup, or
+- the median import time exceeds --budget-ms.
+
+Usage: python bench_cold_start.py [--runs 5] [--top 15] [--budget-ms 1500] [--eager]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Top-level packages that must not load before the first request that needs them
+DEFERRED_MODULES = ("PIL", "qrcode", "smtplib", "alembic", "flask_migrate")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+PROBE = (
+    "import time; started = time.perf_counter(); import app; "
+    "print(f'IMPORT_MS {(time.perf_counter() - started) * 1000:.1f}')"
+)
+
+
+def measure_import(lazy=True):
+    """
+    Import the app once in a fresh interpreter
+
+    Returns:
+        Tuple of (wall_ms, imports) where imports is a list of
+        (module, self_us, cumulative_us, depth) in import order
+    """
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": "sqlite:///" + os.path.join(workdir, "cold_start.db"),
+        "SLOW_QUERY_LOG_FILE": os.path.join(workdir, "slow_queries.log"),
+        "LAZY_INIT": "1" if lazy else "0",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    env.pop("FLASK_RUN_FROM_CLI", None)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    )
+
+    wall_ms = float(re.search(r"IMPORT_MS ([\d.]+)", result.stdout).group(1))
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return wall_ms, imports
+
+
+def deferred_imports(imports):
+    """Deferred modules (or their submodules) that were imported anyway"""
+    return sorted({
+        module for module, _, _, _ in imports
+        if module.split(".")[0] in DEFERRED_MODULES
+    })
+
+
+def report(runs, top, budget_ms, lazy):
+    wall_times = []
+    imports = []
+    for _ in range(runs):
+        wall_ms, imports = measure_import(lazy)
+        wall_times.append(wall_ms)
+
+    median_ms = statistics.median(wall_times)
+    mode = "lazy" if lazy else "eager"
+    print(f"import app ({mode}, {runs} runs): median {median_ms:.1f} ms   "
+          f"min {min(wall_times):.1f} ms   max {max(wall_times):.1f} ms   "
+          f"{len(imports)} modules")
+
+    print(f"\nSlowest top-level imports (last run, cumulative):")
+    first_level = [entry for entry in imports if entry[3] <= 1]
+    for module, self_us, cumulative_us, depth in sorted(first_level, key=lambda e: -e[2])[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{module}")
+
+    failures = []
+    leaked = deferred_imports(imports)
+    if leaked and lazy:
+        failures.append(f"deferred modules imported at startup: {', '.join(leaked)}")
+    if budget_ms and median_ms > budget_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds budget {budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--eager", action="store_true", help="Measure with LAZY_INIT=0 for comparison")
+    args = parser.parse_args()
+
+    ok = report(args.runs, args.top, args.budget_ms, lazy=not args.eager)
+    sys.exit(0 if ok else 1)
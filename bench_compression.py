@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark gzip levels and brotli qualities on CUR8tr's real rendered pages.
+
+Seeds a throwaway SQLite database with one curator (a few categories full of
+recommendations, likes and comments), renders the public pages through the
+test client uncompressed, adds the big stylesheets, then compresses each body
+with every level. Reports milliseconds per response (the CPU a request pays)
+and the compressed size as a share of the original.
+
+Usage: python bench_compression.py [--repeat 20] [--recs 12]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_compression.db")
+os.environ.setdefault("SLOW_QUERY_LOG_FILE", os.devnull)
+os.environ["COMPRESSION"] = "0"  # Render identity bodies; the encoders are timed directly
+
+from app import app, db
+from models import User, Profile, Category, Recommendation, Like, Comment
+from compression import GzipEncoder, BrotliEncoder
+
+LEVELS = [("gzip", GzipEncoder, level) for level in (1, 4, 6, 9)] + \
+         [("br", BrotliEncoder, quality) for quality in (1, 4, 5, 6, 9, 11)]
+
+STYLESHEETS = ("css/layout.css", "css/neo.css", "css/header.css")
+
+
+def seed(recs_per_category):
+    """Returns the pages to render as (label, path)"""
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        curator = User(username="curator", email="curator@example.com", password_hash="x", is_verified=True)
+        fan = User(username="fan", email="fan@example.com", password_hash="x", is_verified=True)
+        db.session.add_all([curator, fan])
+        db.session.flush()
+        profile = Profile(name="Curator", bio="Things worth your time. " * 5, slug="curator", user_id=curator.id,
+                          profile_image="", instagram_handle="", tiktok_handle="", country="US", city="Austin")
+        db.session.add(profile)
+        db.session.flush()
+        first_rec = None
+        for name in ("Food", "Travel", "Books"):
+            category = Category(name=name, description=f"My favourite {name.lower()}", slug=name.lower(),
+                                profile_id=profile.id)
+            db.session.add(category)
+            db.session.flush()
+            for i in range(recs_per_category):
+                rec = Recommendation(title=f"{name} pick {i}", description="A short review of why it's good. " * 6,
+                                     url="https://example.com", image="", rating=4, cost_rating="$$",
+                                     location="Austin, TX", tags={"categories": [], "collections": []},
+                                     category_id=category.id)
+                db.session.add(rec)
+                db.session.flush()
+                db.session.add(Like(user_id=fan.id, recommendation_id=rec.id))
+                db.session.add(Comment(content="Loved this one!", user_id=fan.id, recommendation_id=rec.id))
+                first_rec = first_rec or rec.id
+        db.session.commit()
+    return [("home", "/"), ("profile", "/p/curator"), ("category", "/p/curator/food"),
+            ("recommendation", f"/p/curator/food/{first_rec}"), ("trending", "/trending"),
+            ("login", "/auth/login")] + [(path.split("/")[-1], f"/static/{path}") for path in STYLESHEETS]
+
+
+def render(pages):
+    client = app.test_client()
+    bodies = []
+    for label, path in pages:
+        response = client.get(path)
+        if response.status_code == 200:
+            bodies.append((label, response.get_data()))
+        response.close()
+    return bodies
+
+
+def measure(encoder_class, level, body, repeat):
+    """Return (ms per compression, compressed bytes)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoder = encoder_class(level)
+        compressed = encoder.compress(body) + encoder.finish()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(compressed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--recs", type=int, default=12, help="Recommendations per category")
+    args = parser.parse_args()
+
+    bodies = render(seed(args.recs))
+    print(f"{'response':>16} {'bytes':>8}  " + "  ".join(f"{name + str(level):>13}" for name, _, level in LEVELS))
+    totals = {(name, level): [0.0, 0] for name, _, level in LEVELS}
+    for label, body in bodies:
+        cells = []
+        for name, encoder_class, level in LEVELS:
+            ms, size = measure(encoder_class, level, body, args.repeat)
+            totals[(name, level)][0] += ms
+            totals[(name, level)][1] += size
+            cells.append(f"{ms:5.2f}ms {size / len(body):5.1%}")
+        print(f"{label:>16} {len(body):8d}  " + "  ".join(f"{cell:>13}" for cell in cells))
+
+    original = sum(len(body) for _, body in bodies)
+    print(f"{'all':>16} {original:8d}  " + "  ".join(
+        f"{f'{ms:5.2f}ms {size / original:5.1%}':>13}" for ms, size in totals.values()))
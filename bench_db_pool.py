@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request latency for DB_POOL_MODE=null vs DB_POOL_MODE=pooled.
+
+Each simulated request checks out a connection, runs a few small queries the
+way a page view does, and returns it. By default the database is a local
+SQLite file whose connect step sleeps --connect-ms to stand in for the
+TCP+TLS+auth handshake to pooler.supabase.com; pass --url to measure against
+a real Postgres/pgbouncer instead.
+
+Usage: python bench_db_pool.py [--requests 200] [--connect-ms 30] [--url URL]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, text
+from db_pool import transaction_pooler_engine_options, warm_up_pool
+
+QUERIES_PER_REQUEST = 4
+
+
+def make_engine(mode, url, connect_ms):
+    """Create an engine with the production pool options for `mode`"""
+    if url:
+        return create_engine(url, **transaction_pooler_engine_options(url, mode))
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_pool.db")
+
+    def slow_connect():
+        time.sleep(connect_ms / 1000.0)  # Simulated network handshake
+        return sqlite3.connect(path, check_same_thread=False)
+
+    options = transaction_pooler_engine_options("sqlite://", mode)
+    options.pop("connect_args")  # Postgres-only
+    return create_engine(f"sqlite:///{path}", creator=slow_connect, **options)
+
+
+def run(mode, requests, url, connect_ms):
+    """Return per-request latencies in milliseconds"""
+    engine = make_engine(mode, url, connect_ms)
+    warm_up_pool(engine, 1)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            for _ in range(QUERIES_PER_REQUEST):
+                connection.execute(text("SELECT 1")).scalar()
+        latencies.append((time.perf_counter() - started) * 1000)
+    engine.dispose()
+    return latencies
+
+
+def report(mode, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{mode:>7}: mean {statistics.mean(ordered):7.2f} ms   "
+          f"p50 {statistics.median(ordered):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--connect-ms", type=float, default=30.0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    target = args.url or f"SQLite stand-in with {args.connect_ms:.0f} ms connect"
+    print(f"{args.requests} requests x {QUERIES_PER_REQUEST} queries against {target}")
+    for mode in ("null", "pooled"):
+        report(mode, run(mode, args.requests, args.url, args.connect_ms))
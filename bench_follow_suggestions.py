@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Benchmark for suggestions.compute_follow_suggestions on a synthetic graph.
+
+Generates a power-law follow graph (a few very popular curators, a long tail)
+with 1M edges by default and reports the scoring runtime. No database needed.
+
+Usage: python bench_follow_suggestions.py [edges] [users]
+"""
+
+import sys
+import time
+import numpy as np
+from suggestions import compute_follow_suggestions
+
+
+def synthetic_edges(edge_count, user_count, seed=42):
+    """Power-law distributed (source, target) pairs without self loops"""
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(1, user_count + 1, size=edge_count)
+    targets = np.minimum(rng.zipf(1.3, size=edge_count), user_count)
+    targets = rng.permutation(user_count)[targets - 1] + 1  # Spread popular ids around
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+if __name__ == "__main__":
+    edge_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+
+    follow_edges = synthetic_edges(edge_count, user_count)
+    like_edges = synthetic_edges(edge_count, user_count, seed=7)
+    print(f"Graph: {user_count} users, {len(follow_edges[0])} follow edges, {len(like_edges[0])} likes")
+
+    started = time.perf_counter()
+    user_ids, suggested_ids, scores, ranks = compute_follow_suggestions(follow_edges, like_edges)
+    elapsed = time.perf_counter() - started
+
+    print(f"Suggestions: {len(user_ids)} rows for {len(np.unique(user_ids))} users")
+    print(f"Runtime: {elapsed:.2f}s")
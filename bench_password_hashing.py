@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput with password hashing inline vs in the process pool.
+
+--threads clients post logins (one correct password per request) through the
+Flask test client for --seconds, while one more client keeps fetching the
+login page to show what a cheap request pays during the burst. Runs against a
+throwaway SQLite database with the production hash parameters unless
+PASSWORD_HASH_METHOD is set. Logins shed with 429 are counted separately and
+the client waits Retry-After before trying again.
+
+Usage: python bench_password_hashing.py [--threads 16] [--seconds 5] [--workers 4] [--queue 16]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+THROWAWAY_DB = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_passwords.db")
+
+
+def seed(app, db, password):
+    from models import User
+    import passwords
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        db.session.add(User(username="bench", email="bench@example.com",
+                            password_hash=passwords.hash_password(password), is_verified=True))
+        db.session.commit()
+
+
+def run(app, threads, seconds):
+    """Return (login latencies ms, shed count, cheap request latencies ms, elapsed s)"""
+    logins, cheap = [], []
+    shed = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def log_in():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.post("/auth/login", data={"username": "bench", "password": "bench-password"})
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if response.status_code != 429:
+                    logins.append(elapsed)
+                    continue
+                shed[0] += 1
+            time.sleep(float(response.headers.get("Retry-After", 1)))  # What a polite client does
+
+    def browse():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            client.get("/auth/login")
+            cheap.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=log_in) for _ in range(threads)] + [threading.Thread(target=browse)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return logins, shed[0], cheap, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(int(len(ordered) * fraction) - 1, 0)] if ordered else 0.0
+
+
+def report(mode, logins, shed, cheap, elapsed):
+    print(f"{mode:>6}: {len(logins) / elapsed:7.1f} logins/s   "
+          f"p50 {statistics.median(logins) if logins else 0:7.1f} ms   p95 {percentile(logins, 0.95):7.1f} ms   "
+          f"429s {shed:5d}   page p50 {statistics.median(cheap) if cheap else 0:6.1f} ms   "
+          f"page p95 {percentile(cheap, 0.95):6.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 4))
+    parser.add_argument("--queue", type=int, default=None, help="Queue limit (default workers * 4)")
+    args = parser.parse_args()
+
+    # Set before the app import; the pool's spawned workers re-import this file and must not
+    os.environ["DATABASE_URL"] = THROWAWAY_DB
+    os.environ.setdefault("SLOW_QUERY_LOG_FILE", os.devnull)
+    from app import app, db
+    import passwords
+
+    app.config["WTF_CSRF_ENABLED"] = False
+    seed(app, db, "bench-password")
+    print(f"{args.threads} login threads for {args.seconds:.0f}s, hash method {passwords.PASSWORD_HASH_METHOD}")
+
+    queue = args.queue or max(args.workers, 1) * 4
+    for mode, workers, limit in (("inline", 0, args.threads), ("pool", args.workers, queue)):
+        passwords.PASSWORD_POOL_WORKERS = workers
+        passwords._slots = threading.BoundedSemaphore(limit)
+        if workers:
+            passwords.hash_password("warm-up")  # Start the worker processes outside the measurement
+        report(mode, *run(app, args.threads, args.seconds))
+    passwords._shutdown_pool()
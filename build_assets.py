@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Static asset build for CUR8tr - minified CSS, category icon sprite, hashed files
+
+Run before deploying: python build_assets.py
+
+1. Regenerates static/svg/category-icons.svg, one <symbol> per icon in
+   assets.CATEGORY_ICONS (plus the default icon).
+2. Copies every file under static/ to static/dist/ as name.<hash>.ext,
+   minifying CSS first. User content (uploads, qrcodes) is skipped.
+3. Writes .br (brotli 11) and .gz (gzip 9) siblings for text assets where they
+   are smaller. Build time can afford the maximum levels that are too slow
+   per request (see bench_compression.py).
+4. Writes static/dist/manifest.json, which assets.py loads at startup to
+   fingerprint url_for('static', ...) URLs.
+
+static/dist/ has to ship with the app: commit it, or run this in the deploy
+pipeline. Without it, the plain files are served.
+"""
+
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import mimetypes
+import brotli
+from assets import DIST_DIR, MANIFEST_FILE, CATEGORY_ICONS, DEFAULT_CATEGORY_ICON, CATEGORY_SPRITE
+from compression import is_compressible
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+SKIPPED_DIRS = {DIST_DIR, "uploads", "qrcodes"}
+HASH_LENGTH = 10
+
+_CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_CSS_COMMENTS_AND_STRINGS = re.compile(rf'(/\*.*?\*/)|({_CSS_STRING})', re.S)
+_CSS_STRINGS = re.compile(f'({_CSS_STRING})')
+_SVG_ROOT = re.compile(r'<svg\b([^>]*)>(.*)</svg>', re.S)
+
+
+def _minify_css_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+    code = re.sub(r':\s+', ':', code)  # Only after the colon; "a :hover" differs from "a:hover"
+    return code.replace(';}', '}')
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace, leaving string literals untouched"""
+    # A comment still separates tokens, so it becomes a space
+    css = _CSS_COMMENTS_AND_STRINGS.sub(lambda match: match.group(2) or ' ', css)
+    pieces = _CSS_STRINGS.split(css)  # Strings land at the odd indexes
+    return ''.join(piece if index % 2 else _minify_css_code(piece) for index, piece in enumerate(pieces)).strip()
+
+
+def build_sprite(svg_dir, icons):
+    """One SVG document with a <symbol id="<icon>"> for each icon file"""
+    symbols = []
+    for icon in icons:
+        with open(os.path.join(svg_dir, f"{icon}.svg"), encoding="utf-8") as source:
+            attributes, body = _SVG_ROOT.search(source.read()).groups()
+        if ' id="' in body:
+            raise ValueError(f"{icon}.svg defines ids, which would clash inside the sprite")
+        view_box = re.search(r'viewBox="([^"]+)"', attributes)
+        if view_box is None:
+            width = re.search(r'width="([\d.]+)', attributes).group(1)
+            height = re.search(r'height="([\d.]+)', attributes).group(1)
+            view_box = f"0 0 {width} {height}"
+        else:
+            view_box = view_box.group(1)
+        fill = re.search(r'\sfill="([^"]+)"', attributes)
+        fill = f' fill="{fill.group(1)}"' if fill else ''
+        body = re.sub(r'>\s+<', '><', body.strip())
+        symbols.append(f'<symbol id="{icon}" viewBox="{view_box}"{fill}>{body}</symbol>')
+    return '<svg xmlns="http://www.w3.org/2000/svg">' + ''.join(symbols) + '</svg>\n'
+
+
+def source_files(static_folder):
+    """Relative paths (with forward slashes) of every file to fingerprint"""
+    for directory, subdirectories, files in os.walk(static_folder):
+        relative_dir = os.path.relpath(directory, static_folder)
+        if relative_dir == ".":
+            subdirectories[:] = [name for name in subdirectories if name not in SKIPPED_DIRS]
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield os.path.normpath(os.path.join(relative_dir, name)).replace(os.sep, "/")
+
+
+def fingerprinted_name(path, content):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha1(content).hexdigest()[:HASH_LENGTH]}{extension}"
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as output:
+        output.write(content)
+
+
+def build(static_folder=STATIC_FOLDER, report=print):
+    """
+    Rebuild static/dist and its manifest
+
+    Returns:
+        The manifest dict (plain path -> path of the built file, both relative to static_folder)
+    """
+    sprite = build_sprite(os.path.join(static_folder, "svg"),
+                          sorted({*CATEGORY_ICONS.values(), DEFAULT_CATEGORY_ICON}))
+    _write(os.path.join(static_folder, CATEGORY_SPRITE), sprite.encode("utf-8"))
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest, original_bytes, built_bytes, compressed_bytes = {}, 0, 0, 0
+    for path in source_files(static_folder):
+        with open(os.path.join(static_folder, path), "rb") as source:
+            content = source.read()
+        original_bytes += len(content)
+        if path.endswith(".css"):
+            content = minify_css(content.decode("utf-8")).encode("utf-8")
+        built = f"{DIST_DIR}/{fingerprinted_name(path, content)}"
+        _write(os.path.join(static_folder, built), content)
+        manifest[path] = built
+        built_bytes += len(content)
+
+        if is_compressible(mimetypes.guess_type(path)[0]):
+            smallest = len(content)
+            for suffix, compressed in ((".br", brotli.compress(content, quality=11, mode=brotli.MODE_TEXT)),
+                                       (".gz", gzip.compress(content, compresslevel=9, mtime=0))):
+                if len(compressed) < len(content):
+                    _write(os.path.join(static_folder, built + suffix), compressed)
+                    smallest = min(smallest, len(compressed))
+            compressed_bytes += smallest
+        else:
+            compressed_bytes += len(content)
+
+    with open(os.path.join(dist, MANIFEST_FILE), "w", encoding="utf-8") as output:
+        json.dump(manifest, output, indent=1, sort_keys=True)
+    report(f"Built {len(manifest)} assets into {dist}: {original_bytes / 1024:.0f} KB source, "
+           f"{built_bytes / 1024:.0f} KB minified, {compressed_bytes / 1024:.0f} KB over the wire with brotli/gzip")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--static-folder", default=STATIC_FOLDER)
+    args = parser.parse_args()
+    build(args.static_folder)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Batch job that rebuilds the "who to follow" suggestions table.
+
+Loads the follows table and the like graph into NumPy arrays, scores
+candidates with suggestions.compute_follow_suggestions and replaces the
+follow_suggestions table in a single transaction so dashboards keep reading
+the previous snapshot until the new one is committed.
+
+Requires the packages in requirements-jobs.txt.
+"""
+
+import time
+import numpy as np
+from sqlalchemy import select, insert, delete
+from app import app
+from models import db, Follow, Like, Recommendation, Category, Profile, FollowSuggestion
+from suggestions import compute_follow_suggestions, DEFAULT_TOP_K
+
+INSERT_BATCH_SIZE = 10000
+
+
+def load_edges(statement):
+    """Stream a two-column integer result into a pair of NumPy arrays"""
+    rows = db.session.execute(statement.execution_options(yield_per=INSERT_BATCH_SIZE))
+    flat = np.fromiter((value for row in rows for value in row), dtype=np.int64)
+    return flat[0::2], flat[1::2]
+
+
+def build_follow_suggestions(top_k=DEFAULT_TOP_K):
+    """Recompute and store the top-K suggestions for every user"""
+    with app.app_context():
+        started = time.perf_counter()
+
+        follow_edges = load_edges(select(Follow.follower_id, Follow.followed_id))
+        like_edges = load_edges(
+            select(Like.user_id, Profile.user_id)
+            .join(Recommendation, Like.recommendation_id == Recommendation.id)
+            .join(Category).join(Profile)
+        )
+        loaded = time.perf_counter()
+        print(f"Loaded {len(follow_edges[0])} follow edges and {len(like_edges[0])} likes "
+              f"in {loaded - started:.2f}s")
+
+        user_ids, suggested_ids, scores, ranks = compute_follow_suggestions(
+            follow_edges, like_edges, top_k=top_k
+        )
+        computed = time.perf_counter()
+        print(f"Scored {len(user_ids)} suggestions in {computed - loaded:.2f}s")
+
+        db.session.execute(delete(FollowSuggestion))
+        for start in range(0, len(user_ids), INSERT_BATCH_SIZE):
+            end = start + INSERT_BATCH_SIZE
+            db.session.execute(insert(FollowSuggestion), [
+                {
+                    'user_id': int(user_id),
+                    'suggested_user_id': int(suggested_id),
+                    'score': float(score),
+                    'rank': int(rank),
+                }
+                for user_id, suggested_id, score, rank in zip(
+                    user_ids[start:end], suggested_ids[start:end], scores[start:end], ranks[start:end]
+                )
+            ])
+        db.session.commit()
+        print(f"Stored suggestions in {time.perf_counter() - computed:.2f}s")
+
+
+if __name__ == "__main__":
+    print("Rebuilding follow suggestions...")
+    build_follow_suggestions()
+    print("Done!")
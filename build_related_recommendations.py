@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Batch job that maintains the related-recommendations index.
+
+By default only recommendations that are new or edited since their neighbor
+list was computed are rescored, plus the rows whose lists they affect:
+rows that currently point at a changed recommendation, and rows a changed
+recommendation now scores high enough to enter. Lists that lost a neighbor
+to a deleted recommendation are rescored too, and rows left behind by deleted
+recommendations are removed. Pass --full to rebuild the whole index.
+Recommendations with no neighbor above related.MIN_SCORE have no stored rows
+and are rescored on every run. Lists that aren't refreshed keep the word
+weights (IDF) of the corpus they were scored against, so a full rebuild now
+and then picks up the drift.
+
+Requires the packages in requirements-jobs.txt.
+"""
+
+import sys
+import time
+import numpy as np
+from sqlalchemy import select, insert, delete, func
+from app import app
+from models import db, Recommendation, RelatedRecommendation
+from related import build_features, top_k_neighbors, rows_displaced_by, DEFAULT_TOP_K
+
+INSERT_BATCH_SIZE = 10000
+
+
+def load_corpus():
+    """Load ids, text, tags and edit times without touching image columns"""
+    rows = db.session.execute(
+        select(Recommendation.id, Recommendation.title, Recommendation.description,
+               Recommendation.tags, Recommendation.updated_at)
+        .order_by(Recommendation.id)
+    ).all()
+
+    ids = np.array([row.id for row in rows], dtype=np.int64)
+    texts = [f"{row.title or ''} {row.description or ''}" for row in rows]
+    tag_lists = [
+        (row.tags or {}).get('categories', []) + (row.tags or {}).get('collections', [])
+        for row in rows
+    ]
+    updated_at = [row.updated_at for row in rows]
+    return ids, texts, tag_lists, updated_at
+
+
+def find_changed(ids, updated_at):
+    """Positions of recommendations edited after their list was built, or never built"""
+    built_at = dict(db.session.execute(
+        select(RelatedRecommendation.recommendation_id, func.min(RelatedRecommendation.created_at))
+        .group_by(RelatedRecommendation.recommendation_id)
+    ).all())
+    return np.array([
+        position for position, (rec_id, edited) in enumerate(zip(ids, updated_at))
+        if rec_id not in built_at or (edited and edited > built_at[rec_id])
+    ], dtype=np.int64)
+
+
+def find_affected(ids, changed_positions, features, top_k):
+    """Positions of unchanged rows whose lists a changed row may alter"""
+    changed_ids = ids[changed_positions].tolist()
+
+    # Rows pointing at a changed recommendation may now hold a stale score
+    pointing = np.array(db.session.scalars(
+        select(RelatedRecommendation.recommendation_id)
+        .where(RelatedRecommendation.related_id.in_(changed_ids))
+        .distinct()
+    ).all(), dtype=np.int64)
+
+    # Rows a changed recommendation now beats their current K-th neighbor
+    full_lists = dict(db.session.execute(
+        select(RelatedRecommendation.recommendation_id, func.min(RelatedRecommendation.score))
+        .group_by(RelatedRecommendation.recommendation_id)
+        .having(func.count(RelatedRecommendation.id) >= top_k)
+    ).all())
+    thresholds = np.array([full_lists.get(rec_id, 0.0) for rec_id in ids.tolist()])
+    displaced = rows_displaced_by(features, changed_positions, thresholds)
+
+    pointing_positions = np.flatnonzero(np.isin(ids, pointing))
+    return np.setdiff1d(np.union1d(pointing_positions, displaced), changed_positions)
+
+
+def find_stale(ids):
+    """Positions of lists that pointed at a since-deleted recommendation"""
+    # ON DELETE CASCADE removes the row, leaving a gap in the list's ranks. Where
+    # foreign keys aren't enforced (SQLite) the row stays and points nowhere.
+    gapped = (select(RelatedRecommendation.recommendation_id)
+              .group_by(RelatedRecommendation.recommendation_id)
+              .having(func.max(RelatedRecommendation.rank) > func.count(RelatedRecommendation.id)))
+    dangling = select(RelatedRecommendation.recommendation_id).where(
+        RelatedRecommendation.related_id.not_in(select(Recommendation.id)))
+    stale = db.session.scalars(gapped.union(dangling)).all()
+    return np.flatnonzero(np.isin(ids, np.array(stale, dtype=np.int64)))
+
+
+def build_related_recommendations(full=False, top_k=DEFAULT_TOP_K):
+    """Rescore changed recommendations (or all of them) and store their neighbors"""
+    with app.app_context():
+        started = time.perf_counter()
+        ids, texts, tag_lists, updated_at = load_corpus()
+        if not len(ids):
+            print("No recommendations to index")
+            return
+
+        features = build_features(texts, tag_lists)
+        if full:
+            refresh = np.arange(len(ids))
+        else:
+            changed = find_changed(ids, updated_at)
+            affected = find_affected(ids, changed, features, top_k) if len(changed) else changed
+            stale = find_stale(ids)
+            refresh = np.union1d(np.union1d(changed, affected), stale)
+            print(f"{len(changed)} new or edited, {len(affected)} affected neighbors, "
+                  f"{len(stale)} lost a deleted neighbor")
+        print(f"Loaded {len(ids)} recommendations in {time.perf_counter() - started:.2f}s")
+
+        sources, neighbors, scores, ranks = top_k_neighbors(features, refresh, top_k)
+        refresh_ids = ids[refresh].tolist()
+
+        if full:
+            db.session.execute(delete(RelatedRecommendation))
+        else:
+            # Lists of deleted recommendations (only left behind without enforced foreign keys)
+            db.session.execute(delete(RelatedRecommendation).where(
+                RelatedRecommendation.recommendation_id.not_in(select(Recommendation.id))
+            ))
+            for start in range(0, len(refresh_ids), INSERT_BATCH_SIZE):
+                db.session.execute(delete(RelatedRecommendation).where(
+                    RelatedRecommendation.recommendation_id.in_(refresh_ids[start:start + INSERT_BATCH_SIZE])
+                ))
+
+        source_ids, neighbor_ids = ids[sources], ids[neighbors]
+        for start in range(0, len(source_ids), INSERT_BATCH_SIZE):
+            end = start + INSERT_BATCH_SIZE
+            db.session.execute(insert(RelatedRecommendation), [
+                {
+                    'recommendation_id': int(rec_id),
+                    'related_id': int(related_id),
+                    'score': float(score),
+                    'rank': int(rank),
+                }
+                for rec_id, related_id, score, rank in zip(
+                    source_ids[start:end], neighbor_ids[start:end], scores[start:end], ranks[start:end]
+                )
+            ])
+        db.session.commit()
+        print(f"Refreshed {len(refresh_ids)} neighbor lists ({len(source_ids)} rows) "
+              f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    full_rebuild = '--full' in sys.argv
+    print(f"Building related recommendations ({'full' if full_rebuild else 'incremental'})...")
+    build_related_recommendations(full=full_rebuild)
+    print("Done!")
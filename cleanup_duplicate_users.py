@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration script to remove duplicate user accounts (port of cleanup_duplicates.sql, steps 4 and 5).
+
+For every username or email held by more than one user, the oldest account
+(lowest id) is kept and the others are deleted; with --keep newest the highest
+id is kept instead. Accounts that already own data (a profile, follows, likes
+or comments) are never deleted automatically; they are listed so they can be
+merged by hand.
+
+Runs in batches on the data_migrations framework; try --dry-run first:
+    python cleanup_duplicate_users.py [--keep oldest|newest] [--dry-run] [--batch-size N] [--restart]
+"""
+
+from sqlalchemy import select, delete, exists, or_
+from sqlalchemy.orm import aliased
+from data_migrations import DataMigration, run_cli
+from models import db, User, Profile, Follow, Like, Comment
+
+KEEP_CHOICES = ("oldest", "newest")
+
+
+class CleanupDuplicateUsers(DataMigration):
+    """Delete accounts that repeat a kept account's username or email"""
+
+    name = "cleanup_duplicate_users"
+    key = User.__table__.c.id
+
+    def __init__(self, keep="oldest"):
+        self.set_keep(keep)
+
+    def set_keep(self, keep):
+        if keep not in KEEP_CHOICES:
+            raise ValueError(f"keep must be one of {KEEP_CHOICES}, got {keep!r}")
+        self.keep = keep
+        # Each direction keeps its own checkpoint, so one can't resume the other
+        self.name = "cleanup_duplicate_users" if keep == "oldest" else "cleanup_duplicate_users_keep_newest"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", choices=KEEP_CHOICES, default=self.keep,
+                            help="Which account to keep for each duplicated username/email")
+
+    def configure(self, args):
+        self.set_keep(args.keep)
+
+    def source(self):
+        other = aliased(User)
+        kept_rank = other.id < User.id if self.keep == "oldest" else other.id > User.id
+        return select(User.id, User.username, User.email).where(exists().where(
+            kept_rank,
+            or_(other.username == User.username, other.email == User.email),
+        ))
+
+    def apply(self, rows):
+        ids = [row.id for row in rows]
+        owns_data = or_(
+            exists().where(Profile.user_id == User.id),
+            exists().where(or_(Follow.follower_id == User.id, Follow.followed_id == User.id)),
+            exists().where(Like.user_id == User.id),
+            exists().where(Comment.user_id == User.id),
+        )
+        kept = set(db.session.scalars(select(User.id).where(User.id.in_(ids), owns_data)))
+        for row in rows:
+            if row.id in kept:
+                print(f"  Skipping user {row.id} ({row.username}, {row.email}): has data, merge by hand")
+
+        deletable = [user_id for user_id in ids if user_id not in kept]
+        if not deletable:
+            return 0
+        result = db.session.execute(
+            delete(User).where(User.id.in_(deletable)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+if __name__ == "__main__":
+    run_cli(CleanupDuplicateUsers())
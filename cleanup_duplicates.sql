@@ -23,22 +23,11 @@ JOIN (
 ) u2 ON u1.username = u2.username AND u1.email = u2.email
 ORDER BY u1.username, u1.created_at;
 
--- 4. Clean up duplicates (CAREFUL: Run this only after backing up your data)
--- This keeps the oldest user for each username/email combination
-/*
-DELETE u1 FROM users u1
-INNER JOIN users u2 
-WHERE u1.id > u2.id 
-AND (u1.username = u2.username OR u1.email = u2.email);
-*/
+-- 4. Clean up duplicates: run cleanup_duplicate_users.py (keeps the oldest user for
+--    each username/email, in resumable batches; try --dry-run first)
 
--- 5. Alternative cleanup: Keep the newest user instead
-/*
-DELETE u1 FROM users u1
-INNER JOIN users u2 
-WHERE u1.id < u2.id 
-AND (u1.username = u2.username OR u1.email = u2.email);
-*/
+-- 5. Alternative cleanup: keep the newest user instead
+--    python cleanup_duplicate_users.py --keep newest
 
 -- 6. Check profiles without corresponding users (orphaned profiles)
 SELECT p.id, p.name, p.user_id
@@ -0,0 +1,57 @@
+"""
+Comment pages for CUR8tr recommendations
+
+Comments are fetched newest first in keyset pages, with the author's
+username and profile name/slug joined into the same query so templates never
+lazy-load `comment.user` (and never pull profile image blobs).
+"""
+
+from sqlalchemy import select, func
+from app import db
+from models import Comment, User, Profile
+from pagination import encode_cursor, keyset_before
+
+COMMENT_PAGE_SIZE = 20
+
+
+def get_comment_count(recommendation_id):
+    """Total number of comments on a recommendation"""
+    return db.session.scalar(
+        select(func.count(Comment.id)).where(Comment.recommendation_id == recommendation_id)
+    )
+
+
+def get_comment_page(recommendation_id, cursor=None, limit=COMMENT_PAGE_SIZE):
+    """
+    Get one page of comments with their authors
+
+    Args:
+        recommendation_id: Recommendation whose comments to list
+        cursor: Decoded (created_at, id) keyset position, or None for the first page
+        limit: Page size
+
+    Returns:
+        Tuple of (rows, next_cursor). Each row has id, content, created_at,
+        user_id, username, author_name and author_slug attributes.
+    """
+    query = select(
+        Comment.id,
+        Comment.content,
+        Comment.created_at,
+        Comment.user_id,
+        User.username,
+        Profile.name.label('author_name'),
+        Profile.slug.label('author_slug'),
+    ).join(User, Comment.user_id == User.id).outerjoin(
+        Profile, Profile.user_id == User.id
+    ).where(Comment.recommendation_id == recommendation_id)
+
+    if cursor:
+        query = query.where(keyset_before(Comment.created_at, Comment.id, cursor))
+
+    rows = db.session.execute(
+        query.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
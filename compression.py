@@ -0,0 +1,199 @@
+"""
+Response compression for CUR8tr - gzip/brotli WSGI middleware
+
+Text responses (HTML, CSS, JS, JSON, SVG, ...) are compressed with brotli when
+the client accepts it, otherwise gzip. Responses are left alone when they:
+  - are not 200
+  - are under COMPRESS_MIN_SIZE
+  - already have a Content-Encoding
+  - ask for Cache-Control: no-transform
+  - answer a HEAD request
+Every compressible type gets `Vary: Accept-Encoding`, compressed or not, so
+caches keep the variants apart. A strong ETag becomes weak when the body is
+compressed, because the bytes differ from the identity representation.
+
+Buffered responses (Flask's normal case, with a Content-Length) are
+compressed in one pass and sent with the new Content-Length. Streamed
+responses have no length, so the first COMPRESS_MIN_SIZE bytes are buffered
+to decide. After that, every chunk the app yields is compressed and flushed
+right away, so streaming still reaches the client chunk by chunk.
+
+Environment:
+    COMPRESSION              "1" (default) or "0" to leave it to a proxy/CDN
+    COMPRESS_MIN_SIZE        Smallest body worth compressing, in bytes (default 1024)
+    COMPRESS_GZIP_LEVEL      zlib level 1-9 (default 6)
+    COMPRESS_BROTLI_QUALITY  brotli quality 0-11 (default 4; higher levels cost
+                             far more CPU than they save on dynamic pages, see
+                             bench_compression.py)
+"""
+
+import os
+import zlib
+import brotli
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header, quote_etag, unquote_etag
+
+COMPRESSION = os.environ.get("COMPRESSION", "1") == "1"
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/manifest+json",
+    "application/xml", "application/xhtml+xml", "image/svg+xml", "image/x-icon",
+}
+
+
+class GzipEncoder:
+    """Incremental gzip stream"""
+
+    name = "gzip"
+
+    def __init__(self, level=None):
+        self._stream = zlib.compressobj(COMPRESS_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._stream.compress(data)
+
+    def flush(self):
+        """Everything compressed so far, decodable by the client without the rest"""
+        return self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._stream.flush()
+
+
+class BrotliEncoder:
+    """Incremental brotli stream"""
+
+    name = "br"
+
+    def __init__(self, quality=None):
+        self._stream = brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=COMPRESS_BROTLI_QUALITY if quality is None else quality)
+
+    def compress(self, data):
+        return self._stream.process(data)
+
+    def flush(self):
+        return self._stream.flush()
+
+    def finish(self):
+        return self._stream.finish()
+
+
+ENCODERS = {"br": BrotliEncoder, "gzip": GzipEncoder}
+
+
+def choose_encoding(accept_encoding):
+    """The encoding to use for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    best = max(ENCODERS, key=lambda name: (accepted.quality(name), name == "br"))
+    return best if accepted.quality(best) > 0 else None
+
+
+def is_compressible(content_type):
+    mimetype = parse_options_header(content_type or "")[0].lower()
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES
+
+
+def _add_vary(headers, value):
+    vary = [item.strip() for item in headers.get("Vary", "").split(",") if item.strip()]
+    if value.lower() not in (item.lower() for item in vary) and "*" not in vary:
+        headers["Vary"] = ", ".join(vary + [value])
+
+
+def _weaken_etag(headers):
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = quote_etag(unquote_etag(etag)[0], weak=True)
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing eligible responses on the way out"""
+
+    def __init__(self, app, min_size=None):
+        self.app = app
+        self.min_size = COMPRESS_MIN_SIZE if min_size is None else min_size
+
+    def __call__(self, environ, start_response):
+        encoding = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            encoding = choose_encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        deferred = {}
+
+        def intercept(status, response_headers, exc_info=None):
+            headers = Headers(response_headers)
+            if not is_compressible(headers.get("Content-Type")):
+                return start_response(status, response_headers, exc_info)
+            _add_vary(headers, "Accept-Encoding")
+            length = headers.get("Content-Length", type=int)
+            if (encoding is None or not status.startswith("200") or "Content-Encoding" in headers
+                    or "no-transform" in headers.get("Cache-Control", "")
+                    or (length is not None and length < self.min_size)):
+                return start_response(status, headers.to_wsgi_list(), exc_info)
+            # Held back until the body shows whether (and how) to compress
+            deferred.update(status=status, headers=headers, exc_info=exc_info, buffered=length is not None)
+            return self._no_write
+
+        app_iter = self.app(environ, intercept)
+        if not deferred:
+            return app_iter
+        return self._compressed(app_iter, encoding, deferred, start_response)
+
+    @staticmethod
+    def _no_write(data):
+        raise RuntimeError("CompressionMiddleware doesn't support the WSGI write() callable")
+
+    def _begin(self, start_response, deferred, encoding, body_length):
+        headers = deferred["headers"]
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            _weaken_etag(headers)
+        if body_length is None:
+            headers.pop("Content-Length", None)
+        else:
+            headers["Content-Length"] = str(body_length)
+        start_response(deferred["status"], headers.to_wsgi_list(), deferred["exc_info"])
+
+    def _compressed(self, app_iter, encoding, deferred, start_response):
+        try:
+            if deferred["buffered"]:
+                body = b"".join(app_iter)
+                encoder = ENCODERS[encoding]()
+                compressed = encoder.compress(body) + encoder.finish()
+                self._begin(start_response, deferred, encoding, len(compressed))
+                yield compressed
+                return
+
+            chunks, size = [], 0
+            iterator = iter(app_iter)
+            for chunk in iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.min_size:
+                    break
+            else:
+                # The whole stream was too small to be worth it
+                self._begin(start_response, deferred, None, size)
+                yield b"".join(chunks)
+                return
+
+            encoder = ENCODERS[encoding]()
+            self._begin(start_response, deferred, encoding, None)
+            yield encoder.compress(b"".join(chunks)) + encoder.flush()
+            for chunk in iterator:
+                if chunk:
+                    yield encoder.compress(chunk) + encoder.flush()
+            yield encoder.finish()
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+
+def init_compression(app):
+    """Wrap the app's WSGI callable unless COMPRESSION=0"""
+    if COMPRESSION:
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app)
@@ -0,0 +1,149 @@
+"""
+Conditional GET for CUR8tr - 304 Not Modified for public pages that haven't changed
+
+The profile, category and recommendation pages each take several queries and a
+template render. Before doing that work, the view runs one aggregate query
+over what the page shows. It reads max(updated_at) where rows can change, and
+count plus max id/timestamp where rows can be deleted (categories,
+recommendations, likes, comments). The result is hashed into a weak ETag, and
+the newest timestamp becomes Last-Modified. When the browser's copy matches,
+the view returns 304 and loads and renders nothing else.
+
+Validators vary by viewer. The ETag includes the logged-in user id and anything
+only that viewer sees: the follow button state, and the session CSRF secret
+plus its expiry window on pages with a form. If-Modified-Since can't tell
+viewers apart or notice deletions, so it is only honoured for anonymous
+requests without If-None-Match. Responses are `Cache-Control: private,
+no-cache` with `Vary: Cookie`, so browsers revalidate every time and shared
+caches keep nothing.
+
+The release (VERCEL_GIT_COMMIT_SHA, or process start time locally) is part of
+every ETag, so a deploy that changes templates invalidates old copies. Pages
+with a pending flash message are always rendered in full.
+
+Every view moves a trending score, so a category sorted by "popular" only
+takes the newest score time rounded down to POPULAR_REFRESH_SECONDS: a busy
+category's ETag changes at most once per interval, not on every view.
+"""
+
+import os
+import time
+import hashlib
+from datetime import timezone
+from flask import request, session, current_app
+from sqlalchemy import select, func, exists
+from app import db
+from models import Category, Recommendation, Like, Comment, Follow, RelatedRecommendation, TrendingScore
+
+RELEASE = os.environ.get("VERCEL_GIT_COMMIT_SHA") or str(int(time.time()))
+
+# How stale the "popular" order of a cached category page may get
+POPULAR_REFRESH_SECONDS = int(os.environ.get("POPULAR_REFRESH_SECONDS", 300))
+
+
+class PageValidators:
+    """ETag and Last-Modified for one page view"""
+
+    def __init__(self, parts, timestamps, csrf=False):
+        viewer_id = session.get('user_id')
+        parts = [RELEASE, viewer_id, *parts]
+        if csrf and viewer_id:
+            # A 304 keeps the old page's CSRF token, so it must not outlive the token
+            time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600) or 3600
+            parts += [session.get('csrf_token'), int(time.time() // (time_limit / 2))]
+        self.etag = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+        self.anonymous = viewer_id is None
+        timestamps = [stamp for stamp in timestamps if stamp is not None]
+        self.last_modified = (max(timestamps).replace(microsecond=0, tzinfo=timezone.utc)
+                              if timestamps else None)
+
+    def is_current(self):
+        """True when the request's validators match, so a 304 can be sent"""
+        if request.method != 'GET' or '_flashes' in session:
+            return False
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+        return bool(self.anonymous and self.last_modified and request.if_modified_since
+                    and request.if_modified_since >= self.last_modified)
+
+    def apply(self, response):
+        """Attach the validators and revalidation headers to a response"""
+        response.set_etag(self.etag, weak=True)
+        if self.last_modified:
+            response.last_modified = self.last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response
+
+    def not_modified(self):
+        return self.apply(current_app.response_class(status=304))
+
+
+def _count(model, *where):
+    return select(func.count(model.id)).where(*where).scalar_subquery()
+
+
+def _newest(column, *where):
+    return select(func.max(column)).where(*where).scalar_subquery()
+
+
+def _aggregate(*columns):
+    """Evaluate every scalar subquery in one round trip"""
+    return tuple(db.session.execute(select(*columns)).one())
+
+
+def profile_page_validators(profile):
+    """Validators for view_profile: the profile, its categories and their recommendations"""
+    in_profile = Category.profile_id == profile.id
+    profile_recs = Recommendation.category_id.in_(select(Category.id).where(in_profile))
+    columns = [
+        _count(Category, in_profile), _newest(Category.updated_at, in_profile),
+        _count(Recommendation, profile_recs), _newest(Recommendation.updated_at, profile_recs),
+    ]
+    viewer_id = session.get('user_id')
+    if viewer_id and viewer_id != profile.user_id:
+        columns.append(exists().where(Follow.follower_id == viewer_id,
+                                      Follow.followed_id == profile.user_id))
+    stats = _aggregate(*columns)
+    return PageValidators([profile.id, profile.updated_at, *stats],
+                          [profile.updated_at, stats[1], stats[3]])
+
+
+def category_page_validators(profile, category, sort):
+    """Validators for view_category: its recommendations with their like and comment counts"""
+    category_recs = select(Recommendation.id).where(Recommendation.category_id == category.id)
+    in_category = Recommendation.category_id == category.id
+    columns = [
+        _count(Recommendation, in_category), _newest(Recommendation.updated_at, in_category),
+        _count(Like, Like.recommendation_id.in_(category_recs)),
+        _newest(Like.id, Like.recommendation_id.in_(category_recs)),
+        _count(Comment, Comment.recommendation_id.in_(category_recs)),
+        _newest(Comment.updated_at, Comment.recommendation_id.in_(category_recs)),
+    ]
+    if sort == 'popular':
+        columns.append(_newest(TrendingScore.scored_at, TrendingScore.recommendation_id.in_(category_recs)))
+    stats = _aggregate(*columns)
+    if sort == 'popular' and stats[-1] is not None:
+        scored = stats[-1].replace(tzinfo=timezone.utc).timestamp()
+        stats = stats[:-1] + (int(scored // POPULAR_REFRESH_SECONDS),)
+    return PageValidators([profile.id, profile.updated_at, category.id, category.updated_at, sort, *stats],
+                          [profile.updated_at, category.updated_at, stats[1], stats[5]])
+
+
+def recommendation_page_validators(profile, category, recommendation):
+    """Validators for view_recommendation: the recommendation, its likes, comments and related panel"""
+    rec_id = recommendation.id
+    stats = _aggregate(
+        _count(Like, Like.recommendation_id == rec_id), _newest(Like.id, Like.recommendation_id == rec_id),
+        _newest(Like.created_at, Like.recommendation_id == rec_id),
+        _count(Comment, Comment.recommendation_id == rec_id),
+        _newest(Comment.updated_at, Comment.recommendation_id == rec_id),
+        _count(RelatedRecommendation, RelatedRecommendation.recommendation_id == rec_id),
+        _newest(RelatedRecommendation.created_at, RelatedRecommendation.recommendation_id == rec_id),
+    )
+    return PageValidators(
+        [profile.id, profile.updated_at, category.id, category.updated_at, rec_id, recommendation.updated_at, *stats],
+        [profile.updated_at, category.updated_at, recommendation.updated_at, stats[2], stats[4], stats[6]],
+        csrf=True,
+    )
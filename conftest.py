@@ -0,0 +1,86 @@
+"""
+Shared pytest setup for CUR8tr
+
+Every test module runs against the same throwaway SQLite database and
+slow-query log. Both are set here, before any test module imports the app, and
+they override anything from the shell or .env so a test run can never
+drop_all a real database.
+
+Fixtures:
+    empty_db             drop and recreate the app's tables
+    make_curator         user + public profile (+ an optional category)
+    make_recommendation  a recommendation in a category
+
+The factories commit and return ids, so tests can open their own app context
+afterwards without detached-instance surprises.
+"""
+
+import os
+import tempfile
+from collections import namedtuple
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "cur8tr_test.db")
+os.environ["SLOW_QUERY_LOG_FILE"] = os.path.join(_tmp, "slow_queries.log")
+os.environ.pop("DATABASE_REPLICA_URL", None)
+os.environ["EMAIL_WORKER"] = "off"  # Tests that send mail drain the outbox themselves
+
+import pytest
+from app import app, db
+from models import User, Profile, Category, Recommendation
+
+# Manual smoke scripts: they request pages at import time against whatever
+# database .env configures (Postgres in development), so they are not tests
+collect_ignore = ["test_app.py", "simple_test.py"]
+
+Curator = namedtuple("Curator", "user_id profile_id category_id")
+
+
+@pytest.fixture
+def empty_db():
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+
+
+@pytest.fixture
+def make_curator(empty_db):
+    """make_curator("name", category="Food", is_admin=False, verified=True) -> Curator"""
+
+    def make(username, category=None, is_admin=False, verified=True):
+        with app.app_context():
+            user = User(username=username, email=f"{username}@example.com", password_hash="x",
+                        is_verified=verified, is_admin=is_admin)
+            db.session.add(user)
+            db.session.flush()
+            profile = Profile(name=username.title(), bio="", slug=username, user_id=user.id, profile_image="",
+                              instagram_handle="", tiktok_handle="", country="", city="")
+            db.session.add(profile)
+            db.session.flush()
+            category_id = None
+            if category:
+                category_row = Category(name=category, description="", slug=category.lower(),
+                                        profile_id=profile.id)
+                db.session.add(category_row)
+                db.session.flush()
+                category_id = category_row.id
+            db.session.commit()
+            return Curator(user.id, profile.id, category_id)
+
+    return make
+
+
+@pytest.fixture
+def make_recommendation(empty_db):
+    """make_recommendation(category_id, "Title", **column overrides) -> recommendation id"""
+
+    def make(category_id, title="Pizza", **fields):
+        values = dict(description="", url="", image="", rating=5, cost_rating="$", location="", tags={})
+        values.update(fields)
+        with app.app_context():
+            rec = Recommendation(title=title, category_id=category_id, **values)
+            db.session.add(rec)
+            db.session.commit()
+            return rec.id
+
+    return make
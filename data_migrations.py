@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Chunked data migrations for CUR8tr - keyset batches, checkpoints, throughput
+
+A migration is a DataMigration subclass that names a keyset column, a source
+query and a batch transform:
+
+    class FixExistingTags(DataMigration):
+        name = "fix_existing_tags"
+        key = Recommendation.__table__.c.id
+
+        def source(self):
+            return select(Recommendation.id).where(Recommendation.tags.is_(None))
+
+        def apply(self, rows):
+            ...bulk UPDATE/DELETE for this batch...
+            return number_of_rows_changed
+
+The runner pages through `source()` with `key > last_key ORDER BY key LIMIT
+batch_size` (never OFFSET), calls `apply()` once per batch and commits the
+batch together with its checkpoint row in `migration_checkpoints`. A run that
+is interrupted resumes after the last committed batch. With --dry-run every
+batch is rolled back and no checkpoint is written.
+
+Each migration script ends with `run_cli(MyMigration())`, which provides:
+    --dry-run         Run the transforms, report what would change, roll back
+    --batch-size N    Rows per batch/transaction (default: the migration's batch_size)
+    --restart         Forget the checkpoint and start from the first row
+
+Migrations with options of their own override add_arguments() and configure().
+"""
+
+import time
+import argparse
+from datetime import datetime
+from sqlalchemy import select, func
+from app import app
+from models import db, MigrationCheckpoint
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class DataMigration:
+    """Base class for a resumable, batched data migration"""
+
+    name = None
+    key = None  # Integer table column the source is paged by, e.g. Recommendation.__table__.c.id
+    batch_size = DEFAULT_BATCH_SIZE
+
+    def source(self):
+        """Select yielding the rows to migrate; must include the key column"""
+        raise NotImplementedError
+
+    def apply(self, rows):
+        """Migrate one batch of source rows and return how many rows were changed"""
+        raise NotImplementedError
+
+    def add_arguments(self, parser):
+        """Add migration-specific options to the run_cli parser"""
+
+    def configure(self, args):
+        """Apply the parsed command-line options before the run"""
+
+
+def _format_eta(seconds):
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Progress:
+    """rows/sec and ETA for the rows processed in this run"""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def advance(self, rows):
+        self.done += rows
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self):
+        rate = self.rate()
+        if not rate:
+            return None
+        return max(self.total - self.done, 0) / rate
+
+    def line(self, changed):
+        return (f"{self.done}/{self.total} rows ({changed} changed) - "
+                f"{self.rate():.0f} rows/s, ETA {_format_eta(self.eta_seconds())}")
+
+
+def _load_checkpoint(migration, restart):
+    checkpoint = db.session.get(MigrationCheckpoint, migration.name)
+    if checkpoint is not None and restart:
+        db.session.delete(checkpoint)
+        db.session.flush()
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = MigrationCheckpoint(name=migration.name, rows_seen=0, rows_changed=0)
+    return checkpoint
+
+
+def _remaining_rows(migration, last_key):
+    source = migration.source()
+    if last_key is not None:
+        source = source.where(migration.key > last_key)
+    return db.session.scalar(select(func.count()).select_from(source.subquery()))
+
+
+def run_migration(migration, dry_run=False, batch_size=None, restart=False, report=print):
+    """
+    Run a migration batch by batch (call inside an app context)
+
+    Returns:
+        Dict with rows_seen and rows_changed for this run
+    """
+    batch_size = batch_size or migration.batch_size
+    checkpoint = _load_checkpoint(migration, restart and not dry_run)
+    if checkpoint.completed_at and not restart:
+        report(f"{migration.name}: already completed at {checkpoint.completed_at:%Y-%m-%d %H:%M}, "
+               f"use --restart to run it again")
+        return {'rows_seen': 0, 'rows_changed': 0}
+
+    last_key = None if restart else checkpoint.last_key
+    if last_key is not None:
+        report(f"{migration.name}: resuming after key {last_key} "
+               f"({checkpoint.rows_seen} rows already processed)")
+    progress = Progress(_remaining_rows(migration, last_key))
+    report(f"{migration.name}: {progress.total} rows to process in batches of {batch_size}"
+           f"{' (dry run)' if dry_run else ''}")
+
+    seen = changed = 0
+    while True:
+        batch = migration.source().order_by(migration.key).limit(batch_size)
+        if last_key is not None:
+            batch = batch.where(migration.key > last_key)
+        rows = db.session.execute(batch).all()
+        if not rows:
+            break
+
+        batch_changed = migration.apply(rows)
+        last_key = getattr(rows[-1], migration.key.key)
+        seen += len(rows)
+        changed += batch_changed
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            checkpoint.last_key = last_key
+            checkpoint.rows_seen += len(rows)
+            checkpoint.rows_changed += batch_changed
+            db.session.add(checkpoint)
+            db.session.commit()  # The batch and its checkpoint land together
+
+        progress.advance(len(rows))
+        report(f"{migration.name}: {progress.line(changed)}")
+
+    if not dry_run:
+        checkpoint.completed_at = datetime.utcnow()
+        db.session.add(checkpoint)
+        db.session.commit()
+
+    verb = "would change" if dry_run else "changed"
+    report(f"{migration.name}: done - {seen} rows processed, {changed} {verb} "
+           f"in {time.perf_counter() - progress.started:.2f}s")
+    return {'rows_seen': seen, 'rows_changed': changed}
+
+
+def run_cli(migration):
+    """Command-line entry point shared by migration scripts"""
+    parser = argparse.ArgumentParser(description=f"Data migration: {migration.name}")
+    parser.add_argument("--dry-run", action="store_true", help="Roll back every batch and skip the checkpoint")
+    parser.add_argument("--batch-size", type=int, default=migration.batch_size)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    migration.add_arguments(parser)
+    args = parser.parse_args()
+    migration.configure(args)
+
+    with app.app_context():
+        MigrationCheckpoint.__table__.create(db.engine, checkfirst=True)
+        run_migration(migration, dry_run=args.dry_run, batch_size=args.batch_size, restart=args.restart)
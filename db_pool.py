@@ -0,0 +1,84 @@
+"""
+Database connection pool settings for CUR8tr
+
+Production talks to the Supabase transaction pooler (pgbouncer/supavisor in
+transaction mode). Two modes are supported, chosen with DB_POOL_MODE:
+
+- "null" (default): NullPool, one fresh connection per request. Safest for
+  short-lived serverless instances, but pays TCP+TLS setup on every request.
+- "pooled": an in-process QueuePool that keeps a few connections open per
+  worker. Settings stay compatible with transaction-mode pooling: no
+  server-side prepared statements, no session-level startup options, and a
+  rollback on every return so no transaction state leaks between requests.
+
+Pool size and lifetimes are tunable per worker through environment variables.
+"""
+
+import os
+import logging
+from sqlalchemy.pool import NullPool
+
+POOL_MODES = ("null", "pooled")
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def transaction_pooler_engine_options(database_uri, mode=None):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for a transaction-mode pgbouncer endpoint
+
+    Args:
+        database_uri: SQLAlchemy URL, used to pick driver-specific connect args
+        mode: "null" or "pooled"; defaults to the DB_POOL_MODE env var
+
+    Returns:
+        Dict of create_engine keyword arguments
+    """
+    mode = (mode or os.environ.get("DB_POOL_MODE", "null")).lower()
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {POOL_MODES}, got {mode!r}")
+
+    connect_args = {"connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 10)}
+    if database_uri.startswith("postgresql+psycopg://"):
+        # psycopg 3 prepares repeated statements server-side by default,
+        # which breaks when the next transaction lands on another backend
+        connect_args["prepare_threshold"] = None
+
+    if mode == "null":
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 2),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 3),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 300),  # Replace connections before the pooler's idle timeout
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,  # Keep hot connections busy so surplus ones idle out and get recycled
+        "pool_reset_on_return": "rollback",
+        "connect_args": connect_args,
+    }
+
+
+def warm_up_pool(engine, connections=None):
+    """
+    Open connections ahead of the first request
+
+    Checks out `connections` connections at once (DB_POOL_WARMUP by default)
+    and returns them to the pool. Does nothing for NullPool engines.
+    """
+    connections = _env_int("DB_POOL_WARMUP", 0) if connections is None else connections
+    if connections <= 0 or isinstance(engine.pool, NullPool):
+        return 0
+
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    except Exception as e:
+        logging.warning(f"Connection pool warm-up stopped after {len(opened)} connections: {e}")
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
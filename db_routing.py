@@ -0,0 +1,81 @@
+"""
+Read replica routing for CUR8tr - send read-only page traffic to a replica
+
+When DATABASE_REPLICA_URL is set, the replica is registered as the "replica"
+bind. Plain SELECTs issued while serving a GET/HEAD request to one of
+READ_ONLY_ENDPOINTS run on the replica. Everything else stays on the
+primary: other endpoints, unsafe methods, flushes, INSERT/UPDATE/DELETE
+(including trending.record_event's upsert) and locking reads
+(SELECT ... FOR UPDATE).
+
+After a request that writes (like, comment, edit, ...) the user's session is
+pinned to the primary for REPLICA_STICKY_SECONDS, so they read their own
+writes while the replica catches up.
+"""
+
+import os
+import time
+from flask import g, request, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = "replica"
+
+# How long a user keeps reading from the primary after they write
+REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 10))
+
+# Session key holding the time until which reads stay on the primary
+STICKY_SESSION_KEY = "_db_primary_until"
+
+# Endpoints whose GET handlers only read, apart from trending counters
+READ_ONLY_ENDPOINTS = frozenset({
+    "home",
+    "view_profile",
+    "view_category",
+    "view_recommendation",
+    "recommendation_comments",
+    "recommendation_likers",
+    "trending",
+    "tagging.get_all_tags",
+    "tagging.get_categories",
+    "tagging.get_collections",
+    "tagging.get_recommendations_by_tags",
+})
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def _is_plain_select(clause):
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def _replica_allowed():
+    """Whether the current request may read from the replica"""
+    if not has_request_context():
+        return False
+    if request.method not in READ_METHODS or request.endpoint not in READ_ONLY_ENDPOINTS:
+        return False
+    return session.get(STICKY_SESSION_KEY, 0) <= time.time()
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that routes eligible reads to the replica bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or not _is_plain_select(clause):
+                if has_request_context():
+                    g._db_wrote = True
+            elif REPLICA_BIND in self._db.engines and _replica_allowed():
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_read_routing(app):
+    """Pin sessions to the primary after requests that write"""
+
+    @app.after_request
+    def pin_writers_to_primary(response):
+        if g.get("_db_wrote") and request.method not in READ_METHODS:
+            session[STICKY_SESSION_KEY] = time.time() + REPLICA_STICKY_SECONDS
+        return response
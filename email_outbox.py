@@ -0,0 +1,370 @@
+"""
+Email outbox for CUR8tr - requests enqueue, a background worker sends
+
+`enqueue_email` stores a fully rendered message in the email_outbox table and
+returns; no SMTP work happens inside the request. A worker claims due rows in
+batches and sends them over one SMTP connection that stays open (STARTTLS and
+login happen once, not per message). Temporary failures are retried with
+exponential backoff; permanent ones (5xx replies, refused recipients) and
+messages that run out of attempts are marked failed.
+
+Workers:
+    EMAIL_WORKER=thread   (default outside production) a daemon thread in the
+                          web process, started by the first enqueue
+    EMAIL_WORKER=request  (default when ENVIRONMENT=production) the request that
+                          enqueued sends one batch once its response is done.
+                          Serverless hosts freeze threads between requests, so
+                          this is how mail leaves promptly on Vercel
+    EMAIL_WORKER=off      nothing in-process; run `flask email-worker` as its
+                          own process, or `flask send-outbox` from a cron
+
+Retries need something to come back later. `GET /internal/send-outbox` with
+`Authorization: Bearer $CRON_SECRET` drains the outbox over HTTP; vercel.json
+schedules it as a Vercel cron, which sends exactly that header. Without
+CRON_SECRET the endpoint is a 404.
+
+Rows are claimed by moving next_attempt_at forward (a lease), with
+FOR UPDATE SKIP LOCKED on PostgreSQL, so several workers can share a table and
+a crashed worker's rows are picked up again once the lease expires.
+
+Environment:
+    SMTP_HOST / SMTP_PORT         Default smtp.gmail.com:587
+    SMTP_STARTTLS                 "1" (default) or "0"
+    APP_EMAIL / APP_PASSWORD      Login credentials; login is skipped without a password
+    EMAIL_FROM                    From header (default support@cur8tr.space)
+    OUTBOX_BATCH_SIZE             Messages claimed per batch (default 20)
+    OUTBOX_MAX_ATTEMPTS           Tries before a message is failed (default 6)
+    OUTBOX_BACKOFF_SECONDS        First retry delay, doubled per attempt (default 30)
+    OUTBOX_POLL_SECONDS           Worker poll interval when idle (default 5)
+    SMTP_IDLE_SECONDS             Close the SMTP connection after this long unused (default 60)
+    CRON_SECRET                   Bearer token for /internal/send-outbox
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import request, jsonify, after_this_request, has_request_context
+from werkzeug.exceptions import NotFound
+from sqlalchemy import select, update
+from app import db
+from models import OutboxEmail
+from tracing import span
+from utils import bearer_token_matches
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+SMTP_IDLE_SECONDS = float(os.environ.get("SMTP_IDLE_SECONDS", 60))
+EMAIL_FROM = os.environ.get("EMAIL_FROM", "support@cur8tr.space")
+
+EMAIL_WORKER = os.environ.get("EMAIL_WORKER", "request" if os.environ.get("ENVIRONMENT") == "production" else "thread")
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 6))
+OUTBOX_BACKOFF_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_SECONDS", 30))
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", 5))
+OUTBOX_LEASE_SECONDS = 300  # A claimed batch is retried after this if its worker died
+
+logger = logging.getLogger("cur8tr.email")
+
+
+def smtp_configured():
+    """True when there is somewhere to send mail (an explicit host, or Gmail credentials)"""
+    return bool(os.environ.get("SMTP_HOST") or (os.environ.get("APP_EMAIL") and os.environ.get("APP_PASSWORD")))
+
+
+class SMTPConnection:
+    """One authenticated SMTP session reused across messages, reopened when it drops or idles"""
+
+    def __init__(self, host=None, port=None, starttls=None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.server = None
+        self.connects = 0
+        self.last_used = 0.0
+
+    def _open(self):
+        import smtplib  # Deferred: only the sender needs it
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            server.starttls()
+        app_email, app_password = os.environ.get("APP_EMAIL"), os.environ.get("APP_PASSWORD")
+        if app_email and app_password:
+            server.login(app_email, app_password)
+        self.server = server
+        self.connects += 1
+
+    def send(self, message):
+        import smtplib
+        if self.server is not None and time.monotonic() - self.last_used > SMTP_IDLE_SECONDS:
+            self.close()
+        if self.server is None:
+            self._open()
+        try:
+            self.server.send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # The server dropped an idle session; reconnect once and retry this message
+            self.close()
+            self._open()
+            self.server.send_message(message)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
+
+
+def build_message(email):
+    """MIME message for an outbox row (anything with to_address, subject, text_body, html_body)"""
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    message = MIMEMultipart('alternative')
+    message['Subject'] = email.subject
+    message['From'] = EMAIL_FROM
+    message['To'] = email.to_address
+    if email.text_body:
+        message.attach(MIMEText(email.text_body, 'plain'))
+    if email.html_body:
+        message.attach(MIMEText(email.html_body, 'html'))
+    return message
+
+
+def backoff_seconds(attempts):
+    """Delay before the next try after `attempts` failures: doubling, capped, with +-20% jitter"""
+    delay = min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _server_unavailable(error):
+    """Connection or login problems that would fail every message, not just this one"""
+    import smtplib
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return True
+    return isinstance(error, OSError) and not isinstance(
+        error, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+
+
+def _is_permanent(error):
+    """Failures retrying won't fix: 5xx replies for this message, refused recipients"""
+    import smtplib
+    if _server_unavailable(error):
+        return False
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and code >= 500
+
+
+def _claim_batch(limit):
+    """Lease up to `limit` due messages to this worker and return them as plain rows"""
+    now = datetime.utcnow()
+    emails = db.session.execute(
+        select(OutboxEmail.id, OutboxEmail.to_address, OutboxEmail.subject,
+               OutboxEmail.text_body, OutboxEmail.html_body, OutboxEmail.attempts)
+        .where(OutboxEmail.status.in_(('pending', 'sending')),  # 'sending' only once its lease expired
+               OutboxEmail.next_attempt_at <= now)
+        .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if emails:
+        db.session.execute(
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_([email.id for email in emails]))
+            .values(status='sending', next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+        )
+    db.session.commit()
+    return emails
+
+
+def _failure_update(email, error):
+    attempts = email.attempts + 1
+    last_error = f"{type(error).__name__}: {error}"[:500]
+    if _is_permanent(error) or attempts >= OUTBOX_MAX_ATTEMPTS:
+        logger.error("Email %s to %s failed permanently: %s", email.id, email.to_address, last_error)
+        return {'id': email.id, 'status': 'failed', 'attempts': attempts, 'last_error': last_error}
+    logger.warning("Email %s to %s failed (attempt %s), retrying: %s",
+                   email.id, email.to_address, attempts, last_error)
+    return {'id': email.id, 'status': 'pending', 'attempts': attempts, 'last_error': last_error,
+            'next_attempt_at': datetime.utcnow() + timedelta(seconds=backoff_seconds(attempts))}
+
+
+def send_batch(connection, limit=None):
+    """
+    Claim and send one batch over `connection` (call inside an app context)
+
+    Returns:
+        Tuple of (sent, failed_attempts); messages handed back after a
+        connection failure count as neither
+    """
+    emails = _claim_batch(limit or OUTBOX_BATCH_SIZE)
+    sent, failures, handed_back = [], [], []
+    for position, email in enumerate(emails):
+        try:
+            with span("smtp.send", "smtp"):
+                connection.send(build_message(email))
+        except Exception as e:
+            connection.close()  # Don't reuse a session in an unknown state
+            failures.append(_failure_update(email, e))
+            if _server_unavailable(e):
+                # Don't spend a connect timeout on every message; hand the rest back untouched
+                handed_back = [waiting.id for waiting in emails[position + 1:]]
+                break
+        else:
+            sent.append(email.id)
+
+    now = datetime.utcnow()
+    if sent:
+        # Bodies are dropped once delivered so verification codes aren't kept around
+        db.session.execute(update(OutboxEmail).where(OutboxEmail.id.in_(sent)).values(
+            status='sent', sent_at=now, text_body=None, html_body=None))
+    if handed_back:
+        db.session.execute(update(OutboxEmail).where(OutboxEmail.id.in_(handed_back)).values(
+            status='pending', next_attempt_at=now + timedelta(seconds=backoff_seconds(1))))
+    for values in failures:
+        db.session.execute(update(OutboxEmail).where(OutboxEmail.id == values.pop('id')).values(**values))
+    if emails:
+        db.session.commit()
+        logger.info("Outbox batch: %s sent, %s failed", len(sent), len(failures))
+    return len(sent), len(failures)
+
+
+def drain_outbox(connection=None):
+    """Send every message that is due now; returns the number sent"""
+    own_connection = connection is None
+    connection = connection or SMTPConnection()
+    total = 0
+    try:
+        while True:
+            sent, failed = send_batch(connection)
+            total += sent
+            if not sent and not failed:
+                return total
+    finally:
+        if own_connection:
+            connection.close()
+
+
+class OutboxWorker(threading.Thread):
+    """Background sender: drains the outbox when woken, and at least every OUTBOX_POLL_SECONDS"""
+
+    def __init__(self, app):
+        super().__init__(name="email-outbox", daemon=True)
+        self.app = app
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.connection = SMTPConnection()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(OUTBOX_POLL_SECONDS)
+            self.wakeup.clear()
+            try:
+                with self.app.app_context():
+                    drain_outbox(self.connection)
+            except Exception:
+                logger.exception("Email outbox worker error")
+            if self.connection.server is not None and time.monotonic() - self.connection.last_used > SMTP_IDLE_SECONDS:
+                self.connection.close()
+        self.connection.close()
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        self.join()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _send_after_response(app):
+    """Send one batch once the current response has been produced"""
+
+    def send():
+        connection = SMTPConnection()
+        try:
+            with app.app_context():
+                send_batch(connection)
+        except Exception:
+            logger.exception("Email outbox send after response failed")
+        finally:
+            connection.close()
+
+    @after_this_request
+    def schedule(response):
+        response.call_on_close(send)
+        return response
+
+
+def _wake_worker(app):
+    global _worker
+    if EMAIL_WORKER == "request":
+        if has_request_context():  # Elsewhere (CLI, scripts) the cron picks it up
+            _send_after_response(app)
+        return
+    if EMAIL_WORKER != "thread":
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(app)
+            _worker.start()
+    _worker.wakeup.set()
+
+
+def enqueue_email(to_address, subject, text_body, html_body=None):
+    """
+    Store a rendered message for the background sender and commit it
+
+    Returns:
+        False when no SMTP server is configured (nothing is queued), else True
+    """
+    from flask import current_app
+    if not smtp_configured():
+        logger.error("Email configuration missing. Set APP_EMAIL and APP_PASSWORD (or SMTP_HOST).")
+        return False
+    db.session.add(OutboxEmail(to_address=to_address, subject=subject,
+                               text_body=text_body, html_body=html_body))
+    db.session.commit()
+    _wake_worker(current_app._get_current_object())
+    return True
+
+
+def init_email_outbox(app):
+    """Register the outbox CLI commands and the cron drain endpoint"""
+
+    @app.route("/internal/send-outbox", methods=["GET", "POST"])
+    def send_outbox():
+        """Drain the outbox (Vercel cron); 404 unless the CRON_SECRET bearer token matches"""
+        secret = os.environ.get("CRON_SECRET")
+        if not secret or not bearer_token_matches(request.headers.get("Authorization"), secret):
+            raise NotFound()
+        return jsonify({"sent": drain_outbox()})
+
+    @app.cli.command("send-outbox")
+    def send_outbox_command():
+        """Send every due outbox message once (for cron)"""
+        print(f"Sent {drain_outbox()} emails")
+
+    @app.cli.command("email-worker")
+    def email_worker_command():
+        """Run the outbox sender in the foreground"""
+        worker = OutboxWorker(app)
+        worker.start()
+        print("Email worker running, Ctrl+C to stop")
+        try:
+            while worker.is_alive():
+                worker.join(1)
+        except KeyboardInterrupt:
+            worker.stop()
@@ -0,0 +1,180 @@
+"""
+"Following" feed for CUR8tr - per-user timelines fanned out on write
+
+When a curator publishes a recommendation it is copied into a bounded
+timeline for each follower (fan-out-on-write). Curators with very large
+follower counts are skipped at write time and merged into the feed at read
+time instead (fan-out-on-read), so a single publish never writes an
+unbounded number of rows.
+"""
+
+import os
+from sqlalchemy import func, select, insert, delete
+from sqlalchemy.orm import joinedload
+from app import db
+from models import Recommendation, Category, Profile, Follow, TimelineEntry
+from pagination import encode_cursor, keyset_before
+
+# Authors with more followers than this are merged into feeds at read time
+FANOUT_FOLLOWER_LIMIT = int(os.environ.get('FEED_FANOUT_FOLLOWER_LIMIT', 5000))
+
+# Maximum number of entries kept in a single user's timeline
+TIMELINE_MAX_LENGTH = int(os.environ.get('FEED_TIMELINE_MAX_LENGTH', 500))
+
+FEED_PAGE_SIZE = 20
+
+
+def get_follower_count(user_id):
+    """Count followers with a single indexed aggregate"""
+    return db.session.query(func.count(Follow.id)).filter(Follow.followed_id == user_id).scalar()
+
+
+def fan_out_recommendation(recommendation):
+    """
+    Copy a newly published recommendation into each follower's timeline
+
+    Returns the number of timeline rows written. Authors above
+    FANOUT_FOLLOWER_LIMIT are served by fan-out-on-read and write nothing.
+    The caller owns the transaction.
+    """
+    author_id = recommendation.category.profile.user_id
+
+    if get_follower_count(author_id) > FANOUT_FOLLOWER_LIMIT:
+        return 0
+
+    follower_ids = db.session.scalars(
+        select(Follow.follower_id).where(Follow.followed_id == author_id)
+    ).all()
+    if not follower_ids:
+        return 0
+
+    db.session.execute(insert(TimelineEntry), [
+        {
+            'user_id': follower_id,
+            'author_id': author_id,
+            'recommendation_id': recommendation.id,
+            'created_at': recommendation.created_at,
+        }
+        for follower_id in follower_ids
+    ])
+    trim_timelines(follower_ids)
+    return len(follower_ids)
+
+
+def backfill_timeline(follower_id, followed_id):
+    """
+    Seed a timeline with the recent recommendations of a newly followed curator
+
+    The caller owns the transaction.
+    """
+    if get_follower_count(followed_id) > FANOUT_FOLLOWER_LIMIT:
+        return 0
+
+    already_present = select(TimelineEntry.recommendation_id).where(TimelineEntry.user_id == follower_id)
+    recent = db.session.execute(
+        select(Recommendation.id, Recommendation.created_at)
+        .join(Category).join(Profile)
+        .where(Profile.user_id == followed_id, Recommendation.id.not_in(already_present))
+        .order_by(Recommendation.created_at.desc(), Recommendation.id.desc())
+        .limit(TIMELINE_MAX_LENGTH)
+    ).all()
+    if not recent:
+        return 0
+
+    db.session.execute(insert(TimelineEntry), [
+        {
+            'user_id': follower_id,
+            'author_id': followed_id,
+            'recommendation_id': rec_id,
+            'created_at': created_at,
+        }
+        for rec_id, created_at in recent
+    ])
+    trim_timelines([follower_id])
+    return len(recent)
+
+
+def remove_author_from_timeline(follower_id, followed_id):
+    """Drop an unfollowed curator's entries from a timeline"""
+    db.session.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.author_id == followed_id
+        )
+    )
+
+
+def trim_timelines(user_ids):
+    """Keep only the newest TIMELINE_MAX_LENGTH entries for each given timeline"""
+    ranked = select(
+        TimelineEntry.id,
+        func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(TimelineEntry.created_at.desc(), TimelineEntry.recommendation_id.desc())
+        ).label('position')
+    ).where(TimelineEntry.user_id.in_(user_ids)).subquery()
+
+    db.session.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.id.in_(select(ranked.c.id).where(ranked.c.position > TIMELINE_MAX_LENGTH))
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def _feed_query():
+    """Base query for feed recommendations with category and profile eager-loaded"""
+    return db.session.query(Recommendation).join(Category).join(Profile).filter(
+        Profile.is_public == True
+    ).options(
+        joinedload(Recommendation.category).joinedload(Category.profile)
+    )
+
+
+def get_feed(user_id, cursor=None, limit=FEED_PAGE_SIZE):
+    """
+    Get one page of the "Following" feed for a user
+
+    Args:
+        user_id: The viewing user's id
+        cursor: Decoded (created_at, id) keyset position, or None for the first page
+        limit: Page size
+
+    Returns:
+        Tuple of (recommendations, next_cursor) where next_cursor is None on the last page
+    """
+    # Fan-out-on-write part: precomputed timeline rows
+    timeline_query = _feed_query().join(
+        TimelineEntry, TimelineEntry.recommendation_id == Recommendation.id
+    ).filter(TimelineEntry.user_id == user_id)
+    if cursor:
+        timeline_query = timeline_query.filter(
+            keyset_before(TimelineEntry.created_at, TimelineEntry.recommendation_id, cursor)
+        )
+    recommendations = timeline_query.order_by(
+        TimelineEntry.created_at.desc(), TimelineEntry.recommendation_id.desc()
+    ).limit(limit + 1).all()
+
+    # Fan-out-on-read part: followed curators too large to fan out on write
+    follower_counts = select(func.count(Follow.id)).where(
+        Follow.followed_id == Profile.user_id
+    ).correlate(Profile).scalar_subquery()
+    followed_ids = select(Follow.followed_id).where(Follow.follower_id == user_id)
+
+    large_author_query = _feed_query().filter(
+        Profile.user_id.in_(followed_ids),
+        follower_counts > FANOUT_FOLLOWER_LIMIT
+    )
+    if cursor:
+        large_author_query = large_author_query.filter(
+            keyset_before(Recommendation.created_at, Recommendation.id, cursor)
+        )
+    recommendations += large_author_query.order_by(
+        Recommendation.created_at.desc(), Recommendation.id.desc()
+    ).limit(limit + 1).all()
+
+    # Merge both sources, newest first
+    merged = {rec.id: rec for rec in recommendations}.values()
+    page = sorted(merged, key=lambda rec: (rec.created_at, rec.id), reverse=True)
+
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
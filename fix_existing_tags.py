@@ -2,31 +2,37 @@
 """
 Migration script to fix existing recommendations that have None for tags.
 This should be run once to ensure all existing recommendations have proper tag structure.
+
+Runs in batches on the data_migrations framework:
+    python fix_existing_tags.py [--dry-run] [--batch-size N] [--restart]
 """
 
-from app import app
+from sqlalchemy import select, update, or_, cast, Text
+from data_migrations import DataMigration, run_cli
 from models import db, Recommendation
 
-def fix_existing_tags():
-    """Fix existing recommendations with None tags"""
-    with app.app_context():
-        # Find all recommendations where tags is None
-        recommendations_with_none_tags = Recommendation.query.filter(
-            Recommendation.tags.is_(None)
-        ).all()
-        
-        print(f"Found {len(recommendations_with_none_tags)} recommendations with None tags")
-        
-        # Update each recommendation to have empty tags dictionary
-        for rec in recommendations_with_none_tags:
-            rec.tags = {}
-            print(f"Fixed recommendation {rec.id}: '{rec.title}'")
-        
-        # Commit all changes
-        db.session.commit()
-        print(f"Successfully updated {len(recommendations_with_none_tags)} recommendations")
+
+class FixExistingTags(DataMigration):
+    """Give recommendations with SQL NULL or JSON null tags an empty tags dictionary"""
+
+    name = "fix_existing_tags"
+    key = Recommendation.__table__.c.id
+
+    def source(self):
+        return select(Recommendation.id).where(or_(
+            Recommendation.tags.is_(None),
+            cast(Recommendation.tags, Text) == 'null',
+        ))
+
+    def apply(self, rows):
+        result = db.session.execute(
+            update(Recommendation)
+            .where(Recommendation.id.in_([row.id for row in rows]))
+            .values(tags={})
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
 
 if __name__ == "__main__":
-    print("Starting migration to fix existing tags...")
-    fix_existing_tags()
-    print("Migration completed!")
\ No newline at end of file
+    run_cli(FixExistingTags())
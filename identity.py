@@ -0,0 +1,37 @@
+"""
+Request-scoped identity for CUR8tr
+
+The logged-in user and their profile are loaded together in one query the
+first time anything asks for them during a request, then cached on flask.g.
+Decorators, views, blueprints and templates all share that single load.
+"""
+
+from flask import g, session
+from sqlalchemy.orm import joinedload
+from app import db
+from models import User
+from metrics import record_cache_lookup
+
+_UNSET = object()
+
+
+def get_current_user():
+    """Get the logged-in user (with profile eager-loaded), or None"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+
+    cached = g.get('_current_user', _UNSET)
+    hit = cached is not _UNSET and g.get('_current_user_id') == user_id
+    record_cache_lookup('current_user', hit)
+    if not hit:
+        cached = db.session.get(User, user_id, options=[joinedload(User.profile)])
+        g._current_user = cached
+        g._current_user_id = user_id
+    return cached
+
+
+def get_current_profile():
+    """Get the logged-in user's profile, or None"""
+    user = get_current_user()
+    return user.profile if user else None
@@ -0,0 +1,128 @@
+"""
+Atomic tag updates for CUR8tr - JSON edits done by the database, not read-modify-write
+
+Recommendation.tags is a JSON document like {"categories": [...], "collections": [...]}.
+Adding or removing a tag is one UPDATE ... RETURNING that edits the stored
+document in place, so two concurrent edits on the same recommendation both
+land, only the tag travels over the wire, and the caller gets the resulting
+tags back in the same round trip.
+
+PostgreSQL uses jsonb operators (`?`, `||`, `-`, jsonb_set); SQLite uses the
+json1 functions (json_set, json_insert, json_each). Both follow the same rules
+as the old Python code: adding to an empty document creates both lists, and
+removing from an empty document changes nothing.
+"""
+
+from datetime import datetime
+from sqlalchemy import update, select, exists, case, cast, type_coerce, literal, func, and_, Boolean, Text, JSON
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
+from app import db
+from models import Recommendation
+
+EMPTY_TAGS = '{"categories": [], "collections": []}'
+
+TAG_KEYS = {'category': 'categories', 'collection': 'collections'}
+
+
+def _text(value):
+    # Bound as plain text; a JSON-typed bind would serialize the string into a JSON string
+    return literal(value, Text)
+
+
+def _jsonb(value):
+    return cast(_text(value), JSONB)
+
+
+def _path(key):
+    return cast(_text('{%s}' % key), ARRAY(Text))
+
+
+def _postgres_add(tags, key, tag_slug):
+    doc = cast(tags, JSONB)
+    base = case(
+        (and_(func.jsonb_typeof(doc) == 'object', doc != _jsonb('{}')), doc),
+        else_=_jsonb(EMPTY_TAGS),
+    )
+    current = func.coalesce(base.op('->', return_type=JSONB)(_text(key)), _jsonb('[]'))
+    appended = case(
+        (current.op('?', return_type=Boolean)(_text(tag_slug)), current),
+        else_=current.op('||', return_type=JSONB)(func.jsonb_build_array(_text(tag_slug))),
+    )
+    return cast(func.jsonb_set(base, _path(key), appended), JSON)
+
+
+def _postgres_remove(tags, keys, tag_slug):
+    doc = cast(tags, JSONB)
+    edited = doc
+    for key in keys:
+        remaining = edited.op('->', return_type=JSONB)(_text(key)).op('-', return_type=JSONB)(_text(tag_slug))
+        edited = case(
+            (edited.op('?', return_type=Boolean)(_text(key)), func.jsonb_set(edited, _path(key), remaining)),
+            else_=edited,
+        )
+    return cast(case((func.jsonb_typeof(doc) == 'object', edited), else_=doc), JSON)
+
+
+def _sqlite_add(tags, key, tag_slug):
+    doc = type_coerce(tags, Text)
+    path = f'$.{key}'
+    base = case((and_(func.json_type(doc) == 'object', doc != '{}'), doc), else_=EMPTY_TAGS)
+    current = func.coalesce(func.json_extract(base, path), '[]')
+    existing = func.json_each(current).table_valued('value').alias('tag')
+    present = exists(select(1).select_from(existing).where(existing.c.value == tag_slug))
+    appended = func.json(case((present, current), else_=func.json_insert(current, '$[#]', tag_slug)))
+    return func.json_set(base, path, appended)
+
+
+def _sqlite_remove(tags, keys, tag_slug):
+    doc = type_coerce(tags, Text)
+    edited = doc
+    for key in keys:
+        path = f'$.{key}'
+        kept = func.json_each(edited, path).table_valued('value').alias('tag')
+        remaining = select(func.json_group_array(kept.c.value)).where(kept.c.value != tag_slug).scalar_subquery()
+        edited = func.json_replace(edited, path, func.json(remaining))
+    return case((func.json_type(doc) == 'object', edited), else_=doc)
+
+
+def _execute(rec_id, new_tags):
+    """Run the UPDATE and return the stored tags (None if the row doesn't exist)"""
+    statement = (
+        update(Recommendation)
+        .where(Recommendation.id == rec_id)
+        .values(tags=new_tags, updated_at=datetime.utcnow())
+        .returning(Recommendation.tags)
+        .execution_options(synchronize_session=False)
+    )
+    return db.session.execute(statement).scalar_one_or_none()
+
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def add_tag(rec_id, tag_slug, tag_type='collection'):
+    """
+    Append tag_slug to one tag list unless it is already there
+
+    Returns:
+        The recommendation's tags after the update
+    """
+    key = TAG_KEYS.get(tag_type, 'collections')
+    build = _postgres_add if _is_postgres() else _sqlite_add
+    return _execute(rec_id, build(Recommendation.tags, key, tag_slug))
+
+
+def remove_tag(rec_id, tag_slug, tag_type=None):
+    """
+    Remove tag_slug from one tag list, or from both when tag_type is None
+
+    Returns:
+        The recommendation's tags after the update
+    """
+    if tag_type is None:
+        keys = list(TAG_KEYS.values())
+    else:
+        keys = [TAG_KEYS[tag_type]] if tag_type in TAG_KEYS else []
+    build = _postgres_remove if _is_postgres() else _sqlite_remove
+    return _execute(rec_id, build(Recommendation.tags, keys, tag_slug))
@@ -0,0 +1,66 @@
+"""
+Likers lists for CUR8tr recommendations
+
+The recommendation page shows a capped preview of who liked it plus the total
+count; the full list is paged on demand. Likers come from one projection that
+joins username and profile name/slug, never the full User/Profile rows.
+"""
+
+from sqlalchemy import select, func
+from app import db
+from models import Like, User, Profile
+from pagination import encode_cursor, keyset_before
+
+LIKERS_PREVIEW_SIZE = 12
+LIKERS_PAGE_SIZE = 50
+
+
+def get_like_count(recommendation_id):
+    """Total number of likes on a recommendation"""
+    return db.session.scalar(
+        select(func.count(Like.id)).where(Like.recommendation_id == recommendation_id)
+    )
+
+
+def is_liked_by(recommendation_id, user_id):
+    """Check a single like through the unique (user_id, recommendation_id) index"""
+    if not user_id:
+        return False
+    return db.session.scalar(
+        select(Like.id).where(Like.user_id == user_id, Like.recommendation_id == recommendation_id)
+    ) is not None
+
+
+def get_likers_page(recommendation_id, cursor=None, limit=LIKERS_PAGE_SIZE):
+    """
+    Get one page of likers, most recent first
+
+    Args:
+        recommendation_id: Recommendation whose likers to list
+        cursor: Decoded (created_at, id) keyset position, or None for the first page
+        limit: Page size
+
+    Returns:
+        Tuple of (rows, next_cursor). Each row has id, created_at, user_id,
+        username, name and slug attributes.
+    """
+    query = select(
+        Like.id,
+        Like.created_at,
+        Like.user_id,
+        User.username,
+        Profile.name,
+        Profile.slug,
+    ).join(User, Like.user_id == User.id).outerjoin(
+        Profile, Profile.user_id == User.id
+    ).where(Like.recommendation_id == recommendation_id)
+
+    if cursor:
+        query = query.where(keyset_before(Like.created_at, Like.id, cursor))
+
+    rows = db.session.execute(
+        query.order_by(Like.created_at.desc(), Like.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,145 @@
+"""
+Logging setup for CUR8tr - non-blocking, structured, sampled
+
+Request threads never touch log I/O. Records go through a QueueHandler onto a
+bounded in-memory queue. A background QueueListener thread formats them as
+one JSON object per line and writes them out. If the queue is full the record
+is dropped and counted instead of blocking the request.
+
+Environment:
+    LOG_LEVEL         Root level (default INFO)
+    LOG_LEVELS        Per-logger levels, e.g. "sqlalchemy.engine=WARNING,cur8tr.auth=DEBUG"
+    LOG_SAMPLE_RATES  Per-logger sampling for records below WARNING, e.g. "werkzeug=0.1,cur8tr.auth=0.25"
+    LOG_FORMAT        "json" (default) or "text" for local reading
+    LOG_QUEUE_SIZE    Records buffered before dropping (default 10000)
+"""
+
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import request, has_request_context
+
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request"}
+
+_listeners = []
+
+
+def _parse_mapping(value):
+    """Parse "a=1,b.c=2" into {"a": "1", "b.c": "2"}"""
+    pairs = (item.split("=", 1) for item in (value or "").split(",") if "=" in item)
+    return {name.strip(): setting.strip() for name, setting in pairs}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including request fields and `extra` values"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if getattr(record, "request", None):
+            entry["request"] = record.request
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of sub-WARNING records per logger (longest matching prefix wins)"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = sorted(((name, float(rate)) for name, rate in rates.items()),
+                            key=lambda item: -len(item[0]))
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + "."):
+                return random.random() < rate
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that resolves the record on the caller thread and never waits for space"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)  # Other handlers still see the original
+        # Capture request details here; the listener thread has no request context
+        if has_request_context():
+            record.request = {"method": request.method, "path": request.path, "endpoint": request.endpoint}
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+def queued_handler(handler):
+    """
+    Wrap a blocking handler so its I/O happens on a background thread
+
+    Returns:
+        A NonBlockingQueueHandler feeding `handler` through its own listener
+    """
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return NonBlockingQueueHandler(records)
+
+
+def _stop_listeners():
+    for listener in _listeners:
+        listener.stop()  # Flushes whatever is still queued
+
+
+atexit.register(_stop_listeners)
+
+
+def setup_logging():
+    """Install the queued root handler and apply env level/sampling settings (idempotent)"""
+    root = logging.getLogger()
+    if any(isinstance(handler, NonBlockingQueueHandler) for handler in root.handlers):
+        return
+
+    stream = logging.StreamHandler(sys.stderr)
+    if os.environ.get("LOG_FORMAT", "json").lower() == "text":
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    handler = queued_handler(stream)
+    handler.addFilter(SamplingFilter(_parse_mapping(os.environ.get("LOG_SAMPLE_RATES"))))
+    root.addHandler(handler)
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+    for name, level in _parse_mapping(os.environ.get("LOG_LEVELS")).items():
+        logging.getLogger(name).setLevel(level.upper())
@@ -0,0 +1,154 @@
+"""
+Prometheus metrics for CUR8tr - request latency, DB pool, template, image and cache stats
+
+Metrics are aggregated in-process by prometheus_client and served at
+/metrics (see routes_probe.py). Everything here is a counter increment or a
+histogram observe, so the per-request cost is a few microseconds.
+
+Multi-process workers: set PROMETHEUS_MULTIPROC_DIR to an empty, writable
+directory before the app starts. Each worker then writes its samples to
+files in that directory and /metrics aggregates across all of them. Gauges
+use "livesum" so values from exited workers drop out; under gunicorn call
+prometheus_client.multiprocess.mark_process_dead(worker.pid) from the
+child_exit hook.
+"""
+
+import os
+import time
+from flask import g, request, template_rendered, before_render_template, has_app_context
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "cur8tr_http_request_duration_seconds", "Request latency by endpoint",
+    ["endpoint", "method"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "cur8tr_http_requests_total", "Requests by endpoint and status",
+    ["endpoint", "method", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "cur8tr_http_requests_in_progress", "Requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+POOL_CHECKOUTS = Counter(
+    "cur8tr_db_pool_checkouts_total", "Connections checked out of the pool", ["bind"],
+)
+POOL_CHECKED_OUT = Gauge(
+    "cur8tr_db_pool_checked_out", "Connections currently checked out", ["bind"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "cur8tr_db_pool_overflow", "Connections open beyond pool_size (QueuePool only)", ["bind"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "cur8tr_db_pool_checkout_seconds", "Time to get a connection: queue wait plus any new connect",
+    ["bind"], buckets=FAST_BUCKETS,
+)
+
+TEMPLATE_RENDER_SECONDS = Histogram(
+    "cur8tr_template_render_seconds", "Jinja render time by template",
+    ["template"], buckets=FAST_BUCKETS,
+)
+IMAGE_PROCESSING_SECONDS = Histogram(
+    "cur8tr_image_processing_seconds", "Image work (placeholders, QR codes) by operation",
+    ["operation"], buckets=FAST_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cur8tr_cache_lookups_total", "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+
+
+def record_cache_lookup(cache, hit):
+    """Count one cache lookup; hit ratio is hits / (hits + misses)"""
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _endpoint_label():
+    return request.endpoint or "none"
+
+
+def _instrument_pool(engine, bind):
+    """Attach checkout/checkin listeners and time Pool.connect for one engine"""
+    pool = engine.pool
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.labels(bind).inc()
+        POOL_CHECKED_OUT.labels(bind).inc()
+        if isinstance(pool, QueuePool):
+            POOL_OVERFLOW.labels(bind).set(max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.labels(bind).dec()
+
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(bind).observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+def init_metrics(app, db):
+    """Register request hooks, template signals and pool listeners"""
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get("_metrics_started")
+        if started is not None:
+            endpoint = _endpoint_label()
+            REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def finish_request_timer(exc):
+        if g.pop("_metrics_started", None) is not None:
+            REQUESTS_IN_PROGRESS.dec()
+
+    def start_template_timer(sender, template, context, **extra):
+        if has_app_context():
+            g.setdefault("_template_timers", []).append(time.perf_counter())
+
+    def observe_template(sender, template, context, **extra):
+        timers = g.get("_template_timers") if has_app_context() else None
+        if timers:
+            TEMPLATE_RENDER_SECONDS.labels(template.name or "string").observe(time.perf_counter() - timers.pop())
+
+    before_render_template.connect(start_template_timer, app, weak=False)
+    template_rendered.connect(observe_template, app, weak=False)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            _instrument_pool(engine, bind_key or "default")
+
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, Text, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Integer, String, Text, Boolean, DateTime, Float, ForeignKey, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List, Optional
 from app import db
 import re
@@ -30,7 +31,7 @@ class User(db.Model):
         """Get the number of followers for this user's profile"""
         if not self.profile:
             return 0
-        return len(self.followers)
+        return Follow.query.filter_by(followed_id=self.id).count()
     
     def is_following(self, user):
         """Check if this user is following another user"""
@@ -111,17 +112,19 @@ class Recommendation(db.Model):
     category: Mapped["Category"] = relationship("Category", back_populates="recommendations")
     likes: Mapped[List["Like"]] = relationship("Like", back_populates="recommendation", cascade="all, delete-orphan")
     comments: Mapped[List["Comment"]] = relationship("Comment", back_populates="recommendation", cascade="all, delete-orphan", order_by="Comment.created_at.desc()")
+    timeline_entries: Mapped[List["TimelineEntry"]] = relationship("TimelineEntry", back_populates="recommendation", cascade="all, delete-orphan", passive_deletes=True)
+    trending: Mapped[Optional["TrendingScore"]] = relationship("TrendingScore", back_populates="recommendation", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
     
     def get_like_count(self):
         """Get the number of likes for this recommendation"""
-        return len(self.likes)
+        return Like.query.filter_by(recommendation_id=self.id).count()
     
     def is_liked_by(self, user):
         """Check if this recommendation is liked by a specific user"""
         if not user:
             return False
-        return any(like.user_id == user.id for like in self.likes)
+        return Like.query.filter_by(recommendation_id=self.id, user_id=user.id).first() is not None
     
     def get_google_maps_link(self):
         """Generate a Google Maps link for the location"""
@@ -149,42 +152,24 @@ class Recommendation(db.Model):
         return tags
     
     def add_tag(self, tag_name, tag_type='collection'):
-        """Add a tag to this recommendation"""
-        if not self.tags:
-            self.tags = {'categories': [], 'collections': []}
-        
-        tag_slug = slugify(tag_name)
-        if tag_type == 'category':
-            if tag_slug not in self.tags.get('categories', []):
-                if 'categories' not in self.tags:
-                    self.tags['categories'] = []
-                self.tags['categories'].append(tag_slug)
-        else:
-            if tag_slug not in self.tags.get('collections', []):
-                if 'collections' not in self.tags:
-                    self.tags['collections'] = []
-                self.tags['collections'].append(tag_slug)
-        
-        # Mark as modified for SQLAlchemy
-        self.tags = self.tags.copy()
+        """Add a tag to this recommendation with one atomic UPDATE; returns the new tags"""
+        from json_tags import add_tag
+        return self._store_tags(add_tag(self._flushed_id(), slugify(tag_name), tag_type))
     
     def remove_tag(self, tag_name, tag_type=None):
-        """Remove a tag from this recommendation"""
-        if not self.tags:
-            return
-        
-        tag_slug = slugify(tag_name)
-        
-        if tag_type == 'category' or tag_type is None:
-            if 'categories' in self.tags and tag_slug in self.tags['categories']:
-                self.tags['categories'].remove(tag_slug)
-        
-        if tag_type == 'collection' or tag_type is None:
-            if 'collections' in self.tags and tag_slug in self.tags['collections']:
-                self.tags['collections'].remove(tag_slug)
-        
-        # Mark as modified for SQLAlchemy
-        self.tags = self.tags.copy()
+        """Remove a tag from this recommendation with one atomic UPDATE; returns the new tags"""
+        from json_tags import remove_tag
+        return self._store_tags(remove_tag(self._flushed_id(), slugify(tag_name), tag_type))
+    
+    def _flushed_id(self):
+        if self.id is None:
+            db.session.flush()
+        return self.id
+    
+    def _store_tags(self, tags):
+        # Load the database's result as the committed value so it isn't written back
+        set_committed_value(self, 'tags', tags)
+        return tags
     
     def has_tag(self, tag_name):
         """Check if recommendation has a specific tag"""
@@ -220,8 +205,11 @@ class Follow(db.Model):
     follower: Mapped["User"] = relationship("User", foreign_keys=[follower_id], back_populates="following")
     followed: Mapped["User"] = relationship("User", foreign_keys=[followed_id], back_populates="followers")
     
-    # Unique constraint to prevent duplicate follows
-    __table_args__ = (db.UniqueConstraint('follower_id', 'followed_id', name='unique_follow'),)
+    # Unique constraint to prevent duplicate follows; followed_id index serves follower lookups for feed fan-out
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'followed_id', name='unique_follow'),
+        db.Index('ix_follows_followed_id', 'followed_id'),
+    )
     
     def __repr__(self):
         return f'<Follow {self.follower_id} -> {self.followed_id}>'
@@ -238,8 +226,11 @@ class Like(db.Model):
     user: Mapped["User"] = relationship("User", back_populates="likes")
     recommendation: Mapped["Recommendation"] = relationship("Recommendation", back_populates="likes")
     
-    # Unique constraint to prevent duplicate likes
-    __table_args__ = (db.UniqueConstraint('user_id', 'recommendation_id', name='unique_like'),)
+    # Unique constraint to prevent duplicate likes; second index serves per-recommendation likers pages
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recommendation_id', name='unique_like'),
+        db.Index('ix_likes_recommendation_created', 'recommendation_id', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f'<Like {self.user_id} -> {self.recommendation_id}>'
@@ -258,5 +249,119 @@ class Comment(db.Model):
     user: Mapped["User"] = relationship("User", back_populates="comments")
     recommendation: Mapped["Recommendation"] = relationship("Recommendation", back_populates="comments")
     
+    # Keyset paging index for comment pages
+    __table_args__ = (db.Index('ix_comments_recommendation_created', 'recommendation_id', 'created_at', 'id'),)
+    
     def __repr__(self):
         return f'<Comment {self.id} by {self.user_id} on {self.recommendation_id}>'
+
+class TimelineEntry(db.Model):
+    """Precomputed "Following" feed row: one recommendation fanned out to one follower"""
+    __tablename__ = 'timeline_entries'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    author_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    recommendation_id: Mapped[int] = mapped_column(Integer, ForeignKey('recommendations.id', ondelete='CASCADE'), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Copied from the recommendation for keyset paging
+    
+    # Relationships
+    recommendation: Mapped["Recommendation"] = relationship("Recommendation", back_populates="timeline_entries")
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recommendation_id', name='unique_timeline_entry'),
+        db.Index('ix_timeline_user_created', 'user_id', 'created_at', 'recommendation_id'),
+    )
+    
+    def __repr__(self):
+        return f'<TimelineEntry {self.recommendation_id} -> {self.user_id}>'
+
+class FollowSuggestion(db.Model):
+    """Offline-computed "who to follow" suggestion, rebuilt by build_follow_suggestions.py"""
+    __tablename__ = 'follow_suggestions'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    suggested_user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    rank: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'suggested_user_id', name='unique_follow_suggestion'),
+        db.Index('ix_follow_suggestions_user_rank', 'user_id', 'rank'),
+    )
+    
+    def __repr__(self):
+        return f'<FollowSuggestion {self.suggested_user_id} for {self.user_id}>'
+
+class RelatedRecommendation(db.Model):
+    """Precomputed item-to-item neighbor, maintained by build_related_recommendations.py"""
+    __tablename__ = 'related_recommendations'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    recommendation_id: Mapped[int] = mapped_column(Integer, ForeignKey('recommendations.id', ondelete='CASCADE'), nullable=False)
+    related_id: Mapped[int] = mapped_column(Integer, ForeignKey('recommendations.id', ondelete='CASCADE'), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    rank: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)  # When this neighbor list was computed
+    
+    __table_args__ = (
+        db.UniqueConstraint('recommendation_id', 'related_id', name='unique_related_recommendation'),
+        db.Index('ix_related_recommendations_rank', 'recommendation_id', 'rank'),
+        db.Index('ix_related_recommendations_related_id', 'related_id'),
+    )
+    
+    def __repr__(self):
+        return f'<RelatedRecommendation {self.related_id} for {self.recommendation_id}>'
+
+class TrendingScore(db.Model):
+    """Time-decayed popularity of a recommendation, updated incrementally by trending.record_event"""
+    __tablename__ = 'trending_scores'
+    
+    recommendation_id: Mapped[int] = mapped_column(Integer, ForeignKey('recommendations.id', ondelete='CASCADE'), primary_key=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)  # Decayed score as of scored_at
+    scored_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    trending_key: Mapped[Optional[float]] = mapped_column(Float, index=True)  # Time-independent sort key, see trending.py
+    
+    # Relationships
+    recommendation: Mapped["Recommendation"] = relationship("Recommendation", back_populates="trending")
+    
+    def __repr__(self):
+        return f'<TrendingScore {self.recommendation_id}: {self.score:.2f}>'
+
+class MigrationCheckpoint(db.Model):
+    """Progress of a chunked data migration (data_migrations.py), so an interrupted run resumes"""
+    __tablename__ = 'migration_checkpoints'
+    
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_key: Mapped[Optional[int]] = mapped_column(Integer)  # Highest source key already processed
+    rows_seen: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_changed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    
+    def __repr__(self):
+        return f'<MigrationCheckpoint {self.name} at {self.last_key}>'
+
+class OutboxEmail(db.Model):
+    """Rendered email waiting for the background sender (email_outbox.py)"""
+    __tablename__ = 'email_outbox'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    to_address: Mapped[str] = mapped_column(String(120), nullable=False)
+    subject: Mapped[str] = mapped_column(String(200), nullable=False)
+    text_body: Mapped[Optional[str]] = mapped_column(Text)  # Bodies are cleared once sent
+    html_body: Mapped[Optional[str]] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)  # Retry time, or lease expiry while sending
+    last_error: Mapped[Optional[str]] = mapped_column(String(500))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    
+    __table_args__ = (db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),)
+    
+    def __repr__(self):
+        return f'<OutboxEmail {self.id} to {self.to_address} ({self.status})>'
@@ -0,0 +1,38 @@
+"""
+Keyset pagination helpers for CUR8tr
+
+Pages are ordered newest first by (created_at, id) and continued with an
+opaque cursor taken from the last row of the previous page, so deep pages
+cost the same as the first one.
+"""
+
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+MAX_ROW_ID = 2 ** 63  # BIGINT range; larger ids overflow the driver or the comparison
+
+
+def encode_cursor(row):
+    """Build an opaque keyset cursor from the last row on a page"""
+    return f"{row.created_at.isoformat()}_{row.id}"
+
+
+def decode_cursor(cursor):
+    """
+    Parse a keyset cursor into (created_at, id)
+
+    Raises ValueError for malformed cursors, including ones that parse but
+    could never have come from encode_cursor (timezone-aware times, ids the
+    database can't compare), so callers can answer 400 instead of 500.
+    """
+    created_at, _, row_id = cursor.rpartition('_')
+    created_at, row_id = datetime.fromisoformat(created_at), int(row_id)
+    if created_at.tzinfo is not None or not 0 < row_id < MAX_ROW_ID:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created_at, row_id
+
+
+def keyset_before(created_col, id_col, cursor):
+    """Keyset condition for rows strictly older than the cursor position"""
+    created_at, row_id = cursor
+    return or_(created_col < created_at, and_(created_col == created_at, id_col < row_id))
@@ -0,0 +1,136 @@
+"""
+Password hashing for CUR8tr - off the request thread, bounded, tunable cost
+
+Hashing and verification are deliberately slow (scrypt by default), so they
+run in a small process pool instead of on the request thread. At most
+PASSWORD_POOL_QUEUE jobs may be running or waiting. The next caller gets
+HasherBusy, a 429 with Retry-After, right away instead of queueing behind a
+burst of logins.
+
+verify_password also reports when a stored hash uses different parameters
+from PASSWORD_HASH_METHOD. In that case it returns a fresh hash, computed in
+the same pool job, which login saves so hashes follow the configured cost.
+
+Environment:
+    PASSWORD_HASH_METHOD   werkzeug method string (default "scrypt:32768:8:1";
+                           e.g. "pbkdf2:sha256:600000")
+    PASSWORD_SALT_LENGTH   Salt characters (default 16)
+    PASSWORD_POOL_WORKERS  Hashing processes; 0 hashes on the calling thread
+                           (default: CPU count capped at 4, 0 in production where
+                           each serverless instance serves one request at a time)
+    PASSWORD_POOL_QUEUE    Jobs running or waiting before callers get a 429 (default workers * 4)
+    PASSWORD_POOL_TIMEOUT  Seconds to wait for a result before giving up with a 429 (default 10)
+
+This module is imported by the pool's worker processes, so it must not import the app.
+"""
+
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.exceptions import TooManyRequests
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", 16))
+
+_default_workers = 0 if os.environ.get("ENVIRONMENT") == "production" else min(os.cpu_count() or 1, 4)
+PASSWORD_POOL_WORKERS = int(os.environ.get("PASSWORD_POOL_WORKERS", _default_workers))
+PASSWORD_POOL_QUEUE = int(os.environ.get("PASSWORD_POOL_QUEUE", max(PASSWORD_POOL_WORKERS, 1) * 4))
+PASSWORD_POOL_TIMEOUT = float(os.environ.get("PASSWORD_POOL_TIMEOUT", 10))
+
+
+class HasherBusy(TooManyRequests):
+    """Raised when the hashing pool is saturated; renders as 429 with Retry-After"""
+
+    description = "Too many password checks are in progress right now. Please try again in a moment."
+
+    def __init__(self):
+        super().__init__(retry_after=1)
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _hash_prefix(stored_hash):
+    """Method and parameters part of a werkzeug hash, e.g. "scrypt:32768:8:1" """
+    return stored_hash.split("$", 1)[0]
+
+
+def _verify(stored_hash, password, method, salt_length):
+    """(valid, new_hash) where new_hash is set when a valid hash should be upgraded"""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if _hash_prefix(stored_hash) == method:
+        return True, None
+    new_hash = _hash(password, method, salt_length)
+    # "scrypt" and "scrypt:32768:8:1" are the same parameters; only rehash on a real change
+    if _hash_prefix(new_hash) == _hash_prefix(stored_hash):
+        return True, None
+    return True, new_hash
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(PASSWORD_POOL_QUEUE, 1))
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded web process (logging, outbox threads) isn't safe
+            _pool = ProcessPoolExecutor(PASSWORD_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_shutdown_pool)
+
+
+def _run(function, *args):
+    """Run a hashing job within the queue limit, in the pool when there is one"""
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise HasherBusy()
+    if PASSWORD_POOL_WORKERS <= 0:
+        try:
+            return function(*args)
+        finally:
+            slots.release()
+
+    try:
+        future = _get_pool().submit(function, *args)
+    except BaseException:
+        slots.release()
+        raise
+    # A job that times out keeps running (or waiting) in the pool, so its slot is
+    # freed when it actually finishes, not when the caller gives up on it
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=PASSWORD_POOL_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        raise HasherBusy()
+
+
+def hash_password(password):
+    """Hash a new password with the configured method (may raise HasherBusy)"""
+    return _run(_hash, password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH)
+
+
+def verify_password(stored_hash, password):
+    """
+    Check a password against its stored hash (may raise HasherBusy)
+
+    Returns:
+        Tuple of (valid, new_hash); new_hash is a replacement to store when the
+        password is valid but was hashed with other parameters, else None
+    """
+    return _run(_verify, stored_hash, password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH)
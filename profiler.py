@@ -0,0 +1,168 @@
+"""
+On-demand request profiler for CUR8tr - sampled stacks for a single request
+
+An admin can profile one request by sending the header `X-Profile: 1` or
+adding `?_profile=1` to the URL. A background thread samples the request
+thread's Python stack every PROFILE_INTERVAL_MS until the response is ready,
+then writes two files to PROFILE_DIR:
+
+- <name>.speedscope.json - open at https://www.speedscope.app
+- <name>.collapsed.txt   - folded stacks for flamegraph.pl / speedscope / inferno
+
+The file name is returned in the X-Profile-File response header. Requests
+without the trigger only pay for one header and one query-string lookup.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from identity import get_current_user
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 2))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 30))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_ARG = "_profile"
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval from a helper thread"""
+
+    def __init__(self, thread_id, interval, max_seconds):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples = []  # (stack of (name, file, line) root-first, weight in seconds)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        last = self.started
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now - self.started > self.max_seconds:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.samples.append((tuple(stack), now - last))
+            last = now
+
+    def to_collapsed(self):
+        """Folded stacks: 'root;child;leaf <sample count>' per line"""
+        counts = Counter(
+            ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            for stack, _ in self.samples
+        )
+        return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
+
+    def to_speedscope(self, name):
+        """Speedscope 'sampled' profile document"""
+        frame_index = {}
+        frames = []
+        samples = []
+        for stack, _ in self.samples:
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+        weights = [weight for _, weight in self.samples]
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "cur8tr-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _profile_requested():
+    return request.headers.get(PROFILE_HEADER) == "1" or request.args.get(PROFILE_QUERY_ARG) == "1"
+
+
+def _write_profile(sampler):
+    """Write both output formats and return the base file name"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    endpoint = (request.endpoint or "none").replace(".", "_")
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{endpoint}"
+    title = f"{request.method} {request.full_path.rstrip('?')} ({sampler.duration * 1000:.1f} ms)"
+
+    with open(os.path.join(PROFILE_DIR, f"{name}.speedscope.json"), "w") as f:
+        json.dump(sampler.to_speedscope(title), f)
+    with open(os.path.join(PROFILE_DIR, f"{name}.collapsed.txt"), "w") as f:
+        f.write(sampler.to_collapsed())
+    return name
+
+
+def _finish(response=None):
+    sampler = g.pop("_profiler", None)
+    if sampler is None:
+        return None
+    sampler.stop()
+    try:
+        name = _write_profile(sampler)
+    except OSError as e:
+        logging.warning(f"Could not write request profile: {e}")
+        return None
+    logging.info(f"Request profile written: {name} ({len(sampler.samples)} samples)")
+    if response is not None:
+        response.headers["X-Profile-File"] = name
+    return name
+
+
+def init_request_profiler(app):
+    """Register the opt-in profiler hooks"""
+
+    @app.before_request
+    def start_profiler():
+        if not _profile_requested():
+            return
+        user = get_current_user()
+        if user is None or not user.is_admin:
+            return
+        sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000, PROFILE_MAX_SECONDS)
+        sampler.start()
+        g._profiler = sampler
+
+    @app.after_request
+    def stop_profiler(response):
+        _finish(response)
+        return response
+
+    @app.teardown_request
+    def stop_profiler_on_error(exc):
+        # after_request is skipped when a request fails outright
+        _finish()
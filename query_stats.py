@@ -0,0 +1,147 @@
+"""
+Per-request SQL instrumentation for CUR8tr - query counts, DB time and N+1 detection
+
+Cursor events on every engine (primary and replica) record each statement
+executed while serving a request. Statements are reduced to a fingerprint
+(parameter lists collapsed, whitespace normalized), so the same query shape
+issued once per row of a loop is counted together. When one shape runs more
+than QUERY_REPEAT_THRESHOLD times in a request a warning is logged.
+
+The breakdowns of the last QUERY_STATS_HISTORY requests are kept in memory
+and served by /diag/queries (see routes_probe.py).
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+from collections import deque
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Warn when one statement shape runs more than this many times in a request
+QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", 5))
+
+# Number of recent request breakdowns kept for /diag/queries
+QUERY_STATS_HISTORY = int(os.environ.get("QUERY_STATS_HISTORY", 50))
+
+_recent = deque(maxlen=QUERY_STATS_HISTORY)
+
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement):
+    """Reduce a SQL statement to its shape, ignoring literal values and IN-list lengths"""
+    shape = _PARAM_LIST.sub("(?)", statement)
+    shape = _NUMBER.sub("N", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def fingerprint(statement):
+    """Short stable id for a statement shape"""
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:12]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    if not has_request_context():
+        return
+    stats = g.get("_query_stats")
+    if stats is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    stats["count"] += 1
+    stats["db_time"] += elapsed
+
+    key = fingerprint(statement)
+    shape = stats["shapes"].get(key)
+    if shape is None:
+        shape = stats["shapes"][key] = {"count": 0, "time": 0.0, "statement": normalize_statement(statement)}
+    shape["count"] += 1
+    shape["time"] += elapsed
+
+
+def _handle_error(context):
+    # after_cursor_execute never fires for a failed statement; drop its start time
+    conn = context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def begin_request_stats():
+    """Start recording statements for the current request"""
+    g._query_stats = {"count": 0, "db_time": 0.0, "shapes": {}, "started": time.perf_counter()}
+
+
+def finish_request_stats(status_code=None):
+    """
+    Stop recording, log repeated shapes and store the request breakdown
+
+    Returns:
+        The breakdown dict, or None if recording was never started
+    """
+    stats = g.pop("_query_stats", None)
+    if stats is None:
+        return None
+
+    shapes = [
+        {"fingerprint": key, "count": shape["count"], "time_ms": round(shape["time"] * 1000, 2),
+         "statement": shape["statement"]}
+        for key, shape in sorted(stats["shapes"].items(), key=lambda item: (-item[1]["count"], -item[1]["time"]))
+    ]
+    repeated = [entry for entry in shapes if entry["count"] > QUERY_REPEAT_THRESHOLD]
+
+    summary = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": status_code,
+        "query_count": stats["count"],
+        "distinct_statements": len(shapes),
+        "db_time_ms": round(stats["db_time"] * 1000, 2),
+        "request_time_ms": round((time.perf_counter() - stats["started"]) * 1000, 2),
+        "repeated": repeated,
+        "top_statements": shapes[:10],
+    }
+
+    for entry in repeated:
+        logger.warning(
+            f"Possible N+1 on {request.method} {request.path} ({request.endpoint}): "
+            f"statement ran {entry['count']} times, {entry['time_ms']} ms total: {entry['statement'][:200]}"
+        )
+
+    _recent.append(summary)
+    return summary
+
+
+def recent_request_stats():
+    """Breakdowns of the most recent requests, newest first"""
+    return list(reversed(_recent))
+
+
+def init_query_stats(app):
+    """Install cursor event listeners and per-request hooks"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def start_query_stats():
+        begin_request_stats()
+
+    @app.after_request
+    def record_query_stats(response):
+        finish_request_stats(response.status_code)
+        return response
@@ -0,0 +1,158 @@
+"""
+Related recommendations scoring for CUR8tr - pure NumPy/SciPy, no database access
+
+Each recommendation becomes one sparse feature row combining:
+
+- TF-IDF weighted words from the title and description
+- binary tag membership from the `tags` JSON (categories and collections)
+
+Both blocks are L2-normalized and scaled by the square root of their weight,
+so the dot product of two rows is the weighted sum of text cosine similarity
+and tag cosine similarity.
+"""
+
+import re
+import numpy as np
+from scipy import sparse
+
+DEFAULT_TOP_K = 8
+DEFAULT_CHUNK_SIZE = 2000
+TEXT_WEIGHT = 0.6
+TAG_WEIGHT = 0.4
+MIN_SCORE = 0.05
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]{2,}")
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that the
+    this to was were will with you your our we my i me so if not no do can just
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stop words removed"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _l2_normalize(matrix):
+    """Scale each CSR row to unit length"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def _term_matrix(token_lists):
+    """Build a CSR term-count matrix, one row per token list"""
+    vocabulary = {}
+    rows, cols = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(token_lists), max(len(vocabulary), 1))
+    )
+    return matrix
+
+
+def build_features(texts, tag_lists):
+    """
+    Build the combined feature matrix for a corpus
+
+    Args:
+        texts: One title + description string per recommendation
+        tag_lists: One list of tag slugs per recommendation
+
+    Returns:
+        CSR matrix with one L2-comparable row per recommendation
+    """
+    counts = _term_matrix([tokenize(text) for text in texts])
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1.0
+    counts.data = 1.0 + np.log(counts.data)  # Sublinear term frequency
+    tfidf = _l2_normalize(counts @ sparse.diags(idf.astype(np.float32)))
+
+    tags = _term_matrix([set(tag_list) for tag_list in tag_lists])
+    tags = _l2_normalize(tags)
+
+    return sparse.hstack([
+        np.sqrt(TEXT_WEIGHT) * tfidf,
+        np.sqrt(TAG_WEIGHT) * tags,
+    ], format='csr')
+
+
+def top_k_neighbors(features, positions, top_k=DEFAULT_TOP_K, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Find the top_k most similar rows for each requested row position
+
+    Returns:
+        Tuple of (source_positions, neighbor_positions, scores, ranks) arrays
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    sources, neighbors, values, ranks = [], [], [], []
+    features_t = features.T.tocsc()
+
+    for start in range(0, len(positions), chunk_size):
+        chunk = positions[start:start + chunk_size]
+        scores = (features[chunk] @ features_t).tocsr()
+
+        for row, source in enumerate(chunk):
+            row_start, row_end = scores.indptr[row], scores.indptr[row + 1]
+            cols = scores.indices[row_start:row_end]
+            data = scores.data[row_start:row_end]
+            keep = (cols != source) & (data >= MIN_SCORE)
+            cols, data = cols[keep], data[keep]
+            if not len(cols):
+                continue
+
+            if len(cols) > top_k:
+                best = np.argpartition(-data, top_k - 1)[:top_k]
+            else:
+                best = np.arange(len(cols))
+            best = best[np.argsort(-data[best], kind='stable')]
+
+            sources.append(np.full(len(best), source, dtype=np.int64))
+            neighbors.append(cols[best].astype(np.int64))
+            values.append(data[best])
+            ranks.append(np.arange(1, len(best) + 1, dtype=np.int32))
+
+    if not sources:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64), np.array([], dtype=np.int32)
+
+    return (np.concatenate(sources), np.concatenate(neighbors),
+            np.concatenate(values).astype(np.float64), np.concatenate(ranks))
+
+
+def rows_displaced_by(features, changed_positions, thresholds):
+    """
+    Find unchanged rows whose neighbor list a changed row would now enter
+
+    Similarity is symmetric, so one product of the changed rows against the
+    whole corpus gives every row's best score against any changed row.
+
+    Args:
+        features: Full feature matrix
+        changed_positions: Row positions of new or edited recommendations
+        thresholds: Per-row score a candidate must beat to enter the current
+            top-K (0.0 for rows with fewer than top_k neighbors)
+
+    Returns:
+        Array of row positions that need their neighbor list recomputed
+    """
+    changed_positions = np.asarray(changed_positions, dtype=np.int64)
+    if not len(changed_positions):
+        return np.array([], dtype=np.int64)
+
+    features_t = features.T.tocsc()
+    best = np.zeros(features.shape[0])
+    for start in range(0, len(changed_positions), DEFAULT_CHUNK_SIZE):
+        chunk = changed_positions[start:start + DEFAULT_CHUNK_SIZE]
+        chunk_best = (features[chunk] @ features_t).max(axis=0).toarray().ravel()
+        best = np.maximum(best, chunk_best)
+
+    displaced = np.flatnonzero((best > thresholds) & (best >= MIN_SCORE))
+    return np.setdiff1d(displaced, changed_positions)
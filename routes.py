@@ -1,24 +1,41 @@
 import os
 import random
 import string
+import base64
+import binascii
 import uuid
 import logging
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import render_template, request, redirect, url_for, flash, session, abort, send_from_directory, make_response, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from models import User, Profile, Category, Recommendation, Follow, Like, Comment
+from sqlalchemy.orm import joinedload
+from models import User, Profile, Category, Recommendation, Follow, Like, Comment, FollowSuggestion, RelatedRecommendation
 from forms import LoginForm, RegisterForm, ProfileForm, CategoryForm, RecommendationForm, CommentForm
 from utils import generate_qr_code, slugify, create_default_categories, get_personalized_welcome_message
 from utils_image import get_safe_image_url, create_modern_placeholder  
 from messages import UserMessages, flash_auth, flash_content, flash_social
+from feed import get_feed, fan_out_recommendation, backfill_timeline, remove_author_from_timeline
+from trending import record_event, order_by_trending, get_trending
+from pagination import decode_cursor
+from identity import get_current_user, get_current_profile
+from comments import get_comment_page, get_comment_count
+from slugs import save_with_unique_slug
+from conditional import profile_page_validators, category_page_validators, recommendation_page_validators
+from passwords import hash_password, verify_password
+from likes import get_like_count, is_liked_by, get_likers_page, LIKERS_PREVIEW_SIZE
+from metrics import IMAGE_PROCESSING_SECONDS
+from tracing import span
+
+# Login/registration outcomes; never log form data, sessions or verification codes
+auth_logger = logging.getLogger('cur8tr.auth')
+dashboard_logger = logging.getLogger('cur8tr.dashboard')  # Hot route; sample with LOG_SAMPLE_RATES
 
 def login_required(f):
     """Decorator to require login for protected routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if get_current_user() is None:
             flash_auth('access_denied')
             return redirect(url_for('login'))
         return f(*args, **kwargs)
@@ -31,12 +48,16 @@ def admin_required(f):
         if 'user_id' not in session:
             flash_auth('access_denied')
             return redirect(url_for('login'))
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if not user or not user.is_admin:
             abort(403)
         return f(*args, **kwargs)
     return decorated_function
 
+# Served by recommendation_image; edits show up once a cached copy expires
+IMAGE_MIME_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+IMAGE_MAX_AGE_SECONDS = 300
+
 def save_uploaded_file(file):
     """Convert uploaded file to base64 data URL for database storage"""
     if file and file.filename:
@@ -79,17 +100,14 @@ def register_routes(app, db):
     @app.context_processor
     def inject_current_user():
         """Make current user available in templates"""
-        def get_current_user():
-            if 'user_id' in session:
-                return User.query.get(session['user_id'])
-            return None
-        return dict(get_current_user=get_current_user)
+        return dict(get_current_user=get_current_user, get_current_profile=get_current_profile)
     
     # Template filter for safe image display
     @app.template_filter('safe_image')
     def safe_image_filter(image_field, fallback_title="Image", width=400, height=300):
         """Template filter to ensure images are always valid"""
-        return get_safe_image_url(image_field, fallback_title, (width, height))
+        with IMAGE_PROCESSING_SECONDS.labels('safe_image').time(), span('safe_image', 'image'):
+            return get_safe_image_url(image_field, fallback_title, (width, height))
     
     @app.route('/')
     def home():
@@ -146,39 +164,28 @@ def register_routes(app, db):
     @app.route('/auth/register', methods=['GET', 'POST'])
     def register():
         """User registration with 6-digit verification"""
-        import logging
-        logging.info(f"Register route accessed: method={request.method}")
-        
         form = RegisterForm()
         
-        if request.method == 'POST':
-            logging.info(f"POST data received: {request.form}")
-            logging.info(f"Form validation errors: {form.errors}")
-            logging.info(f"Form validate_on_submit: {form.validate_on_submit()}")
-        
         if form.validate_on_submit():
-            logging.info("Form validation passed, processing registration")
-            
             # Check if user already exists
             if User.query.filter_by(username=form.username.data).first():
-                logging.info(f"Username {form.username.data} already exists")
+                auth_logger.info("Registration rejected: username taken")
                 flash_auth('register_username_taken')
                 return render_template('auth/register.html', form=form)
             
             if User.query.filter_by(email=form.email.data).first():
-                logging.info(f"Email {form.email.data} already registered")
+                auth_logger.info("Registration rejected: email taken")
                 flash_auth('register_email_taken')
                 return render_template('auth/register.html', form=form)
             
             # Generate 6-digit verification code
             verification_code = ''.join(random.choices(string.digits, k=6))
-            logging.info(f"Generated verification code: {verification_code}")
             
             # Store user data in session for verification step
             session['pending_user'] = {
                 'username': form.username.data,
                 'email': form.email.data,
-                'password_hash': generate_password_hash(form.password.data),
+                'password_hash': hash_password(form.password.data),
                 'verification_code': verification_code,
                 'expires_at': (datetime.now() + timedelta(minutes=10)).isoformat()
             }
@@ -190,17 +197,16 @@ def register_routes(app, db):
             if email_sent:
                 flash_auth('register_success')
                 flash(f'We\'ve sent a verification code to {form.email.data}. Please check your email and enter the code to complete registration.', 'info')
-                logging.info("Verification email sent, redirecting to verification page")
+                auth_logger.info("Verification email sent")
                 return redirect(url_for('verify_registration'))
             else:
                 # If email fails, still allow manual verification by showing code (fallback)
                 flash_auth('register_success')
                 flash(f'Email delivery failed. Your verification code is: {verification_code} (expires in 10 minutes)', 'warning')
-                logging.warning("Email sending failed, showing code as fallback")
+                auth_logger.warning("Verification email failed, showing code as fallback")
                 return redirect(url_for('verify_registration'))
-        else:
-            if request.method == 'POST':
-                logging.error(f"Form validation failed: {form.errors}")
+        elif request.method == 'POST':
+            auth_logger.info("Registration form invalid", extra={"fields": sorted(form.errors)})
         
         return render_template('auth/register.html', form=form)
 
@@ -275,53 +281,45 @@ def register_routes(app, db):
     @app.route('/auth/login', methods=['GET', 'POST'])
     def login():
         """User login"""
-        import logging
-        logging.basicConfig(level=logging.DEBUG)
-        logging.info(f"=== LOGIN ATTEMPT: method={request.method} ===")
-        
         form = LoginForm()
         
         if request.method == 'POST':
-            logging.info(f"POST data: {dict(request.form)}")
-            logging.info(f"Session before: {dict(session)}")
-            
             # Get form data directly (bypass WTForms validation for simplicity)
             username = request.form.get('username', '').strip()
             password = request.form.get('password', '').strip()
             
-            logging.info(f"Extracted - Username: '{username}', Password length: {len(password)}")
-            
             # Check if user exists
             user = User.query.filter_by(username=username).first()
-            logging.info(f"User lookup result: {user is not None}")
             
             if user:
-                logging.info(f"User details - ID: {user.id}, Verified: {user.is_verified}")
-                password_valid = check_password_hash(user.password_hash, password)
-                logging.info(f"Password validation: {password_valid}")
+                password_valid, new_hash = verify_password(user.password_hash, password)
+                
+                if password_valid and new_hash:
+                    # Hash parameters changed since this password was stored
+                    user.password_hash = new_hash
+                    db.session.commit()
+                    auth_logger.info("Password rehashed with current parameters", extra={"user_id": user.id})
                 
                 if password_valid and user.is_verified:
                     # Login successful
                     session.clear()  # Clear any old session data
                     session['user_id'] = user.id
                     session.permanent = True
-                    logging.info(f"SUCCESS: User {username} logged in, session: {dict(session)}")
+                    auth_logger.info("Login succeeded", extra={"user_id": user.id})
                     flash_auth('login_success')
                     
                     # Simple redirect - no absolute URL or cache-busting needed
-                    logging.info(f"Redirecting to dashboard")
                     return redirect(url_for('dashboard'))
                 elif not user.is_verified:
-                    logging.info("User not verified")
+                    auth_logger.info("Login rejected: account not verified", extra={"user_id": user.id})
                     flash_auth('login_unverified')
                 elif not password_valid:
-                    logging.info("Invalid password")
+                    auth_logger.info("Login rejected: wrong password", extra={"user_id": user.id})
                     flash_auth('login_wrong_password')
             else:
-                logging.info("User not found")
+                auth_logger.info("Login rejected: unknown username")
                 flash_auth('login_user_not_found')
         
-        logging.info("Rendering login form")
         return render_template('auth/login.html', form=form)
 
     @app.route('/auth/forgot', methods=['GET', 'POST'])
@@ -416,10 +414,8 @@ def register_routes(app, db):
     @app.route('/dashboard')
     @login_required
     def dashboard():
-        import logging
-        logging.info(f"Dashboard accessed by user_id: {session.get('user_id')}")
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         recent_recs = []
 
         if profile:
@@ -454,6 +450,15 @@ def register_routes(app, db):
             total_likes = 0
             total_comments = 0
 
+        # Who-to-follow suggestions precomputed by build_follow_suggestions.py
+        suggested_profiles = Profile.query.join(
+            FollowSuggestion, FollowSuggestion.suggested_user_id == Profile.user_id
+        ).filter(
+            FollowSuggestion.user_id == user.id,
+            Profile.is_public == True,
+            ~Profile.user_id.in_(db.session.query(Follow.followed_id).filter(Follow.follower_id == user.id))
+        ).order_by(FollowSuggestion.rank).limit(5).all()
+
         # Get personalized welcome message
         welcome_message = get_personalized_welcome_message(user, profile)
 
@@ -465,20 +470,21 @@ def register_routes(app, db):
             "total_comments": total_comments
         }
 
-        logging.info(f"Rendering dashboard for user: {user.username}")
+        dashboard_logger.debug("Rendering dashboard", extra={"user_id": user.id})
         return render_template('dashboard/index.html', 
                             user=user, 
                             profile=profile, 
                             recent_recs=recent_recs,
                             welcome_message=welcome_message,
-                            dashboard_stats=dashboard_stats)
+                            dashboard_stats=dashboard_stats,
+                            suggested_profiles=suggested_profiles)
 
     @app.route('/dashboard/profile', methods=['GET', 'POST'])
     @login_required
     def dashboard_profile():
         """Manage user profile"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         
         form = ProfileForm()
         if form.validate_on_submit():
@@ -500,13 +506,6 @@ def register_routes(app, db):
                 profile.is_public = form.is_public.data
             else:
                 # Create new profile
-                slug = slugify(form.name.data)
-                counter = 1
-                original_slug = slug
-                while Profile.query.filter_by(slug=slug).first():
-                    slug = f"{original_slug}-{counter}"
-                    counter += 1
-                
                 profile = Profile(
                     name=form.name.data,
                     bio=form.bio.data,
@@ -515,12 +514,10 @@ def register_routes(app, db):
                     profile_image=profile_image_url,
                     instagram_handle=form.instagram_handle.data,
                     tiktok_handle=form.tiktok_handle.data,
-                    slug=slug,
                     user_id=user.id,
                     is_public=form.is_public.data
                 )
-                db.session.add(profile)
-                db.session.flush()
+                save_with_unique_slug(profile, slugify(form.name.data))
                 
                 # Create default categories for new profile
                 create_default_categories(profile)
@@ -544,26 +541,18 @@ def register_routes(app, db):
     @login_required
     def dashboard_categories():
         """Manage categories"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         
         if not profile:
             flash('Please create a profile first.', 'warning')
             return redirect(url_for('dashboard_profile'))
         
-        # Check if user has default categories, if not create them
-        default_category_names = ["Books", "YouTube Channels", "I Recommend Following", "Food", "Where To Stay", "Apps", "Products"]
-        existing_categories = Category.query.filter_by(profile_id=profile.id).all()
-        
-        existing_names = [cat.name for cat in existing_categories]
-        
-        # Create missing default categories
-        missing_defaults = [name for name in default_category_names if name not in existing_names]
-        if missing_defaults:
-            create_default_categories(profile)
+        # Create any missing default categories
+        created_defaults = create_default_categories(profile)
+        if created_defaults:
             db.session.commit()
-            if len(missing_defaults) > 0:
-                flash(f'Added {len(missing_defaults)} default categories to your profile!', 'success')
+            flash(f'Added {len(created_defaults)} default categories to your profile!', 'success')
         
         categories = Category.query.filter_by(profile_id=profile.id).order_by(Category.name).all()
         
@@ -577,8 +566,8 @@ def register_routes(app, db):
     @login_required
     def new_category():
         """Create new category"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         
         if not profile:
             flash('Please create a profile first.', 'warning')
@@ -604,21 +593,13 @@ def register_routes(app, db):
                     flash(f'Category "{form.name.data}" already exists!', 'warning')
                     return render_template('dashboard/category_form.html', form=form, title="New Category")
             
-            slug = slugify(form.name.data)
-            # Ensure unique slug within profile
-            counter = 1
-            original_slug = slug
-            while Category.query.filter_by(profile_id=profile.id, slug=slug).first():
-                slug = f"{original_slug}-{counter}"
-                counter += 1
-            
             category = Category(
                 name=form.name.data,
                 description=form.description.data,
-                slug=slug,
                 profile_id=profile.id
             )
-            db.session.add(category)
+            # Ensure unique slug within profile
+            save_with_unique_slug(category, slugify(form.name.data), scope=(Category.profile_id == profile.id,))
             db.session.commit()
             
             # If it's an AJAX request, return JSON
@@ -644,21 +625,15 @@ def register_routes(app, db):
     @login_required
     def edit_category(category_id):
         """Edit category"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         category = Category.query.filter_by(id=category_id, profile_id=profile.id).first_or_404()
         
         form = CategoryForm()
         if form.validate_on_submit():
             # Update slug if name changed
             if category.name != form.name.data:
-                slug = slugify(form.name.data)
-                counter = 1
-                original_slug = slug
-                while Category.query.filter_by(profile_id=profile.id, slug=slug).filter(Category.id != category.id).first():
-                    slug = f"{original_slug}-{counter}"
-                    counter += 1
-                category.slug = slug
+                save_with_unique_slug(category, slugify(form.name.data), scope=(Category.profile_id == profile.id,))
             
             category.name = form.name.data
             category.description = form.description.data
@@ -674,8 +649,8 @@ def register_routes(app, db):
     @login_required
     def delete_category(category_id):
         """Delete category"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         category = Category.query.filter_by(id=category_id, profile_id=profile.id).first_or_404()
         
         db.session.delete(category)
@@ -687,8 +662,8 @@ def register_routes(app, db):
     @login_required
     def dashboard_recommendations():
         """Manage recommendations"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         
         if not profile:
             flash('Please create a profile first.', 'warning')
@@ -704,8 +679,8 @@ def register_routes(app, db):
     @login_required
     def new_recommendation():
         """Create new recommendation"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         
         if not profile:
             flash('Please create a profile first.', 'warning')
@@ -756,6 +731,10 @@ def register_routes(app, db):
             
             db.session.add(recommendation)
             db.session.commit()
+            
+            # Push into followers' "Following" timelines
+            fan_out_recommendation(recommendation)
+            db.session.commit()
             flash('Recommendation added successfully!', 'success')
             return redirect(url_for('dashboard_recommendations'))
         
@@ -765,8 +744,8 @@ def register_routes(app, db):
     @login_required
     def edit_recommendation(rec_id):
         """Edit recommendation"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         recommendation = Recommendation.query.join(Category).filter(
             Recommendation.id == rec_id,
             Category.profile_id == profile.id
@@ -833,8 +812,8 @@ def register_routes(app, db):
     @login_required
     def delete_recommendation(rec_id):
         """Delete recommendation"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         recommendation = Recommendation.query.join(Category).filter(
             Recommendation.id == rec_id,
             Category.profile_id == profile.id
@@ -849,8 +828,8 @@ def register_routes(app, db):
     @login_required
     def dashboard_share():
         """Share profile page"""
-        user = User.query.get(session['user_id'])
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        user = get_current_user()
+        profile = user.profile
         
         if not profile:
             flash('Please create a profile first.', 'warning')
@@ -861,7 +840,8 @@ def register_routes(app, db):
         
         if profile.is_public:
             # Generate QR code
-            qr_filename = generate_qr_code(profile_url, profile.name)
+            with IMAGE_PROCESSING_SECONDS.labels('qr_code').time():
+                qr_filename = generate_qr_code(profile_url, profile.name)
         
         return render_template('dashboard/share.html', 
                              profile=profile, 
@@ -877,14 +857,17 @@ def register_routes(app, db):
     def view_profile(slug):
         """View public profile"""
         profile = Profile.query.filter_by(slug=slug, is_public=True).first_or_404()
+        validators = profile_page_validators(profile)
+        if validators.is_current():
+            return validators.not_modified()
         categories = Category.query.filter_by(profile_id=profile.id).order_by(Category.name).all()
-        return render_template('profile.html', profile=profile, categories=categories)
+        return validators.apply(make_response(render_template('profile.html', profile=profile, categories=categories)))
 
     @app.route('/follow/<int:user_id>', methods=['POST'])
     @login_required  
     def follow_user(user_id):
         """Follow a user"""
-        current_user = User.query.get(session['user_id'])
+        current_user = get_current_user()
         user_to_follow = User.query.get_or_404(user_id)
         
         # Check if already following
@@ -895,6 +878,7 @@ def register_routes(app, db):
         # Create follow relationship
         follow = Follow(follower_id=current_user.id, followed_id=user_to_follow.id)
         db.session.add(follow)
+        backfill_timeline(current_user.id, user_to_follow.id)
         db.session.commit()
         
         flash(f'You are now following {user_to_follow.profile.name if user_to_follow.profile else user_to_follow.username}!', 'success')
@@ -904,13 +888,14 @@ def register_routes(app, db):
     @login_required
     def unfollow_user(user_id):
         """Unfollow a user"""
-        current_user = User.query.get(session['user_id'])
+        current_user = get_current_user()
         user_to_unfollow = User.query.get_or_404(user_id)
         
         # Find and remove follow relationship
         follow = Follow.query.filter_by(follower_id=current_user.id, followed_id=user_to_unfollow.id).first()
         if follow:
             db.session.delete(follow)
+            remove_author_from_timeline(current_user.id, user_to_unfollow.id)
             db.session.commit()
             flash(f'You have unfollowed {user_to_unfollow.profile.name if user_to_unfollow.profile else user_to_unfollow.username}.', 'success')
         else:
@@ -918,19 +903,88 @@ def register_routes(app, db):
         
         return redirect(request.referrer or url_for('index'))
 
+    @app.route('/feed')
+    @login_required
+    def feed():
+        """Recommendations from curators the user follows"""
+        try:
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            cursor = None
+        
+        recommendations, next_cursor = get_feed(session['user_id'], cursor)
+        return render_template('feed.html', recommendations=recommendations, next_cursor=next_cursor)
+    
+    @app.route('/api/feed')
+    def feed_api():
+        """JSON page of the "Following" feed"""
+        if 'user_id' not in session:
+            return jsonify({"error": "Authentication required"}), 401
+        
+        try:
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        
+        limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+        recommendations, next_cursor = get_feed(session['user_id'], cursor, limit)
+        
+        return jsonify({
+            'items': [
+                {
+                    'id': rec.id,
+                    'title': rec.title,
+                    'description': rec.description,
+                    'image_url': url_for('recommendation_image', profile_slug=rec.category.profile.slug,
+                                         category_slug=rec.category.slug, rec_id=rec.id) if rec.image else None,
+                    'rating': rec.rating,
+                    'tags': rec.get_tags(),
+                    'created_at': rec.created_at.isoformat() if rec.created_at else None,
+                    'category': {
+                        'id': rec.category.id,
+                        'name': rec.category.name,
+                        'slug': rec.category.slug
+                    },
+                    'profile': {
+                        'id': rec.category.profile.id,
+                        'name': rec.category.profile.name,
+                        'slug': rec.category.profile.slug
+                    },
+                    'permalink': url_for('view_recommendation', profile_slug=rec.category.profile.slug,
+                                   category_slug=rec.category.slug, rec_id=rec.id)
+                }
+                for rec in recommendations
+            ],
+            'next_cursor': next_cursor
+        }), 200
+
     @app.route('/p/<profile_slug>/<category_slug>')
     def view_category(profile_slug, category_slug):
         """View category page"""
         profile = Profile.query.filter_by(slug=profile_slug, is_public=True).first_or_404()
         category = Category.query.filter_by(profile_id=profile.id, slug=category_slug).first_or_404()
-        recommendations = Recommendation.query.filter_by(category_id=category.id).order_by(Recommendation.created_at.desc()).all()
+        sort = request.args.get('sort', 'recent')
+        validators = category_page_validators(profile, category, sort)
+        if validators.is_current():
+            return validators.not_modified()
+        query = Recommendation.query.filter_by(category_id=category.id)
+        if sort == 'popular':
+            recommendations = order_by_trending(query).all()
+        else:
+            recommendations = query.order_by(Recommendation.created_at.desc()).all()
         
         # Get current user for edit/delete permissions
         current_user = None
         if 'user_id' in session:
-            current_user = User.query.get(session['user_id'])
+            current_user = get_current_user()
             
-        return render_template('category.html', profile=profile, category=category, recommendations=recommendations, current_user=current_user)
+        return validators.apply(make_response(render_template('category.html', profile=profile, category=category, recommendations=recommendations, current_user=current_user, sort=sort)))
+    
+    @app.route('/trending')
+    def trending():
+        """Recommendations ranked by time-decayed likes, comments and views"""
+        recommendations = get_trending()
+        return render_template('trending.html', recommendations=recommendations)
     
     @app.route('/p/<profile_slug>/<category_slug>/<int:rec_id>', methods=['GET', 'POST'])
     def view_recommendation(profile_slug, category_slug, rec_id):
@@ -942,7 +996,7 @@ def register_routes(app, db):
         # Get current user for like status and commenting
         current_user = None
         if 'user_id' in session:
-            current_user = User.query.get(session['user_id'])
+            current_user = get_current_user()
         
         # Handle comment submission
         comment_form = CommentForm()
@@ -953,11 +1007,133 @@ def register_routes(app, db):
                 recommendation_id=recommendation.id
             )
             db.session.add(comment)
+            record_event(recommendation.id, 'comment')
             db.session.commit()
             flash('Comment added successfully!', 'success')
             return redirect(url_for('view_recommendation', profile_slug=profile_slug, category_slug=category_slug, rec_id=rec_id))
         
-        return render_template('recommendation.html', profile=profile, category=category, recommendation=recommendation, current_user=current_user, comment_form=comment_form)
+        # A 304 stays read-only; only full renders count as views
+        validators = recommendation_page_validators(profile, category, recommendation)
+        if validators.is_current():
+            return validators.not_modified()
+        
+        if request.method == 'GET':
+            record_event(recommendation.id, 'view')
+            db.session.commit()
+        
+        # Related panel from the precomputed index (build_related_recommendations.py)
+        related_recommendations = Recommendation.query.join(
+            RelatedRecommendation, RelatedRecommendation.related_id == Recommendation.id
+        ).join(Category).join(Profile).filter(
+            RelatedRecommendation.recommendation_id == recommendation.id,
+            Profile.is_public == True
+        ).options(
+            joinedload(Recommendation.category).joinedload(Category.profile)
+        ).order_by(RelatedRecommendation.rank).limit(4).all()
+        
+        comments, next_comment_cursor = get_comment_page(recommendation.id)
+        likers, next_likers_cursor = get_likers_page(recommendation.id, limit=LIKERS_PREVIEW_SIZE)
+        
+        return validators.apply(make_response(render_template('recommendation.html', profile=profile, category=category, recommendation=recommendation, current_user=current_user, comment_form=comment_form, related_recommendations=related_recommendations,
+                               comments=comments, comment_count=get_comment_count(recommendation.id), next_comment_cursor=next_comment_cursor,
+                               likers=likers, next_likers_cursor=next_likers_cursor, like_count=get_like_count(recommendation.id),
+                               is_liked=is_liked_by(recommendation.id, current_user.id if current_user else None))))
+    
+    @app.route('/p/<profile_slug>/<category_slug>/<int:rec_id>/likers')
+    def recommendation_likers(profile_slug, category_slug, rec_id):
+        """JSON page of users who liked a recommendation"""
+        recommendation = Recommendation.query.join(Category).join(Profile).filter(
+            Recommendation.id == rec_id,
+            Category.slug == category_slug,
+            Profile.slug == profile_slug,
+            Profile.is_public == True
+        ).first_or_404()
+        
+        try:
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        
+        likers, next_cursor = get_likers_page(recommendation.id, cursor)
+        
+        return jsonify({
+            'likers': [
+                {
+                    'user_id': liker.user_id,
+                    'name': liker.name or liker.username,
+                    'profile_slug': liker.slug,
+                    'liked_at': liker.created_at.isoformat() if liker.created_at else None
+                }
+                for liker in likers
+            ],
+            'total': get_like_count(recommendation.id),
+            'next_cursor': next_cursor
+        }), 200
+    
+    @app.route('/p/<profile_slug>/<category_slug>/<int:rec_id>/comments')
+    def recommendation_comments(profile_slug, category_slug, rec_id):
+        """JSON "load more" page of comments"""
+        recommendation = Recommendation.query.join(Category).join(Profile).filter(
+            Recommendation.id == rec_id,
+            Category.slug == category_slug,
+            Profile.slug == profile_slug,
+            Profile.is_public == True
+        ).first_or_404()
+        
+        try:
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        
+        comments, next_cursor = get_comment_page(recommendation.id, cursor)
+        viewer_id = session.get('user_id')
+        is_owner = viewer_id is not None and recommendation.category.profile.user_id == viewer_id
+        
+        return jsonify({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'content': comment.content,
+                    'created_at': comment.created_at.isoformat() if comment.created_at else None,
+                    'created_at_display': comment.created_at.strftime('%b %d, %Y %I:%M %p') if comment.created_at else '',
+                    'author': comment.author_name or comment.username,
+                    'author_slug': comment.author_slug,
+                    'delete_url': url_for('delete_comment', profile_slug=profile_slug, category_slug=category_slug,
+                                          rec_id=rec_id, comment_id=comment.id)
+                                  if is_owner or comment.user_id == viewer_id else None
+                }
+                for comment in comments
+            ],
+            'next_cursor': next_cursor
+        }), 200
+    
+    @app.route('/p/<profile_slug>/<category_slug>/<int:rec_id>/image')
+    def recommendation_image(profile_slug, category_slug, rec_id):
+        """Serve a recommendation's stored image as a file, so JSON pages can link to it"""
+        image = db.session.query(Recommendation.image).join(Category).join(Profile).filter(
+            Recommendation.id == rec_id,
+            Category.slug == category_slug,
+            Profile.slug == profile_slug,
+            Profile.is_public == True
+        ).scalar()
+        
+        # Only the raster types save_uploaded_file produces; anything else is not served
+        header, _, data = (image or '').partition(';base64,')
+        mime_type = header[len('data:'):]
+        if not header.startswith('data:') or mime_type not in IMAGE_MIME_TYPES:
+            abort(404)
+        try:
+            body = base64.b64decode(data, validate=True)
+        except binascii.Error:
+            abort(404)
+        
+        response = make_response(body)
+        response.mimetype = mime_type
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.cache_control.public = True
+        response.cache_control.max_age = IMAGE_MAX_AGE_SECONDS
+        response.add_etag()
+        return response.make_conditional(request)
     
     @app.route('/p/<profile_slug>/<category_slug>/<int:rec_id>/like', methods=['POST'])
     @login_required  
@@ -967,7 +1143,7 @@ def register_routes(app, db):
         category = Category.query.filter_by(profile_id=profile.id, slug=category_slug).first_or_404()
         recommendation = Recommendation.query.filter_by(id=rec_id, category_id=category.id).first_or_404()
         
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         existing_like = Like.query.filter_by(user_id=user.id, recommendation_id=recommendation.id).first()
         
         if existing_like:
@@ -980,6 +1156,8 @@ def register_routes(app, db):
             db.session.add(like)
             action = 'liked'
         
+        record_event(recommendation.id, 'like' if action == 'liked' else 'unlike')
+        
         db.session.commit()
         
         # Return JSON response for AJAX or redirect for form submission
@@ -987,8 +1165,8 @@ def register_routes(app, db):
             return jsonify({
                 'success': True,
                 'action': action,
-                'like_count': recommendation.get_like_count(),
-                'is_liked': recommendation.is_liked_by(user)
+                'like_count': get_like_count(recommendation.id),
+                'is_liked': action == 'liked'
             })
         else:
             flash(f'Recommendation {action}!', 'success')
@@ -1004,7 +1182,7 @@ def register_routes(app, db):
         recommendation = Recommendation.query.filter_by(category_id=category.id, id=rec_id).first_or_404()
         comment = Comment.query.filter_by(id=comment_id, recommendation_id=recommendation.id).first_or_404()
         
-        current_user = User.query.get(session['user_id'])
+        current_user = get_current_user()
         
         # Allow deletion if user is comment author or recommendation owner
         if comment.user_id == current_user.id or recommendation.category.profile.user_id == current_user.id:
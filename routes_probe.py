@@ -1,6 +1,9 @@
 import os, hashlib, base64, json
 from flask import current_app as app, Blueprint, request, session, redirect, url_for, make_response, jsonify
-from werkzeug.exceptions import HTTPException
+from werkzeug.exceptions import HTTPException, NotFound
+from query_stats import recent_request_stats, QUERY_REPEAT_THRESHOLD
+from metrics import render_metrics
+from utils import bearer_token_matches
 
 probe = Blueprint("probe", __name__)
 
@@ -86,4 +89,26 @@ def deployment_check():
         "should_use_secure_cookies": is_https and is_replit_domain,
         "current_cookie_secure": app.config.get("SESSION_COOKIE_SECURE"),
         "ready_for_production": is_https and is_replit_domain
-    })
\ No newline at end of file
+    })
+
+# Per-request SQL breakdown (query count, DB time, repeated statements); debug only
+@probe.get("/diag/queries")
+def diag_queries():
+    if not (app.debug or os.environ.get("QUERY_STATS_DIAG") == "1"):
+        raise NotFound()
+    return jsonify({
+        "repeat_threshold": QUERY_REPEAT_THRESHOLD,
+        "requests": recent_request_stats()
+    })
+
+# Prometheus scrape endpoint; set METRICS_TOKEN to require "Authorization: Bearer <token>".
+# Production without a token serves nothing rather than exposing metrics to anyone.
+@probe.get("/metrics")
+def metrics():
+    token = os.environ.get("METRICS_TOKEN")
+    if not token and os.environ.get("ENVIRONMENT") == "production":
+        raise NotFound()
+    if token and not bearer_token_matches(request.headers.get("Authorization"), token):
+        raise NotFound()
+    body, content_type = render_metrics()
+    return body, 200, {"Content-Type": content_type}
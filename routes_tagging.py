@@ -4,9 +4,11 @@ Tagging API routes for CUR8tr - Simple JSON-based tagging system
 
 from flask import Blueprint, request, jsonify, session
 from functools import wraps
-from sqlalchemy import and_, or_
+from datetime import datetime
+from sqlalchemy import and_, or_, select, update
 from models import User, Profile, Recommendation, Category, slugify
 from app import db
+from identity import get_current_user
 import json
 
 bp = Blueprint("tagging", __name__, url_prefix="/api")
@@ -20,12 +22,6 @@ def login_required_api(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def get_current_user():
-    """Get current user from session"""
-    if 'user_id' not in session:
-        return None
-    return User.query.get(session['user_id'])
-
 @bp.route('/tags', methods=['GET'])
 def get_all_tags():
     """Get all available tags from recommendations"""
@@ -225,12 +221,13 @@ def add_tag_to_recommendation(rec_id):
     if not tag_name:
         return jsonify({"error": "Tag name cannot be empty"}), 400
     
-    rec.add_tag(tag_name, tag_type)
+    rec.add_tag(tag_name, tag_type)  # Atomic UPDATE ... RETURNING; rec.tags is already current
+    tags = rec.get_tags()
     db.session.commit()
     
     return jsonify({
-        'id': rec.id,
-        'tags': rec.get_tags(),
+        'id': rec_id,
+        'tags': tags,
         'message': f'Tag "{tag_name}" added successfully'
     }), 200
 
@@ -253,12 +250,13 @@ def remove_tag_from_recommendation(rec_id):
     tag_name = data['tag'].strip()
     tag_type = data.get('type')  # Optional: 'category' or 'collection'
     
-    rec.remove_tag(tag_name, tag_type)
+    rec.remove_tag(tag_name, tag_type)  # Atomic UPDATE ... RETURNING; rec.tags is already current
+    tags = rec.get_tags()
     db.session.commit()
     
     return jsonify({
-        'id': rec.id,
-        'tags': rec.get_tags(),
+        'id': rec_id,
+        'tags': tags,
         'message': f'Tag "{tag_name}" removed successfully'
     }), 200
 
@@ -295,4 +293,119 @@ def set_recommendation_tags(rec_id):
         'id': rec.id,
         'tags': rec.get_tags(),
         'message': 'Tags updated successfully'
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+# Upper bound on operations per batch request
+TAG_BATCH_MAX_OPERATIONS = 500
+
+def _apply_tag_operation(tags, op):
+    """Return a new tags dict with one batch operation applied (mirrors the single-item routes)"""
+    action = op.get('action')
+    if action == 'set':
+        new_tags = {}
+        categories = [slugify(cat) for cat in op.get('categories') or [] if cat.strip()]
+        collections = [slugify(col) for col in op.get('collections') or [] if col.strip()]
+        if categories:
+            new_tags['categories'] = categories
+        if collections:
+            new_tags['collections'] = collections
+        return new_tags or None
+
+    tag_slug = slugify(op['tag'])
+    new_tags = {key: list(values) for key, values in (tags or {}).items()}
+    if action == 'add':
+        key = 'categories' if op.get('type') == 'category' else 'collections'
+        new_tags.setdefault('categories', [])
+        new_tags.setdefault('collections', [])
+        if tag_slug not in new_tags[key]:
+            new_tags[key].append(tag_slug)
+    else:
+        tag_type = op.get('type')
+        for key, kind in (('categories', 'category'), ('collections', 'collection')):
+            if tag_type in (kind, None) and tag_slug in new_tags.get(key, []):
+                new_tags[key].remove(tag_slug)
+    return new_tags
+
+def _validate_tag_operation(op):
+    """Error message for a malformed batch operation, or None"""
+    if not isinstance(op, dict) or not isinstance(op.get('id'), int):
+        return "Operation must include an integer recommendation id"
+    if op.get('action') not in ('add', 'remove', 'set'):
+        return "Action must be one of add, remove, set"
+    if op['action'] in ('add', 'remove'):
+        if not isinstance(op.get('tag'), str) or not op['tag'].strip():
+            return "Tag name required"
+    elif not all(isinstance(value, list) and all(isinstance(tag, str) for tag in value)
+                 for value in (op.get('categories') or [], op.get('collections') or [])):
+        return "Categories and collections must be lists of strings"
+    return None
+
+@bp.route('/recommendations/tags/batch', methods=['POST'])
+@login_required_api
+def batch_update_tags():
+    """
+    Apply many tag operations in one transaction
+
+    Body: {"operations": [{"id": 1, "action": "add", "tag": "summer", "type": "collection"},
+                          {"id": 2, "action": "remove", "tag": "food"},
+                          {"id": 3, "action": "set", "categories": [...], "collections": [...]}]}
+
+    Ownership for every id is checked with one query and all changed rows are
+    written with one executemany UPDATE. Operations on the same id apply in
+    order. Returns one result per operation, in request order.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations list required"}), 400
+    if len(operations) > TAG_BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {TAG_BATCH_MAX_OPERATIONS} operations per batch"}), 413
+    
+    user = get_current_user()
+    errors = [_validate_tag_operation(op) for op in operations]
+    rec_ids = {op['id'] for op, error in zip(operations, errors) if error is None}
+    
+    # One query for ownership and current tags; row locks keep concurrent edits from being lost
+    rows = db.session.execute(
+        select(Recommendation.id, Recommendation.tags, Profile.user_id)
+        .join(Category, Recommendation.category_id == Category.id)
+        .join(Profile, Category.profile_id == Profile.id)
+        .where(Recommendation.id.in_(rec_ids))
+        .with_for_update(of=Recommendation)
+    ).all() if rec_ids else []
+    owners = {rec_id: owner_id for rec_id, _, owner_id in rows}
+    current_tags = {rec_id: tags for rec_id, tags, _ in rows}
+    
+    results = []
+    changed = {}
+    for index, (op, error) in enumerate(zip(operations, errors)):
+        rec_id = op.get('id') if isinstance(op, dict) else None
+        if error:
+            results.append({'index': index, 'id': rec_id, 'status': 400, 'error': error})
+        elif rec_id not in owners:
+            results.append({'index': index, 'id': rec_id, 'status': 404, 'error': "Recommendation not found"})
+        elif owners[rec_id] != user.id:
+            results.append({'index': index, 'id': rec_id, 'status': 403,
+                            'error': "You can only edit your own recommendations"})
+        else:
+            current_tags[rec_id] = changed[rec_id] = _apply_tag_operation(current_tags[rec_id], op)
+            results.append({'index': index, 'id': rec_id, 'status': 200})
+    
+    if changed:
+        now = datetime.utcnow()
+        db.session.execute(update(Recommendation), [
+            {'id': rec_id, 'tags': tags, 'updated_at': now} for rec_id, tags in changed.items()
+        ])
+    db.session.commit()
+    
+    # Report the final tags of each recommendation after the whole batch
+    for result in results:
+        if result['status'] == 200:
+            tags = current_tags[result['id']] or {}
+            result['tags'] = tags.get('categories', []) + tags.get('collections', [])
+    
+    return jsonify({
+        'updated': len(changed),
+        'results': results
+    }), 200
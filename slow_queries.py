@@ -0,0 +1,212 @@
+"""
+Slow-query log for CUR8tr - statements over a threshold with EXPLAIN snapshots
+
+Any statement slower than SLOW_QUERY_MS is written as one JSON line to a
+rotating log file (SLOW_QUERY_LOG_FILE) with:
+
+- the statement and its parameters, with string/bytes values redacted
+- the route that issued it (method, path, endpoint)
+- the execution plan, captured on a background thread so the request that
+  hit the slow query is not held up any further. The plan is run with the
+  real parameters, which PostgreSQL echoes back as literals in filter and
+  index conditions, so every quoted literal in it is redacted too
+
+On PostgreSQL the plan is EXPLAIN (ANALYZE, BUFFERS), run inside a
+rolled-back transaction with a statement_timeout. ANALYZE executes the query
+again, so plans are only captured for SELECTs and at most once per statement
+shape every SLOW_QUERY_EXPLAIN_INTERVAL seconds. Other dialects get their
+plain EXPLAIN output (EXPLAIN QUERY PLAN on SQLite).
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from datetime import date, datetime, timezone
+from logging.handlers import RotatingFileHandler, QueueHandler
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from flask import request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from query_stats import fingerprint
+from logging_config import queued_handler
+
+# Statements slower than this are logged; 0 disables the slow-query log
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 500))
+
+SLOW_QUERY_LOG_FILE = os.environ.get("SLOW_QUERY_LOG_FILE", "logs/slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get("SLOW_QUERY_LOG_MAX_BYTES", 5 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", 5))
+
+# Minimum seconds between plan captures for the same statement shape
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300))
+
+# Upper bound on a single EXPLAIN ANALYZE run
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 30000))
+
+# Plans waiting to be captured; further slow queries are logged without one
+SLOW_QUERY_MAX_PENDING = 20
+
+slow_query_logger = logging.getLogger("cur8tr.slow_queries")
+slow_query_logger.propagate = False
+
+slow_query_log_file = None
+
+_explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_explain_lock = Lock()
+_last_explained = {}
+_pending = 0
+
+# A single-quoted SQL literal: '' escapes, or backslash escapes in E'...'
+_QUOTED_LITERAL = re.compile(r"(?:\b[Ee])?'(?:[^'\\]|''|\\.)*'")
+
+
+def redact_parameters(parameters):
+    """Keep numbers, booleans, None and dates; replace text and binary values with a placeholder"""
+    def redact(value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, (str, bytes)):
+            return f"<{type(value).__name__} len={len(value)}>"
+        if isinstance(value, (list, tuple)):
+            return [redact(item) for item in value]
+        if isinstance(value, dict):
+            return {key: redact(item) for key, item in value.items()}
+        return f"<{type(value).__name__}>"
+
+    return redact(parameters)
+
+
+def redact_plan(plan):
+    """Replace the quoted literals a plan (or an error about it) echoes back"""
+    return _QUOTED_LITERAL.sub("'<redacted>'", plan)
+
+
+def explain_statement(engine, statement, parameters):
+    """Capture the plan for one statement on the engine that ran it"""
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            if engine.dialect.name == "postgresql":
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+                rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                return "\n".join(row[0] for row in rows)
+            if engine.dialect.name == "sqlite":
+                rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                return "\n".join(str(row[-1]) for row in rows)
+            rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            return "\n".join(" | ".join(str(col) for col in row) for row in rows)
+        finally:
+            transaction.rollback()
+
+
+def _write_record(record):
+    slow_query_logger.warning(json.dumps(record, default=str))
+
+
+def _explain_and_write(engine, statement, parameters, record):
+    global _pending
+    try:
+        record["plan"] = redact_plan(explain_statement(engine, statement, parameters))
+    except Exception as e:
+        record["plan_error"] = redact_plan(f"{type(e).__name__}: {e}")
+    finally:
+        with _explain_lock:
+            _pending -= 1
+    _write_record(record)
+
+
+def _should_explain(statement, shape, executemany):
+    """Claim a plan capture for this shape if one is due and the queue has room"""
+    global _pending
+    if executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+
+    now = time.monotonic()
+    with _explain_lock:
+        if _pending >= SLOW_QUERY_MAX_PENDING:
+            return False
+        if now - _last_explained.get(shape, -SLOW_QUERY_EXPLAIN_INTERVAL) < SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        _last_explained[shape] = now
+        _pending += 1
+    return True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_start_time"].pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_MS or statement.lstrip().upper().startswith(("EXPLAIN", "SET ")):
+        return
+
+    shape = fingerprint(statement)
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "fingerprint": shape,
+        "database": conn.engine.url.render_as_string(hide_password=True),
+        "statement": statement,
+        "parameters": redact_parameters(parameters),
+        "route": None,
+    }
+    if has_request_context():
+        record["route"] = {"method": request.method, "path": request.path, "endpoint": request.endpoint}
+
+    if _should_explain(statement, shape, executemany):
+        _explainer.submit(_explain_and_write, conn.engine, statement, parameters, record)
+    else:
+        _write_record(record)
+
+
+def _handle_error(context):
+    conn = context.connection
+    if conn is not None and conn.info.get("slow_query_start_time"):
+        conn.info["slow_query_start_time"].pop()
+
+
+def init_slow_query_log(log_file=None):
+    """
+    Attach the slow-query listeners to every engine and open the log file
+
+    Returns:
+        True if the log is active, False if disabled or the file can't be opened
+    """
+    global slow_query_log_file
+    if SLOW_QUERY_MS <= 0:
+        return False
+
+    if slow_query_log_file is None:
+        log_file = log_file or SLOW_QUERY_LOG_FILE
+        try:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            handler = RotatingFileHandler(log_file, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                          backupCount=SLOW_QUERY_LOG_BACKUPS)
+        except OSError as e:
+            # Read-only filesystems (e.g. serverless) just run without the log
+            logging.warning(f"Slow-query log disabled, cannot open {log_file}: {e}")
+            return False
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_query_logger.addHandler(queued_handler(handler))
+        slow_query_log_file = log_file
+        slow_query_logger.setLevel(logging.WARNING)
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    return True
+
+
+def flush_slow_query_log():
+    """Block until queued plan captures and log writes have finished"""
+    _explainer.submit(lambda: None).result()
+    for handler in slow_query_logger.handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue.join()
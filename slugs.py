@@ -0,0 +1,82 @@
+"""
+Slug allocation for CUR8tr - one query per allocation, unique constraint as the backstop
+
+`allocate_slug` loads every taken slug that could collide with a base
+(`base` itself and `base-<n>`) in a single LIKE query and picks the lowest
+free suffix in Python. Two requests can still race for the same slug, so
+writes go through `save_with_unique_slug`, which flushes inside a SAVEPOINT
+and re-allocates when the unique constraint rejects the row.
+"""
+
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+SLUG_RETRY_ATTEMPTS = 3
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def taken_slugs(slug_column, base, scope=(), exclude_id=None):
+    """Set of existing slugs equal to base or of the form base-<suffix>"""
+    model = slug_column.class_
+    query = select(slug_column).where(
+        or_(slug_column == base, slug_column.like(f"{_escape_like(base)}-%", escape="\\")),
+        *scope
+    )
+    if exclude_id is not None:
+        query = query.where(model.id != exclude_id)
+    return set(db.session.scalars(query))
+
+
+def next_free_slug(base, taken):
+    """base if free, otherwise base-<n> with the lowest free n >= 1"""
+    if base not in taken:
+        return base
+    prefix = f"{base}-"
+    used = {int(slug[len(prefix):]) for slug in taken
+            if slug.startswith(prefix) and slug[len(prefix):].isdigit()}
+    counter = 1
+    while counter in used:
+        counter += 1
+    return f"{prefix}{counter}"
+
+
+def allocate_slug(slug_column, base, scope=(), exclude_id=None):
+    """
+    Pick a free slug for base with a single query
+
+    Args:
+        slug_column: Model slug attribute, e.g. Category.slug
+        base: Slugified name
+        scope: Extra filters the uniqueness applies within, e.g. (Category.profile_id == 3,)
+        exclude_id: Primary key of the row being renamed, so it doesn't collide with itself
+    """
+    return next_free_slug(base, taken_slugs(slug_column, base, scope, exclude_id))
+
+
+def save_with_unique_slug(obj, base, scope=()):
+    """
+    Assign obj.slug from base and flush it, retrying if a concurrent write takes the slug
+
+    Works for new and existing rows. The caller owns the outer transaction.
+
+    Returns:
+        The slug that was stored
+    """
+    slug_column = type(obj).slug
+    slug = allocate_slug(slug_column, base, scope, exclude_id=obj.id)
+    for attempt in range(SLUG_RETRY_ATTEMPTS):
+        try:
+            with db.session.begin_nested():
+                obj.slug = slug
+                db.session.add(obj)
+            return slug
+        except IntegrityError:
+            retry_slug = allocate_slug(slug_column, base, scope, exclude_id=obj.id)
+            # Same answer means the slug wasn't what the database rejected
+            if retry_slug == slug or attempt == SLUG_RETRY_ATTEMPTS - 1:
+                raise
+            slug = retry_slug
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Static asset build tests for CUR8tr
+
+Builds a copy of the stylesheets and icons in a temporary static folder and
+serves it from a bare Flask app, so the real static/dist is never touched.
+
+Run with: python -m pytest test_assets.py
+"""
+
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import brotli
+from flask import Flask, url_for, render_template_string
+from assets import init_assets, CATEGORY_ICONS
+from build_assets import build, minify_css
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def built_static_folder():
+    folder = os.path.join(tempfile.mkdtemp(), "static")
+    shutil.copytree(os.path.join(STATIC_FOLDER, "css"), os.path.join(folder, "css"))
+    shutil.copytree(os.path.join(STATIC_FOLDER, "svg"), os.path.join(folder, "svg"))
+    shutil.copytree(os.path.join(STATIC_FOLDER, "img"), os.path.join(folder, "img"))
+    os.makedirs(os.path.join(folder, "uploads"))
+    with open(os.path.join(folder, "uploads", "photo.jpg"), "wb") as upload:
+        upload.write(b"user content")
+    return folder, build(folder, report=lambda line: None)
+
+
+def test_minify_css():
+    css = """/* layout's header */
+    .a > .b ,  .c:hover  {  color : red ;  content: "keep  /* this */  text" ; }
+    @media (max-width: 600px) { .x { width: calc(100% - 10px); margin:0/* gap */auto; } }
+    div :first-child { font-family: 'Barlow', sans-serif; }
+    """
+    assert minify_css(css) == (
+        '.a>.b,.c:hover{color :red;content:"keep  /* this */  text"}'
+        '@media (max-width:600px){.x{width:calc(100% - 10px);margin:0 auto}}'
+        "div :first-child{font-family:'Barlow',sans-serif}"
+    )
+
+
+def test_build_writes_hashed_minified_files_and_manifest():
+    folder, manifest = built_static_folder()
+    with open(os.path.join(folder, "dist", "manifest.json")) as manifest_file:
+        assert json.load(manifest_file) == manifest
+    assert not any(path.startswith("uploads/") for path in manifest)
+
+    layout = manifest["css/layout.css"]
+    assert layout.startswith("dist/css/layout.") and layout.endswith(".css")
+    with open(os.path.join(folder, layout), "rb") as built:
+        content = built.read()
+    assert len(content) < os.path.getsize(os.path.join(folder, "css", "layout.css"))
+    with open(os.path.join(folder, layout + ".br"), "rb") as br, open(os.path.join(folder, layout + ".gz"), "rb") as gz:
+        assert brotli.decompress(br.read()) == content
+        assert gzip.decompress(gz.read()) == content
+    assert not os.path.exists(os.path.join(folder, manifest["img/logo_new.png"] + ".br"))
+
+    with open(os.path.join(folder, "svg", "category-icons.svg")) as sprite:
+        sprite = sprite.read()
+    for icon in [*CATEGORY_ICONS.values(), "default"]:
+        assert f'<symbol id="{icon}" viewBox="0 0 24 24"' in sprite
+    assert "svg/category-icons.svg" in manifest
+
+    # Same content, same names: rebuilding doesn't bust caches
+    assert build(folder, report=lambda line: None) == manifest
+
+
+def test_fingerprinted_urls_are_served_immutable():
+    folder, manifest = built_static_folder()
+    app = Flask(__name__, static_folder=folder)
+    init_assets(app)
+    client = app.test_client()
+
+    with app.test_request_context():
+        url = url_for("static", filename="css/layout.css")
+        assert url == "/static/" + manifest["css/layout.css"]
+        assert url_for("static", filename="css/missing.css") == "/static/css/missing.css"
+        icon = render_template_string("{{ category_icon_url('Food') }} {{ category_icon_url('Other') }}")
+        sprite = "/static/" + manifest["svg/category-icons.svg"]
+        assert icon == f"{sprite}#food {sprite}#default"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.mimetype == "text/css"
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    with open(os.path.join(folder, manifest["css/layout.css"]), "rb") as built:
+        assert brotli.decompress(response.data) == built.read()
+    response.close()
+
+    plain = client.get("/static/css/layout.css")
+    assert "immutable" not in plain.headers.get("Cache-Control", "")
+    plain.close()
+
+    # Debug mode serves the sources so edits show up without a rebuild
+    app.debug = True
+    with app.test_request_context():
+        assert url_for("static", filename="css/layout.css") == "/static/css/layout.css"
+
+
+def test_plain_urls_without_a_build():
+    app = Flask(__name__, static_folder=tempfile.mkdtemp(), static_url_path="/static")
+    init_assets(app)
+    with app.test_request_context():
+        assert url_for("static", filename="css/layout.css") == "/static/css/layout.css"
+
+
+if __name__ == "__main__":
+    test_minify_css()
+    test_build_writes_hashed_minified_files_and_manifest()
+    test_fingerprinted_urls_are_served_immutable()
+    test_plain_urls_without_a_build()
+    print("Static assets OK")
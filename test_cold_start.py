@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Cold-start regression test for CUR8tr
+
+Imports the app in a fresh interpreter in lazy-init mode and checks that
+heavy, first-use-only modules are not loaded at startup.
+
+Run with: python -m pytest test_cold_start.py
+"""
+
+from bench_cold_start import measure_import, deferred_imports
+
+
+def test_lazy_import_defers_heavy_modules():
+    wall_ms, imports = measure_import(lazy=True)
+    modules = {module for module, _, _, _ in imports}
+
+    assert "app" in modules
+    assert deferred_imports(imports) == []
+
+
+if __name__ == "__main__":
+    test_lazy_import_defers_heavy_modules()
+    print("Cold start OK")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Response compression tests for CUR8tr
+
+Checks the middleware on the real app (throwaway SQLite database, see
+conftest.py) and on small WSGI apps for the streaming and pass-through cases.
+
+Run with: python -m pytest test_compression.py
+"""
+
+import gzip
+import zlib
+import brotli
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from app import app
+from compression import CompressionMiddleware, choose_encoding
+
+
+def test_pages_are_compressed_for_the_client():
+    client = app.test_client()
+    plain = client.get("/auth/login")
+    assert plain.headers.get("Content-Encoding") is None
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    zipped = client.get("/auth/login", headers={"Accept-Encoding": "gzip, deflate"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert int(zipped.headers["Content-Length"]) == len(zipped.data) < len(plain.data)
+    assert gzip.decompress(zipped.data) == plain.data
+
+    css = client.get("/static/css/layout.css", headers={"Accept-Encoding": "gzip, br"})
+    assert css.headers["Content-Encoding"] == "br"
+    assert css.headers["ETag"].startswith("W/")
+    assert brotli.decompress(css.data) == client.get("/static/css/layout.css").data
+
+
+def test_choose_encoding():
+    assert choose_encoding("") is None
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("identity, br;q=0") is None
+
+
+def test_ineligible_responses_pass_through():
+    def wsgi(status, content_type, body, **headers):
+        return CompressionMiddleware(Response(body, status=status, content_type=content_type, headers=headers))
+
+    small = Client(wsgi(200, "text/html", b"x" * 100)).get("/", headers={"Accept-Encoding": "gzip"})
+    assert small.headers.get("Content-Encoding") is None and small.headers["Vary"] == "Accept-Encoding"
+
+    image = Client(wsgi(200, "image/png", b"x" * 5000)).get("/", headers={"Accept-Encoding": "gzip"})
+    assert image.headers.get("Content-Encoding") is None and "Vary" not in image.headers
+
+    for response in (wsgi(404, "text/html", b"x" * 5000),
+                     wsgi(200, "text/html", b"x" * 5000, **{"Cache-Control": "no-transform"}),
+                     wsgi(200, "text/html", b"x" * 5000, **{"Content-Encoding": "gzip"})):
+        assert Client(response).get("/", headers={"Accept-Encoding": "gzip"}).data == b"x" * 5000
+
+
+def test_streamed_chunks_are_flushed_as_they_arrive():
+    chunks = [b"<p>first</p>" * 200, b"<p>second</p>", b"<p>third</p>"]
+
+    def stream(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/html")])
+        return iter(chunks)
+
+    middleware = CompressionMiddleware(stream)
+    started = []
+    body = middleware({"REQUEST_METHOD": "GET", "HTTP_ACCEPT_ENCODING": "gzip"},
+                      lambda status, headers, exc_info=None: started.append(dict(headers)))
+    decoder = zlib.decompressobj(31)
+    received = [decoder.decompress(piece) for piece in body]
+    assert started[0]["Content-Encoding"] == "gzip" and "Content-Length" not in started[0]
+    assert received[:3] == chunks  # Each chunk is readable before the next one is produced
+
+    def tiny(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/html")])
+        return iter([b"a", b"b"])
+
+    response = Client(CompressionMiddleware(tiny)).get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.data == b"ab" and response.headers.get("Content-Encoding") is None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Conditional GET tests for CUR8tr
+
+Runs the app against a throwaway SQLite database (see conftest.py) and checks
+that public pages answer 304 from their freshness query alone, and that the
+validators change with the data shown and with the viewer.
+
+Run with: python -m pytest test_conditional_get.py
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import app, db
+from conditional import POPULAR_REFRESH_SECONDS
+from models import Recommendation, Like, Comment, Follow, TrendingScore
+
+PROFILE_URL = "/p/owner"
+CATEGORY_URL = "/p/owner/food"
+
+
+@pytest.fixture
+def seed(make_curator, make_recommendation):
+    """An owner with one recommendation, and a second user; returns (owner id, viewer id, rec id)"""
+    owner = make_curator("owner", category="Food")
+    viewer = make_curator("viewer")
+    return owner.user_id, viewer.user_id, make_recommendation(owner.category_id)
+
+
+def client_for(user_id=None):
+    client = app.test_client()
+    if user_id:
+        with client.session_transaction() as session:
+            session["user_id"] = user_id
+    return client
+
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={"If-None-Match": f'W/"{etag}"'})
+
+
+def test_unchanged_page_is_304_from_the_freshness_query(seed):
+    client = client_for()
+    first = client.get(PROFILE_URL)
+    etag, _ = first.get_etag()
+    assert first.status_code == 200 and etag
+    assert first.headers["Cache-Control"] in ("private, no-cache", "no-cache, private")
+    assert "Cookie" in first.headers["Vary"]
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        second = revalidate(client, PROFILE_URL, etag)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert second.status_code == 304
+    assert second.data == b""
+    assert len(statements) == 2, statements  # Profile lookup + one aggregate
+
+    # Anonymous clients that only send If-Modified-Since are served too
+    assert client.get(PROFILE_URL, headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+
+
+def test_validators_change_with_the_data(seed):
+    _, _, rec_id = seed
+    client = client_for()
+    etag, _ = client.get(CATEGORY_URL).get_etag()
+
+    with app.app_context():
+        db.session.add(Comment(content="Great", user_id=1, recommendation_id=rec_id))
+        db.session.commit()
+    response = revalidate(client, CATEGORY_URL, etag)
+    assert response.status_code == 200
+    etag, _ = response.get_etag()
+
+    # Deleting doesn't move any timestamp; the count catches it
+    with app.app_context():
+        db.session.query(Comment).delete()
+        db.session.commit()
+    response = revalidate(client, CATEGORY_URL, etag)
+    assert response.status_code == 200
+    etag, _ = response.get_etag()
+
+    with app.app_context():
+        db.session.get(Recommendation, rec_id).title = "Better pizza"
+        db.session.commit()
+    response = revalidate(client, CATEGORY_URL, etag)
+    assert response.status_code == 200
+    assert b"Better pizza" in response.data
+
+
+def test_validators_vary_by_viewer(seed):
+    owner_id, viewer_id, _ = seed
+    anonymous_etag, _ = client_for().get(PROFILE_URL).get_etag()
+    viewer = client_for(viewer_id)
+    viewer_etag, _ = viewer.get(PROFILE_URL).get_etag()
+    assert viewer_etag != anonymous_etag
+    assert revalidate(viewer, PROFILE_URL, anonymous_etag).status_code == 200
+    assert revalidate(viewer, PROFILE_URL, viewer_etag).status_code == 304
+
+    # Following changes the button only this viewer sees
+    with app.app_context():
+        db.session.add(Follow(follower_id=viewer_id, followed_id=owner_id))
+        db.session.commit()
+    assert revalidate(viewer, PROFILE_URL, viewer_etag).status_code == 200
+
+    # Logged-in viewers can't be told apart by date, so If-Modified-Since alone never 304s
+    last_modified = viewer.get(PROFILE_URL).headers["Last-Modified"]
+    assert viewer.get(PROFILE_URL, headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_recommendation_revalidation_writes_nothing(seed):
+    owner_id, viewer_id, rec_id = seed
+    url = f"/p/owner/food/{rec_id}"
+    viewer = client_for(viewer_id)
+    etag, _ = viewer.get(url).get_etag()
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert revalidate(viewer, url, etag).status_code == 304
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements), statements
+
+    with app.app_context():
+        assert db.session.get(TrendingScore, rec_id).score == 1  # Only the full render counted
+        db.session.add(Like(user_id=owner_id, recommendation_id=rec_id))
+        db.session.commit()
+    assert revalidate(viewer, url, etag).status_code == 200
+
+
+def test_popular_order_etag_ignores_views_within_the_refresh_interval(seed):
+    _, _, rec_id = seed
+    url = CATEGORY_URL + "?sort=popular"
+    client = client_for()
+    client.get(f"/p/owner/food/{rec_id}")
+    etag, _ = client.get(url).get_etag()
+
+    # Views keep moving the score, but within one interval the page stays cached
+    with app.app_context():
+        db.session.get(TrendingScore, rec_id).scored_at = datetime(2026, 3, 1, 12, 0, 1)
+        db.session.commit()
+    etag, _ = client.get(url).get_etag()
+    with app.app_context():
+        db.session.get(TrendingScore, rec_id).scored_at = datetime(2026, 3, 1, 12, 0, 2)
+        db.session.commit()
+    assert revalidate(client, url, etag).status_code == 304
+
+    with app.app_context():
+        db.session.get(TrendingScore, rec_id).scored_at = datetime(2026, 3, 1, 12, 0) + timedelta(
+            seconds=POPULAR_REFRESH_SECONDS)
+        db.session.commit()
+    assert revalidate(client, url, etag).status_code == 200
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Data migration framework tests for CUR8tr
+
+Runs fix_existing_tags and cleanup_duplicate_users against a throwaway SQLite
+database (see conftest.py).
+
+Run with: python -m pytest test_data_migrations.py
+"""
+
+import pytest
+from sqlalchemy import update, text
+from app import app, db
+from models import User, Profile, Recommendation, MigrationCheckpoint
+from data_migrations import run_migration
+from fix_existing_tags import FixExistingTags
+from cleanup_duplicate_users import CleanupDuplicateUsers
+
+
+@pytest.fixture
+def seed_untagged(make_curator, make_recommendation):
+    """seed_untagged(count): one category of recommendations where even ids keep their tags. Returns the untagged ids"""
+
+    def seed(count):
+        category_id = make_curator("curator", category="Food").category_id
+        rec_ids = [make_recommendation(category_id, f"Rec {i}", tags={"collections": ["keep"]}) for i in range(count)]
+        untagged = [rec_id for rec_id in rec_ids if rec_id % 2]
+        with app.app_context():
+            db.session.execute(update(Recommendation).where(Recommendation.id.in_(untagged)).values(tags=None))
+            db.session.commit()
+        return untagged
+
+    return seed
+
+
+def untagged_count():
+    return len(db.session.execute(FixExistingTags().source()).all())
+
+
+def test_dry_run_changes_nothing(seed_untagged):
+    untagged = seed_untagged(10)
+    with app.app_context():
+        result = run_migration(FixExistingTags(), dry_run=True, batch_size=2, report=lambda line: None)
+
+        assert result == {"rows_seen": len(untagged), "rows_changed": len(untagged)}
+        assert untagged_count() == len(untagged)
+        assert db.session.get(MigrationCheckpoint, "fix_existing_tags") is None
+
+
+def test_batches_resume_from_checkpoint(seed_untagged):
+    untagged = seed_untagged(10)
+    lines = []
+    with app.app_context():
+        # Simulate a run that died after its first committed batch of two
+        db.session.add(MigrationCheckpoint(name="fix_existing_tags", last_key=untagged[1],
+                                           rows_seen=2, rows_changed=2))
+        db.session.execute(update(Recommendation).where(Recommendation.id.in_(untagged[:2])).values(tags={}))
+        db.session.commit()
+
+        result = run_migration(FixExistingTags(), batch_size=2, report=lines.append)
+
+        assert result == {"rows_seen": 3, "rows_changed": 3}
+        assert untagged_count() == 0
+        assert db.session.get(Recommendation, untagged[0]).tags == {}
+        assert db.session.get(Recommendation, untagged[0] + 1).tags == {"collections": ["keep"]}
+        checkpoint = db.session.get(MigrationCheckpoint, "fix_existing_tags")
+        assert checkpoint.completed_at is not None
+        assert (checkpoint.last_key, checkpoint.rows_seen) == (untagged[-1], 5)
+        assert any("rows/s, ETA" in line for line in lines)
+
+        # A completed migration doesn't run again unless restarted
+        assert run_migration(FixExistingTags(), report=lines.append)["rows_seen"] == 0
+
+
+@pytest.fixture
+def duplicate_users(empty_db):
+    """Users that predate the unique constraints: ann x3 (the middle one has a profile), bob x2 by email"""
+    with app.app_context():
+        # Duplicates can't be inserted into the current schema, so recreate users without its UNIQUE constraints
+        db.session.execute(text("DROP TABLE users"))
+        db.session.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL, "
+            "email VARCHAR(120) NOT NULL, password_hash VARCHAR(256) NOT NULL, is_admin BOOLEAN, "
+            "is_verified BOOLEAN, created_at DATETIME, updated_at DATETIME)"
+        ))
+        users = [User(username=username, email=email, password_hash="x") for username, email in [
+            ("ann", "ann@example.com"), ("ann", "ann@example.com"), ("ann", "ann2@example.com"),
+            ("bob", "bob@example.com"), ("bobby", "bob@example.com"), ("carol", "carol@example.com"),
+        ]]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add(Profile(name="Ann", bio="", slug="ann", user_id=users[1].id, profile_image="",
+                               instagram_handle="", tiktok_handle="", country="", city=""))
+        db.session.commit()
+        yield [user.id for user in users]
+        db.session.execute(text("DROP TABLE users"))
+        db.session.commit()
+        User.__table__.create(db.engine)
+
+
+def remaining_user_ids():
+    return sorted(db.session.scalars(db.select(User.id)))
+
+
+@pytest.mark.parametrize("keep, expected", [
+    ("oldest", [0, 1, 3, 5]),  # 1 is newer than 0 but has a profile
+    ("newest", [1, 2, 4, 5]),  # 1 is older than 2 but has a profile
+])
+def test_cleanup_duplicate_users_keeps_one_account(duplicate_users, keep, expected):
+    with app.app_context():
+        result = run_migration(CleanupDuplicateUsers(keep=keep), batch_size=2, report=lambda line: None)
+
+        assert result["rows_changed"] == 2
+        assert remaining_user_ids() == [duplicate_users[i] for i in expected]
+        assert db.session.get(MigrationCheckpoint, CleanupDuplicateUsers(keep=keep).name).completed_at
+
+
+def test_cleanup_duplicate_users_rejects_unknown_keep():
+    with pytest.raises(ValueError):
+        CleanupDuplicateUsers(keep="random")
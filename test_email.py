@@ -13,6 +13,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Send from this script instead of the app's background outbox thread
+os.environ.setdefault("EMAIL_WORKER", "off")
+
 # Add the current directory to Python path to import utils
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -57,8 +60,11 @@ def test_send_email():
     import string
     test_code = ''.join(random.choices(string.digits, k=6))
     
-    # Send email
-    success = send_verification_email(test_email, test_code, "Test User")
+    # Queue the email, then send it right away
+    from app import app
+    from email_outbox import drain_outbox
+    with app.app_context():
+        success = send_verification_email(test_email, test_code, "Test User") and drain_outbox() > 0
     
     if success:
         print(f"✅ Email sent successfully!")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Email outbox tests for CUR8tr
+
+Sends through a local aiosmtpd server instead of Gmail, against a throwaway
+SQLite database (see conftest.py).
+
+Requires aiosmtpd (pip install aiosmtpd).
+
+Run with: python -m pytest test_email_outbox.py
+"""
+
+import os
+import json
+import socket
+
+os.environ["SMTP_HOST"] = "127.0.0.1"
+
+from aiosmtpd.controller import Controller
+from app import app
+from models import OutboxEmail
+import email_outbox
+import tracing
+from email_outbox import SMTPConnection, enqueue_email, drain_outbox
+
+email_outbox.EMAIL_WORKER = "off"  # Tests drain the outbox themselves
+os.environ.pop("APP_PASSWORD", None)  # The stand-in server doesn't offer AUTH
+
+
+class RecordingHandler:
+    """Accepts mail, except 'bounce' recipients (550) and 'later' recipients (451)"""
+
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if any(address.startswith("later") for address in envelope.rcpt_tos):
+            return "451 4.3.0 Try again later"
+        self.messages.append(envelope)
+        self.peers.add(session.peer)
+        return "250 Message accepted"
+
+
+def start_smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller, handler, SMTPConnection("127.0.0.1", port, starttls=False)
+
+
+def point_default_connection_at(connection, monkeypatch):
+    """Make SMTPConnection() (as the app creates it) talk to the stand-in server"""
+    monkeypatch.setattr(email_outbox, "SMTP_HOST", connection.host)
+    monkeypatch.setattr(email_outbox, "SMTP_PORT", connection.port)
+    monkeypatch.setattr(email_outbox, "SMTP_STARTTLS", False)
+
+
+def test_batch_reuses_one_connection(empty_db):
+    controller, handler, connection = start_smtp_server()
+    try:
+        with app.app_context():
+            for i in range(5):
+                assert enqueue_email(f"user{i}@example.com", "Hello", f"Body {i}", "<p>Hi</p>")
+            assert drain_outbox(connection) == 5
+
+            emails = OutboxEmail.query.all()
+            assert {email.status for email in emails} == {"sent"}
+            assert all(email.text_body is None for email in emails)
+    finally:
+        connection.close()
+        controller.stop()
+
+    assert len(handler.messages) == 5
+    assert connection.connects == 1 and len(handler.peers) == 1
+    assert b"Body 3" in handler.messages[3].content
+
+
+def test_failures_are_retried_or_failed(empty_db):
+    controller, handler, connection = start_smtp_server()
+    try:
+        with app.app_context():
+            enqueue_email("later@example.com", "Hello", "Body")
+            enqueue_email("bounce@example.com", "Hello", "Body")
+            enqueue_email("ok@example.com", "Hello", "Body")
+            assert drain_outbox(connection) == 1
+
+            later, bounce, ok = OutboxEmail.query.order_by(OutboxEmail.id).all()
+            assert (later.status, later.attempts) == ("pending", 1)
+            assert later.next_attempt_at > later.created_at
+            assert "451" in later.last_error
+            assert (bounce.status, bounce.attempts) == ("failed", 1)
+            assert ok.status == "sent"
+            # Not due yet, so another drain sends nothing
+            assert drain_outbox(connection) == 0
+    finally:
+        connection.close()
+        controller.stop()
+
+
+def test_register_queues_instead_of_sending(empty_db):
+    app.config["WTF_CSRF_ENABLED"] = False
+    try:
+        response = app.test_client().post("/auth/register", data={
+            "username": "newcurator", "email": "new@example.com",
+            "password": "secret123", "password_confirm": "secret123",
+        })
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = True
+
+    assert response.status_code == 302
+    with app.app_context():
+        queued = OutboxEmail.query.one()
+        assert queued.to_address == "new@example.com"
+        assert queued.status == "pending"
+        assert "Verification Code" in queued.text_body
+
+
+def test_request_mode_sends_after_the_response(empty_db, monkeypatch):
+    controller, handler, connection = start_smtp_server()
+    monkeypatch.setattr(email_outbox, "EMAIL_WORKER", "request")
+    point_default_connection_at(connection, monkeypatch)
+    app.config["WTF_CSRF_ENABLED"] = False
+    try:
+        response = app.test_client().post("/auth/register", data={
+            "username": "newcurator", "email": "new@example.com",
+            "password": "secret123", "password_confirm": "secret123",
+        })
+        assert response.status_code == 302
+        response.close()
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = True
+        controller.stop()
+
+    assert len(handler.messages) == 1
+    with app.app_context():
+        assert OutboxEmail.query.one().status == "sent"
+
+
+def test_cron_endpoint_requires_the_secret_and_traces_sends(empty_db, monkeypatch, tmp_path):
+    controller, handler, connection = start_smtp_server()
+    point_default_connection_at(connection, monkeypatch)
+    monkeypatch.setattr(tracing, "TRACE_DIR", str(tmp_path))
+    monkeypatch.delenv("CRON_SECRET", raising=False)
+    client = app.test_client()
+    try:
+        with app.app_context():
+            enqueue_email("user@example.com", "Hello", "Body")
+        assert client.get("/internal/send-outbox").status_code == 404  # Fails closed without a secret
+
+        monkeypatch.setenv("CRON_SECRET", "cron-secret")
+        assert client.get("/internal/send-outbox", headers={"Authorization": "Bearer wrong"}).status_code == 404
+        assert client.get("/internal/send-outbox", headers={"Authorization": "Bearer crön"}).status_code == 404
+        assert handler.messages == []
+
+        app.debug = True  # Lets X-Trace force a trace
+        try:
+            response = client.get("/internal/send-outbox",
+                                  headers={"Authorization": "Bearer cron-secret", "X-Trace": "1"})
+        finally:
+            app.debug = False
+    finally:
+        controller.stop()
+
+    assert response.get_json() == {"sent": 1}
+    assert len(handler.messages) == 1
+    with open(tmp_path / os.listdir(tmp_path)[-1]) as f:
+        events = json.load(f)["traceEvents"]
+    assert any(event["name"] == "smtp.send" for event in events)
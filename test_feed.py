@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+"Following" feed tests for CUR8tr
+
+A small follow graph on the throwaway SQLite database (see conftest.py): alice
+is fanned out on write, bob has more followers than the (lowered) fan-out
+limit and is merged into feeds at read time.
+
+Run with: python -m pytest test_feed.py
+"""
+
+import base64
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import Recommendation, Follow, TimelineEntry
+import feed
+from feed import fan_out_recommendation
+
+START = datetime(2026, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def graph(make_curator, make_recommendation, monkeypatch):
+    """alice (one follower), bob (three followers), and the readers following them"""
+    monkeypatch.setattr(feed, "FANOUT_FOLLOWER_LIMIT", 2)
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    users = {name: make_curator(name, category="Food") for name in ("alice", "bob")}
+    users.update({name: make_curator(name) for name in ("reader", "fan", "lurker", "newcomer")})
+    follows = [("reader", "alice"), ("reader", "bob"), ("fan", "bob"), ("lurker", "bob")]
+    with app.app_context():
+        db.session.add_all([Follow(follower_id=users[follower].user_id, followed_id=users[followed].user_id)
+                            for follower, followed in follows])
+        db.session.commit()
+
+    def publish(author, minutes, title=None):
+        """Create a recommendation `minutes` after START and fan it out as the app does"""
+        rec_id = make_recommendation(users[author].category_id, title or f"{author} {minutes}",
+                                     created_at=START + timedelta(minutes=minutes))
+        with app.app_context():
+            written = fan_out_recommendation(db.session.get(Recommendation, rec_id))
+            db.session.commit()
+        return rec_id, written
+
+    return users, publish
+
+
+def timeline(user_id):
+    with app.app_context():
+        return [entry.recommendation_id for entry in TimelineEntry.query.filter_by(user_id=user_id)
+                .order_by(TimelineEntry.created_at.desc(), TimelineEntry.recommendation_id.desc())]
+
+
+def client_for(user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return client
+
+
+def feed_ids(client, limit=20):
+    """Every id in the feed, following next_cursor page by page"""
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/feed", query_string={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        data = response.get_json()
+        ids += [item["id"] for item in data["items"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_large_authors_are_pulled_at_read_time_and_merged(graph):
+    users, publish = graph
+    alice_old, written = publish("alice", 0)
+    assert written == 1
+    bob_mid, written = publish("bob", 5)
+    assert written == 0  # Over the limit: nothing fanned out
+    alice_new, _ = publish("alice", 10)
+    bob_new, _ = publish("bob", 15)
+
+    assert timeline(users["reader"].user_id) == [alice_new, alice_old]
+    assert timeline(users["fan"].user_id) == []
+
+    reader = client_for(users["reader"].user_id)
+    assert feed_ids(reader) == [bob_new, alice_new, bob_mid, alice_old]
+    assert feed_ids(reader, limit=1) == [bob_new, alice_new, bob_mid, alice_old]  # Keyset pages across both sources
+    assert feed_ids(client_for(users["fan"].user_id)) == [bob_new, bob_mid]
+    assert b"bob 15" in reader.get("/feed").data
+
+
+def test_recommendation_in_both_sources_is_shown_once(graph, monkeypatch):
+    users, publish = graph
+    rec_id, written = publish("alice", 0)
+    assert written == 1
+
+    # alice outgrows the limit after the fan-out, so the pull path finds the same row
+    monkeypatch.setattr(feed, "FANOUT_FOLLOWER_LIMIT", 0)
+    assert timeline(users["reader"].user_id) == [rec_id]
+    assert feed_ids(client_for(users["reader"].user_id)) == [rec_id]
+
+
+def test_timelines_keep_only_the_newest_entries(graph, monkeypatch):
+    users, publish = graph
+    monkeypatch.setattr(feed, "TIMELINE_MAX_LENGTH", 3)
+    rec_ids = [publish("alice", minutes)[0] for minutes in (0, 1, 2)]
+    tied, _ = publish("alice", 2, "alice tie")  # Same created_at as the newest; the higher id ranks first
+    newest, _ = publish("alice", 3)
+
+    assert timeline(users["reader"].user_id) == [newest, tied, rec_ids[2]]
+
+
+def test_follow_backfills_and_unfollow_removes(graph):
+    users, publish = graph
+    alice_ids = [publish("alice", minutes)[0] for minutes in (0, 1)]
+    newcomer = client_for(users["newcomer"].user_id)
+
+    assert newcomer.post(f"/follow/{users['alice'].user_id}", headers={"Referer": "/feed"}).status_code == 302
+    assert timeline(users["newcomer"].user_id) == alice_ids[::-1]
+    later, written = publish("alice", 2)
+    assert written == 2  # reader and newcomer
+    assert feed_ids(newcomer) == [later, *alice_ids[::-1]]
+
+    assert newcomer.post(f"/unfollow/{users['alice'].user_id}", headers={"Referer": "/feed"}).status_code == 302
+    assert timeline(users["newcomer"].user_id) == []
+    assert feed_ids(newcomer) == []
+    assert len(timeline(users["reader"].user_id)) == 3  # Other timelines are untouched
+
+
+@pytest.mark.parametrize("limit", [-5, -1, 0])
+def test_non_positive_limit_returns_one_item(graph, limit):
+    users, publish = graph
+    older, _ = publish("alice", 0)
+    newer, _ = publish("alice", 1)
+
+    response = client_for(users["reader"].user_id).get("/api/feed", query_string={"limit": limit})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [item["id"] for item in data["items"]] == [newer]
+    assert data["next_cursor"] is not None
+
+
+def test_feed_items_link_to_images_instead_of_embedding_them(graph, make_recommendation):
+    users, publish = graph
+    png = b"\x89PNG\r\n\x1a\n fake pixels"
+    with_image = make_recommendation(users["alice"].category_id, "Pictured", created_at=START,
+                                     image="data:image/png;base64," + base64.b64encode(png).decode())
+    with app.app_context():
+        fan_out_recommendation(db.session.get(Recommendation, with_image))
+        db.session.commit()
+    without_image, _ = publish("alice", 1)
+
+    reader = client_for(users["reader"].user_id)
+    items = {item["id"]: item for item in reader.get("/api/feed").get_json()["items"]}
+    assert "image" not in items[with_image]
+    assert items[without_image]["image_url"] is None
+
+    image = app.test_client().get(items[with_image]["image_url"])
+    assert image.status_code == 200
+    assert image.mimetype == "image/png" and image.data == png
+    assert app.test_client().get(items[with_image]["image_url"],
+                                 headers={"If-None-Match": image.headers["ETag"]}).status_code == 304
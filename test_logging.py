@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Logging pipeline tests for CUR8tr
+
+Run with: python -m pytest test_logging.py
+"""
+
+import json
+import queue
+import logging
+from logging_config import JsonFormatter, SamplingFilter, NonBlockingQueueHandler
+
+
+def make_record(name, level, msg, *args, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_drops_info_but_keeps_warnings():
+    sampler = SamplingFilter({"cur8tr.dashboard": "0", "cur8tr": "1"})
+
+    assert not sampler.filter(make_record("cur8tr.dashboard", logging.INFO, "hot"))
+    assert sampler.filter(make_record("cur8tr.dashboard", logging.WARNING, "important"))
+    assert sampler.filter(make_record("cur8tr.auth", logging.INFO, "kept"))
+    assert sampler.filter(make_record("werkzeug", logging.INFO, "unconfigured"))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    dropped = NonBlockingQueueHandler.dropped
+
+    handler.handle(make_record("cur8tr.auth", logging.INFO, "first %s", "login"))
+    handler.handle(make_record("cur8tr.auth", logging.INFO, "second"))
+
+    assert NonBlockingQueueHandler.dropped == dropped + 1
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "first login"
+
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record("cur8tr.auth", logging.INFO, "Login succeeded", user_id=7)))
+
+    assert entry["logger"] == "cur8tr.auth"
+    assert entry["msg"] == "Login succeeded"
+    assert entry["user_id"] == 7
+
+
+if __name__ == "__main__":
+    test_sampling_drops_info_but_keeps_warnings()
+    test_full_queue_drops_instead_of_blocking()
+    test_json_formatter_includes_extra_fields()
+    print("Logging pipeline OK")
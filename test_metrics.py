@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Metrics endpoint tests for CUR8tr
+
+Run with: python -m pytest test_metrics.py
+"""
+
+from app import app
+
+
+def sample_value(body, prefix):
+    """Value of the first exposition line starting with prefix"""
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_metrics_exposes_request_pool_and_template_stats(make_curator):
+    make_curator("curator")
+    client = app.test_client()
+    before = client.get("/metrics").get_data(as_text=True)
+    requests_before = sample_value(
+        before, 'cur8tr_http_requests_total{endpoint="view_profile",method="GET",status="200"}') or 0
+
+    assert client.get("/p/curator").status_code == 200
+    response = client.get("/metrics")
+    body = response.get_data(as_text=True)
+
+    assert response.content_type.startswith("text/plain")
+    assert sample_value(
+        body, 'cur8tr_http_requests_total{endpoint="view_profile",method="GET",status="200"}') == requests_before + 1
+    assert sample_value(
+        body, 'cur8tr_http_request_duration_seconds_count{endpoint="view_profile",method="GET"}') >= 1
+    assert sample_value(body, 'cur8tr_template_render_seconds_count{template="profile.html"}') >= 1
+    assert sample_value(body, 'cur8tr_db_pool_checkouts_total{bind="default"}') >= 1
+    assert sample_value(body, "cur8tr_http_requests_in_progress") == 1  # The scrape itself
+
+
+def test_metrics_need_the_token_and_fail_closed_in_production(monkeypatch):
+    client = app.test_client()
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3crét"}).status_code == 404  # Not a 500
+
+    monkeypatch.setenv("ENVIRONMENT", "production")
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    monkeypatch.delenv("METRICS_TOKEN")
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination tests for CUR8tr
+
+Covers cursor encoding, ties on created_at, and the JSON "load more"
+endpoints for comments and likers against the throwaway SQLite database (see
+conftest.py).
+
+Run with: python -m pytest test_pagination.py
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from app import app, db
+from models import Comment, Like
+from comments import get_comment_page, COMMENT_PAGE_SIZE
+from likes import LIKERS_PREVIEW_SIZE
+from pagination import encode_cursor, decode_cursor
+
+NOW = datetime(2026, 3, 1, 12, 0)
+RECOMMENDATION_URL = "/p/owner/food/{}"
+
+BAD_CURSORS = [
+    "garbage",
+    "_",
+    "2026-03-01T12:00:00_",
+    "2026-03-01T12:00:00_abc",
+    "not-a-date_5",
+    "2026-03-01T12:00:00+02:00_5",
+    "2026-03-01T12:00:00_" + "9" * 30,
+    "2026-03-01T12:00:00_-5",
+]
+
+
+@pytest.fixture
+def commented(make_curator, make_recommendation):
+    """A recommendation with COMMENT_PAGE_SIZE + 5 comments, the five newest sharing one created_at"""
+    owner = make_curator("owner", category="Food")
+    rec_id = make_recommendation(owner.category_id)
+    with app.app_context():
+        comments = [Comment(content=f"Comment {i}", user_id=owner.user_id, recommendation_id=rec_id,
+                            created_at=NOW - timedelta(minutes=i))
+                    for i in range(COMMENT_PAGE_SIZE, 0, -1)]
+        comments += [Comment(content=f"Tied {i}", user_id=owner.user_id, recommendation_id=rec_id, created_at=NOW)
+                     for i in range(5)]
+        db.session.add_all(comments)
+        db.session.commit()
+        newest_first = sorted(comments, key=lambda comment: (comment.created_at, comment.id), reverse=True)
+        return owner, rec_id, [comment.id for comment in newest_first]
+
+
+def test_cursor_round_trip():
+    row = SimpleNamespace(created_at=datetime(2026, 3, 1, 12, 0, 0, 123456), id=42)
+    assert decode_cursor(encode_cursor(row)) == (row.created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", BAD_CURSORS)
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_ties_on_created_at_page_by_id(commented):
+    _, rec_id, expected = commented
+    seen, cursor = [], None
+    with app.app_context():
+        while True:
+            rows, next_cursor = get_comment_page(rec_id, cursor and decode_cursor(cursor), limit=2)
+            seen += [row.id for row in rows]
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+    assert seen == expected  # Pages split inside the tied group without skipping or repeating
+
+
+def test_load_more_comments_endpoint(commented):
+    _, rec_id, expected = commented
+    client = app.test_client()
+    page = client.get(RECOMMENDATION_URL.format(rec_id))
+    assert page.status_code == 200
+    assert b"Comment 15<" in page.data and b"Comment 16<" not in page.data  # First page rendered inline
+
+    url = RECOMMENDATION_URL.format(rec_id) + "/comments"
+    first = client.get(url).get_json()
+    assert [comment["id"] for comment in first["comments"]] == expected[:COMMENT_PAGE_SIZE]
+    assert all(comment["delete_url"] is None for comment in first["comments"])  # Anonymous viewer
+
+    second = client.get(url, query_string={"cursor": first["next_cursor"]}).get_json()
+    assert [comment["id"] for comment in second["comments"]] == expected[COMMENT_PAGE_SIZE:]
+    assert second["next_cursor"] is None
+    assert second["comments"][-1]["author"] == "Owner"
+
+
+def test_likers_continue_from_the_preview(make_curator, make_recommendation):
+    owner = make_curator("owner", category="Food")
+    rec_id = make_recommendation(owner.category_id)
+    fans = [make_curator(f"fan{i:02d}") for i in range(LIKERS_PREVIEW_SIZE + 3)]
+    with app.app_context():
+        db.session.add_all([Like(user_id=fan.user_id, recommendation_id=rec_id, created_at=NOW) for fan in fans])
+        db.session.commit()
+    newest_first = [f"Fan{i:02d}" for i in reversed(range(len(fans)))]  # Tied times: the higher id first
+
+    client = app.test_client()
+    page = client.get(RECOMMENDATION_URL.format(rec_id)).get_data(as_text=True)
+    assert all(name in page for name in newest_first[:LIKERS_PREVIEW_SIZE])
+    assert newest_first[LIKERS_PREVIEW_SIZE] not in page
+    cursor = page.split('data-cursor="', 1)[1].split('"', 1)[0]
+
+    url = RECOMMENDATION_URL.format(rec_id) + "/likers"
+    rest = client.get(url, query_string={"cursor": cursor}).get_json()
+    assert [liker["name"] for liker in rest["likers"]] == newest_first[LIKERS_PREVIEW_SIZE:]
+    assert rest["total"] == len(fans) and rest["next_cursor"] is None
+
+    everyone = client.get(url).get_json()
+    assert [liker["name"] for liker in everyone["likers"]] == newest_first
+    assert everyone["likers"][0]["profile_slug"] == f"fan{len(fans) - 1:02d}"
+
+
+@pytest.mark.parametrize("endpoint", ["comments", "likers"])
+@pytest.mark.parametrize("cursor", BAD_CURSORS)
+def test_bad_cursor_is_400(commented, endpoint, cursor):
+    _, rec_id, _ = commented
+    response = app.test_client().get(RECOMMENDATION_URL.format(rec_id) + "/" + endpoint,
+                                     query_string={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
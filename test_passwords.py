@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Password hashing tests for CUR8tr
+
+Runs the app against a throwaway SQLite database (see conftest.py), hashing
+with cheap pbkdf2 parameters and no process pool so the tests stay fast.
+
+Run with: python -m pytest test_passwords.py
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from werkzeug.security import generate_password_hash
+from app import app, db
+from models import User
+import passwords
+
+passwords.PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+passwords.PASSWORD_POOL_WORKERS = 0
+
+
+@pytest.fixture
+def seed_user(empty_db):
+    """seed_user(password_hash) -> id of a verified user named hasher"""
+
+    def seed(password_hash):
+        with app.app_context():
+            user = User(username="hasher", email="hasher@example.com", password_hash=password_hash, is_verified=True)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    return seed
+
+
+def stored_hash(user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).password_hash
+
+
+def test_hash_and_verify():
+    stored = passwords.hash_password("correct horse")
+    assert stored.startswith("pbkdf2:sha256:1000$")
+    assert passwords.verify_password(stored, "correct horse") == (True, None)
+    assert passwords.verify_password(stored, "wrong") == (False, None)
+
+
+def test_login_rehashes_when_parameters_change(seed_user):
+    user_id = seed_user(generate_password_hash("correct horse", method="pbkdf2:sha256:2000"))
+    client = app.test_client()
+
+    response = client.post("/auth/login", data={"username": "hasher", "password": "wrong"})
+    assert response.status_code == 200
+    assert stored_hash(user_id).startswith("pbkdf2:sha256:2000$")
+
+    response = client.post("/auth/login", data={"username": "hasher", "password": "correct horse"})
+    assert response.status_code == 302
+    upgraded = stored_hash(user_id)
+    assert upgraded.startswith("pbkdf2:sha256:1000$")
+
+    # Already current: the next login leaves the hash alone
+    client.post("/auth/login", data={"username": "hasher", "password": "correct horse"})
+    assert stored_hash(user_id) == upgraded
+
+
+def test_saturated_hasher_returns_429(seed_user):
+    seed_user(passwords.hash_password("correct horse"))
+    client = app.test_client()
+
+    original_slots = passwords._slots
+    passwords._slots = threading.BoundedSemaphore(1)
+    passwords._slots.acquire()  # Another request holds the only slot
+    try:
+        response = client.post("/auth/login", data={"username": "hasher", "password": "correct horse"})
+    finally:
+        passwords._slots = original_slots
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes(monkeypatch):
+    pool = ThreadPoolExecutor(2)  # Stands in for the process pool; a free worker, but only one slot
+    monkeypatch.setattr(passwords, "PASSWORD_POOL_WORKERS", 1)
+    monkeypatch.setattr(passwords, "PASSWORD_POOL_TIMEOUT", 0.05)
+    monkeypatch.setattr(passwords, "_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(passwords, "_get_pool", lambda: pool)
+    release, finished = threading.Event(), threading.Event()
+
+    def slow_job():
+        release.wait(5)
+        finished.set()
+        return "slow"
+
+    try:
+        with pytest.raises(passwords.HasherBusy):
+            passwords._run(slow_job)
+        # The caller gave up, but the job still runs in the pool and holds the only slot
+        with pytest.raises(passwords.HasherBusy):
+            passwords._run(lambda: "fast")
+        assert not finished.is_set()
+
+        release.set()
+        pool.shutdown(wait=True)  # Let the job and its done callback finish
+        pool = ThreadPoolExecutor(2)
+        assert passwords._run(lambda: "fast") == "fast"
+    finally:
+        release.set()
+        pool.shutdown(wait=True)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Request profiler tests for CUR8tr
+
+Run with: python -m pytest test_profiler.py
+"""
+
+import os
+import json
+import tempfile
+import pytest
+from app import app
+import profiler
+
+profiler.PROFILE_DIR = os.path.join(tempfile.mkdtemp(), "profiles")
+
+
+@pytest.fixture
+def user_ids(make_curator):
+    """An admin and a regular user, both with public profiles"""
+    return {"admin": make_curator("admin", is_admin=True).user_id, "curator": make_curator("curator").user_id}
+
+
+def client_for(user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return client
+
+
+def test_admin_can_profile_a_request(user_ids):
+    response = client_for(user_ids["admin"]).get("/p/curator", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    name = response.headers["X-Profile-File"]
+    with open(os.path.join(profiler.PROFILE_DIR, f"{name}.speedscope.json")) as f:
+        document = json.load(f)
+    assert document["profiles"][0]["type"] == "sampled"
+    assert os.path.exists(os.path.join(profiler.PROFILE_DIR, f"{name}.collapsed.txt"))
+
+
+def test_profile_flag_is_ignored_for_other_users(user_ids):
+    response = client_for(user_ids["curator"]).get("/p/curator?_profile=1")
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response.headers
+    assert "X-Profile-File" not in app.test_client().get("/p/curator?_profile=1").headers
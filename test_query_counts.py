@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+SQL instrumentation tests for CUR8tr
+
+Runs the app against a throwaway SQLite database (see conftest.py), counts
+the SQL statements issued while serving requests and checks the slow-query log.
+
+Run with: python -m pytest test_query_counts.py
+"""
+
+import json
+import pytest
+from sqlalchemy import event
+from app import app, db
+from models import User, Profile, Category
+from query_stats import begin_request_stats, finish_request_stats, QUERY_REPEAT_THRESHOLD
+from slugs import allocate_slug
+from utils import create_default_categories
+import slow_queries
+
+# Dashboard statements for the fixture below: identity (user + profile), recent
+# recs, five stat counts, suggestions, and the welcome message's reads
+DASHBOARD_QUERY_BUDGET = 13
+
+
+@pytest.fixture
+def user_id(make_curator, make_recommendation):
+    """One verified user with a profile, a category and a recommendation"""
+    curator = make_curator("curator", category="Food")
+    make_recommendation(curator.category_id)
+    return curator.user_id
+
+
+def capture_statements(client, path):
+    """Issue a GET and return every SQL statement executed while serving it"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, statements
+
+
+def test_dashboard_loads_user_once(user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+
+    response, statements = capture_statements(client, "/dashboard")
+
+    assert response.status_code == 200
+    user_loads = [s for s in statements if "FROM users" in s]
+    profile_lookups = [s for s in statements if "WHERE profiles.user_id = " in s]
+    assert len(user_loads) == 1, user_loads
+    assert not profile_lookups, profile_lookups
+    assert len(statements) <= DASHBOARD_QUERY_BUDGET, statements
+
+
+def test_repeated_statement_is_flagged(user_id):
+    with app.test_request_context("/loop"):
+        begin_request_stats()
+        for user_id in range(1, QUERY_REPEAT_THRESHOLD + 2):
+            db.session.get(User, user_id)
+            db.session.expunge_all()
+        summary = finish_request_stats(200)
+
+    assert summary["query_count"] == QUERY_REPEAT_THRESHOLD + 1
+    assert len(summary["repeated"]) == 1
+    assert summary["repeated"][0]["count"] == QUERY_REPEAT_THRESHOLD + 1
+    assert "FROM users" in summary["repeated"][0]["statement"]
+
+
+def test_diag_queries_lists_recent_requests(user_id):
+    app.debug = True
+    try:
+        client = app.test_client()
+        client.get("/p/curator")
+        data = client.get("/diag/queries").get_json()
+    finally:
+        app.debug = False
+
+    latest = data["requests"][0]
+    assert latest["endpoint"] == "view_profile"
+    assert latest["query_count"] >= 2
+    assert app.test_client().get("/diag/queries").status_code == 404
+
+
+def test_slow_query_is_logged_with_plan(user_id):
+    threshold = slow_queries.SLOW_QUERY_MS
+    slow_queries.SLOW_QUERY_MS = 0.0  # Treat every statement as slow
+    slow_queries._last_explained.clear()
+    try:
+        with app.test_request_context("/slow-page"):
+            db.session.execute(db.select(User).where(User.username == "curator")).all()
+        slow_queries.flush_slow_query_log()
+    finally:
+        slow_queries.SLOW_QUERY_MS = threshold
+
+    with open(slow_queries.slow_query_log_file) as log_file:
+        records = [json.loads(line) for line in log_file]
+    record = next(r for r in records if "FROM users" in r["statement"] and r["route"])
+
+    assert record["route"]["path"] == "/slow-page"
+    assert record["parameters"] == ["<str len=7>"]
+    assert "users" in record["plan"]
+
+
+def test_slow_query_log_never_contains_string_parameters(user_id):
+    secret = "private-lookup@example.com"
+    threshold = slow_queries.SLOW_QUERY_MS
+    slow_queries.SLOW_QUERY_MS = 0.0
+    slow_queries._last_explained.clear()
+    try:
+        with app.test_request_context("/lookup"):
+            db.session.execute(db.select(User).where(User.email == secret, User.username != "x")).all()
+        slow_queries.flush_slow_query_log()
+    finally:
+        slow_queries.SLOW_QUERY_MS = threshold
+
+    with open(slow_queries.slow_query_log_file) as log_file:
+        log = log_file.read()
+    assert "/lookup" in log
+    assert secret not in log
+
+    # PostgreSQL's EXPLAIN ANALYZE echoes the bound values back into the plan
+    plan = ("Index Scan using users_email_key on users\n"
+            "  Index Cond: ((email)::text = 'private-lookup@example.com'::text)\n"
+            "  Filter: (((username)::text <> 'o''brien'::text) AND (bio ~~ E'%\\'%') AND (id > 5))")
+    assert slow_queries.redact_plan(plan) == (
+        "Index Scan using users_email_key on users\n"
+        "  Index Cond: ((email)::text = '<redacted>'::text)\n"
+        "  Filter: (((username)::text <> '<redacted>'::text) AND (bio ~~ '<redacted>') AND (id > 5))")
+
+
+def test_slug_allocation_is_one_query(user_id):
+    with app.app_context():
+        profile = Profile.query.filter_by(slug="curator").one()
+        for slug in ("food-1", "food-3", "food_2"):
+            db.session.add(Category(name=slug, description="", slug=slug, profile_id=profile.id))
+        db.session.commit()
+        scope = (Category.profile_id == profile.id,)
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            slug = allocate_slug(Category.slug, "food", scope=scope)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        assert slug == "food-2"
+        assert len(statements) == 1
+        assert allocate_slug(Profile.slug, "curator") == "curator-1"
+        assert allocate_slug(Profile.slug, "fresh") == "fresh"
+
+
+def test_default_categories_are_bulk_inserted(user_id):
+    with app.app_context():
+        profile = Profile.query.filter_by(slug="curator").one()
+        inserts = []
+        record = lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT") else None
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            created = create_default_categories(profile)
+            db.session.commit()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        assert "Food" not in created and len(created) == 5
+        assert len(inserts) == 1
+        assert create_default_categories(profile) == []
+        slugs = {c.slug for c in Category.query.filter_by(profile_id=profile.id)}
+        assert {"food", "books", "youtube-channels", "where-to-stay"} <= slugs
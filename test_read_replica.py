@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Read replica routing tests for CUR8tr
+
+Runs the app against two throwaway SQLite files, one as the primary and one as
+the replica. Both hold the same rows except the profile name, so each page
+shows which database served it.
+
+Run with: python -m pytest test_read_replica.py
+"""
+
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp()
+PRIMARY_URL = "sqlite:///" + os.path.join(_tmp, "primary.db")
+REPLICA_URL = "sqlite:///" + os.path.join(_tmp, "replica.db")
+
+from app import create_app, db
+from db_routing import REPLICA_BIND
+from models import User, Profile, Category, Recommendation, TrendingScore
+
+
+def make_app():
+    """Build an app whose default bind is the primary file and replica bind the replica file"""
+    saved = {key: os.environ.get(key) for key in ("DATABASE_URL", "DATABASE_REPLICA_URL")}
+    os.environ["DATABASE_URL"] = PRIMARY_URL
+    os.environ["DATABASE_REPLICA_URL"] = REPLICA_URL
+    try:
+        return create_app()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def seed(engine, profile_name):
+    """Write the shared fixture rows into one database"""
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": 1, "username": "curator", "email": "curator@example.com", "password_hash": "x",
+             "is_verified": True, "is_admin": False},
+        ])
+        conn.execute(Profile.__table__.insert(), [
+            {"id": 1, "name": profile_name, "bio": "", "slug": "curator", "user_id": 1, "profile_image": "",
+             "instagram_handle": "", "tiktok_handle": "", "country": "", "city": "", "is_public": True},
+        ])
+        conn.execute(Category.__table__.insert(), [
+            {"id": 1, "name": "Food", "description": "", "slug": "food", "profile_id": 1},
+        ])
+        conn.execute(Recommendation.__table__.insert(), [
+            {"id": 1, "title": "Pizza", "description": "", "url": "", "image": "", "rating": 5,
+             "cost_rating": "$", "location": "", "tags": {}, "category_id": 1},
+        ])
+
+
+def setup_app():
+    app = make_app()
+    with app.app_context():
+        seed(db.engines[None], "Primary Curator")
+        seed(db.engines[REPLICA_BIND], "Replica Curator")
+    return app
+
+
+def test_read_only_pages_use_replica():
+    app = setup_app()
+    client = app.test_client()
+
+    assert b"Replica Curator" in client.get("/p/curator").data
+    assert b"Replica Curator" in client.get("/p/curator/food/1").data
+
+    # The view counter is a write, so it lands on the primary
+    with app.app_context():
+        with db.engines[None].connect() as conn:
+            primary_scores = conn.execute(TrendingScore.__table__.select()).all()
+        with db.engines[REPLICA_BIND].connect() as conn:
+            replica_scores = conn.execute(TrendingScore.__table__.select()).all()
+    assert len(primary_scores) == 1
+    assert replica_scores == []
+
+
+def test_writer_reads_primary_after_write():
+    app = setup_app()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = 1
+
+    assert b"Replica Curator" in client.get("/p/curator").data
+
+    response = client.post("/p/curator/food/1/like")
+    assert response.get_json()["action"] == "liked"
+
+    assert b"Primary Curator" in client.get("/p/curator").data
+
+    # Other visitors keep reading from the replica
+    assert b"Replica Curator" in app.test_client().get("/p/curator").data
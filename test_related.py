@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Related recommendations index tests for CUR8tr
+
+Runs build_related_recommendations against a small corpus on the throwaway
+SQLite database (see conftest.py): a full build, then incremental runs after
+a like, an edit and a delete. Lists the change can't reach must keep their
+rows, and a delete must leave the same index as a fresh full build.
+Skipped without the job dependencies (requirements-jobs.txt).
+
+Run with: python -m pytest test_related.py
+"""
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from sqlalchemy import delete, or_
+from app import app, db
+from models import Recommendation, RelatedRecommendation, Like
+from build_related_recommendations import build_related_recommendations
+
+TOP_K = 2
+
+
+@pytest.fixture
+def corpus(make_curator, make_recommendation):
+    """Three pizza picks and two unrelated outdoor picks"""
+    curator = make_curator("curator", category="Food")
+
+    def make(title, tag):
+        return make_recommendation(curator.category_id, title, tags={"categories": [tag], "collections": []})
+
+    return curator, {
+        "oven": make("Neapolitan pizza oven", "pizza"),
+        "wood": make("Wood fired pizza", "pizza"),
+        "dough": make("Pizza dough recipe", "pizza"),
+        "boots": make("Hiking boots review", "outdoors"),
+        "shoes": make("Trail running shoes review", "outdoors"),
+    }
+
+
+def build(full=False):
+    build_related_recommendations(full=full, top_k=TOP_K)
+
+
+def neighbor_lists():
+    """{recommendation id: [related ids by rank]}"""
+    with app.app_context():
+        lists = {}
+        for row in RelatedRecommendation.query.order_by(RelatedRecommendation.recommendation_id,
+                                                        RelatedRecommendation.rank):
+            lists.setdefault(row.recommendation_id, []).append(row.related_id)
+        return lists
+
+
+def row_ids():
+    """{recommendation id: ids of its stored rows}, which change only when a list is rewritten"""
+    with app.app_context():
+        rows = {}
+        for row in RelatedRecommendation.query:
+            rows.setdefault(row.recommendation_id, set()).add(row.id)
+        return rows
+
+
+def assert_matches_full_build():
+    incremental = neighbor_lists()
+    build(full=True)
+    assert incremental == neighbor_lists()
+
+
+def test_full_build(corpus):
+    _, recs = corpus
+    build(full=True)
+
+    lists = neighbor_lists()
+    assert set(lists[recs["oven"]]) == {recs["wood"], recs["dough"]}
+    assert lists[recs["boots"]] == [recs["shoes"]]  # Nothing else scores above MIN_SCORE
+    assert lists[recs["shoes"]] == [recs["boots"]]
+    assert all(rec_id not in related for rec_id, related in lists.items())
+
+    # Nothing changed, so an incremental run rewrites nothing
+    before = row_ids()
+    build()
+    assert row_ids() == before
+
+
+def test_like_changes_nothing(corpus):
+    curator, recs = corpus
+    build(full=True)
+    before = row_ids()
+
+    with app.app_context():
+        db.session.add(Like(user_id=curator.user_id, recommendation_id=recs["oven"]))
+        db.session.commit()
+    build()
+
+    assert row_ids() == before  # Scores are content-based; likes don't touch the index
+
+
+def test_edit_refreshes_the_lists_it_reaches(corpus):
+    _, recs = corpus
+    build(full=True)
+    before = row_ids()
+
+    with app.app_context():
+        boots = db.session.get(Recommendation, recs["boots"])
+        boots.title = "Pizza oven for camping"
+        boots.tags = {"categories": ["pizza"], "collections": []}
+        db.session.commit()
+    build()
+
+    after = row_ids()
+    assert after[recs["boots"]].isdisjoint(before[recs["boots"]])
+    assert recs["shoes"] not in after  # Pointed at the edited row, which no longer scores
+    assert recs["boots"] in neighbor_lists()[recs["oven"]]  # Entered a full list
+
+
+@pytest.mark.parametrize("cascade", [False, True], ids=["dangling", "cascaded"])
+def test_delete_removes_stale_rows_and_refills_lists(corpus, cascade):
+    _, recs = corpus
+    build(full=True)
+    before = row_ids()
+
+    with app.app_context():
+        if cascade:
+            # What ON DELETE CASCADE does on Postgres; SQLite here doesn't enforce foreign keys
+            db.session.execute(delete(RelatedRecommendation).where(or_(
+                RelatedRecommendation.recommendation_id == recs["wood"],
+                RelatedRecommendation.related_id == recs["wood"],
+            )))
+        db.session.delete(db.session.get(Recommendation, recs["wood"]))
+        db.session.commit()
+    build()
+
+    lists = neighbor_lists()
+    assert recs["wood"] not in lists
+    assert all(recs["wood"] not in related for related in lists.values())
+    assert lists[recs["oven"]] == [recs["dough"]]
+    assert lists[recs["dough"]] == [recs["oven"]]
+    after = row_ids()
+    assert after[recs["boots"]] == before[recs["boots"]]  # Unrelated lists keep their rows
+    assert after[recs["shoes"]] == before[recs["shoes"]]
+    assert_matches_full_build()
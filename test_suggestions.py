@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+"Who to follow" scoring tests for CUR8tr
+
+Scores a small hand-checked graph with suggestions.compute_follow_suggestions,
+then runs the batch job against the throwaway SQLite database (see
+conftest.py). Skipped without the job dependencies (requirements-jobs.txt).
+
+Run with: python -m pytest test_suggestions.py
+"""
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from app import app, db
+from models import Follow, Like, FollowSuggestion
+from suggestions import compute_follow_suggestions
+from build_follow_suggestions import build_follow_suggestions
+
+# Sparse ids on purpose, to exercise the dense re-indexing.
+# 10 follows 20, 30 and 80, who all follow 40; 20 also follows 50 and 30 (already
+# followed by 10) and 30 follows 10 back. 10 and 50 both like 60, and 50 likes 70.
+FOLLOWS = [(10, 20), (10, 30), (10, 80), (20, 40), (20, 50), (20, 30), (30, 40), (30, 10), (80, 40), (40, 60)]
+LIKES = [(10, 60), (50, 60), (50, 70)]
+
+
+def suggestions_by_user(follows, likes, **options):
+    edges = [tuple(zip(*pairs)) or ((), ()) for pairs in (follows, likes)]
+    result = compute_follow_suggestions(*edges, **options)
+    by_user = {}
+    for user_id, suggested_id, score, rank in zip(*result):
+        by_user.setdefault(int(user_id), []).append((int(rank), int(suggested_id), round(float(score), 4)))
+    return by_user
+
+
+def test_known_ranking_excludes_self_and_followed():
+    ranked = suggestions_by_user(FOLLOWS, LIKES)
+
+    # 40: all three followed curators follow them (1.0); 70: co-liked with 60 (0.5 weight);
+    # 50: one of three paths (1/3). 10 (self) and 30 (followed) are reachable but never suggested.
+    assert ranked[10] == [(1, 40, 1.0), (2, 70, 0.5), (3, 50, 0.3333)]
+    assert ranked[50] == [(1, 60, 0.5), (2, 70, 0.5)]  # Ties rank by user id
+    for user_id, rows in ranked.items():
+        following = {followed for follower, followed in FOLLOWS if follower == user_id}
+        assert not {suggested for _, suggested, _ in rows} & (following | {user_id})
+
+
+def test_limit_and_chunking():
+    assert suggestions_by_user(FOLLOWS, LIKES, top_k=2)[10] == [(1, 40, 1.0), (2, 70, 0.5)]
+    assert suggestions_by_user(FOLLOWS, LIKES, chunk_size=1) == suggestions_by_user(FOLLOWS, LIKES)
+    assert suggestions_by_user([], []) == {}
+
+
+def test_build_replaces_the_table(make_curator, make_recommendation):
+    users = {name: make_curator(name, category="Food") for name in ("alice", "bob", "carol", "dave")}
+    rec_id = make_recommendation(users["dave"].category_id)
+    with app.app_context():
+        db.session.add_all([
+            Follow(follower_id=users["alice"].user_id, followed_id=users["bob"].user_id),
+            Follow(follower_id=users["bob"].user_id, followed_id=users["carol"].user_id),
+            Like(user_id=users["alice"].user_id, recommendation_id=rec_id),
+            FollowSuggestion(user_id=users["carol"].user_id, suggested_user_id=users["alice"].user_id,
+                             score=1.0, rank=1),  # Stale row from the previous snapshot
+        ])
+        db.session.commit()
+
+    build_follow_suggestions()
+
+    with app.app_context():
+        rows = FollowSuggestion.query.order_by(FollowSuggestion.user_id, FollowSuggestion.rank).all()
+        assert [(row.user_id, row.suggested_user_id, row.rank) for row in rows] == [
+            (users["alice"].user_id, users["carol"].user_id, 1),
+        ]
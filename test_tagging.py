@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tagging API tests for CUR8tr
+
+Runs the app against a throwaway SQLite database (see conftest.py).
+
+Run with: python -m pytest test_tagging.py
+"""
+
+import pytest
+from sqlalchemy import event, update
+from app import app, db
+from models import Recommendation
+
+
+@pytest.fixture
+def seed_recommendations(make_curator, make_recommendation):
+    """Two users with one category each; returns (owner id, owner rec ids, other user's rec id)"""
+    rec_ids = {}
+    for name in ("owner", "other"):
+        curator = make_curator(name, category="Food")
+        rec_ids[name] = (curator.user_id, [make_recommendation(curator.category_id, f"{name} {i}",
+                                                               tags={"collections": ["old"]}) for i in range(3)])
+    owner_id, owner_recs = rec_ids["owner"]
+    return owner_id, owner_recs, rec_ids["other"][1][0]
+
+
+def logged_in_client(user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return client
+
+
+def test_batch_applies_operations_in_one_update(seed_recommendations):
+    owner_id, (first, second, third), foreign = seed_recommendations
+    client = logged_in_client(owner_id)
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/api/recommendations/tags/batch", json={"operations": [
+            {"id": first, "action": "add", "tag": "Summer 2025"},
+            {"id": first, "action": "add", "tag": "Food", "type": "category"},
+            {"id": second, "action": "remove", "tag": "old"},
+            {"id": third, "action": "set", "categories": ["Apps"], "collections": []},
+            {"id": foreign, "action": "add", "tag": "mine"},
+            {"id": 999999, "action": "add", "tag": "missing"},
+            {"id": first, "action": "rename"},
+        ]})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    statuses = [result["status"] for result in data["results"]]
+    assert statuses == [200, 200, 200, 200, 403, 404, 400]
+    assert data["updated"] == 3
+    assert data["results"][1]["tags"] == ["food", "old", "summer-2025"]
+
+    updates = [s for s in statements if s.startswith("UPDATE recommendations")]
+    ownership = [s for s in statements if "FROM recommendations JOIN categories" in s]
+    assert len(updates) == 1 and len(ownership) == 1, statements
+
+    with app.app_context():
+        assert db.session.get(Recommendation, first).tags == {
+            "categories": ["food"], "collections": ["old", "summer-2025"]}
+        assert db.session.get(Recommendation, second).tags == {"collections": []}
+        assert db.session.get(Recommendation, third).tags == {"categories": ["apps"]}
+        assert db.session.get(Recommendation, foreign).tags == {"collections": ["old"]}
+
+
+def test_batch_rejects_bad_requests(seed_recommendations):
+    owner_id, _, _ = seed_recommendations
+    client = logged_in_client(owner_id)
+
+    assert client.post("/api/recommendations/tags/batch", json={}).status_code == 400
+    assert app.test_client().post("/api/recommendations/tags/batch",
+                                  json={"operations": []}).status_code == 401
+
+def test_single_tag_edits_do_not_overwrite_concurrent_changes(seed_recommendations):
+    owner_id, (first, _, _), _ = seed_recommendations
+    client = logged_in_client(owner_id)
+
+    with app.app_context():
+        stale = db.session.get(Recommendation, first)
+        assert stale.tags == {"collections": ["old"]}
+        # Another request adds a tag after this one loaded the row
+        with db.engine.begin() as conn:
+            conn.execute(update(Recommendation).where(Recommendation.id == first)
+                         .values(tags={"categories": ["food"], "collections": ["old", "theirs"]}))
+        assert stale.add_tag("Mine") == {"categories": ["food"], "collections": ["old", "theirs", "mine"]}
+        assert stale.remove_tag("old") == {"categories": ["food"], "collections": ["theirs", "mine"]}
+        db.session.commit()
+        assert db.session.get(Recommendation, first).tags == {"categories": ["food"], "collections": ["theirs", "mine"]}
+
+    response = client.post(f"/api/recommendations/{first}/tags", json={"tag": "Food", "type": "category"})
+    assert response.get_json()["tags"] == ["food", "theirs", "mine"]
+    response = client.delete(f"/api/recommendations/{first}/tags", json={"tag": "food"})
+    assert response.get_json()["tags"] == ["theirs", "mine"]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Request tracing tests for CUR8tr
+
+Run with: python -m pytest test_tracing.py
+"""
+
+import os
+import json
+import tempfile
+from app import app
+import tracing
+
+tracing.TRACE_DIR = os.path.join(tempfile.mkdtemp(), "traces")
+
+
+def trace_files():
+    if not os.path.isdir(tracing.TRACE_DIR):
+        return []
+    return sorted(os.listdir(tracing.TRACE_DIR))
+
+
+def test_forced_trace_records_session_sql_and_template_spans(make_curator):
+    make_curator("curator")
+    app.debug = True
+    try:
+        response = app.test_client().get("/p/curator", headers={"X-Trace": "1"})
+    finally:
+        app.debug = False
+    assert response.status_code == 200
+
+    with open(os.path.join(tracing.TRACE_DIR, trace_files()[-1])) as f:
+        document = json.load(f)
+    categories = {event["cat"] for event in document["traceEvents"]}
+    assert {"request", "session", "sql", "jinja"} <= categories
+    assert all(event["ph"] == "X" for event in document["traceEvents"])
+    assert document["otherData"]["endpoint"] == "view_profile"
+
+
+def test_untraced_and_anonymous_requests_write_nothing(make_curator):
+    make_curator("curator")
+    before = trace_files()
+    client = app.test_client()
+    client.get("/p/curator")
+    client.get("/p/curator", headers={"X-Trace": "1"})  # Not an admin, not debug
+    assert trace_files() == before
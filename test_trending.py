@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Trending score tests for CUR8tr
+
+Records events at fixed times against the throwaway SQLite database (see
+conftest.py) and checks the decayed scores, the resulting order, and that
+concurrent first events on a recommendation both land.
+
+Run with: python -m pytest test_trending.py
+"""
+
+import threading
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import Recommendation, TrendingScore
+from trending import record_event, order_by_trending, get_trending, trending_key, HALF_LIFE_HOURS
+
+NOW = datetime(2026, 3, 1, 12, 0)
+HALF_LIFE = timedelta(hours=HALF_LIFE_HOURS)
+
+
+@pytest.fixture
+def rec_ids(make_curator, make_recommendation):
+    """Four recommendations in one public category"""
+    category_id = make_curator("curator", category="Food").category_id
+    return [make_recommendation(category_id, f"Pick {i}") for i in range(4)]
+
+
+def record(rec_id, kind, when):
+    with app.app_context():
+        record_event(rec_id, kind, when)
+        db.session.commit()
+
+
+def stored(rec_id):
+    with app.app_context():
+        stats = db.session.get(TrendingScore, rec_id)
+        return stats.score, stats.scored_at, stats.trending_key
+
+
+def test_score_decays_with_half_life(rec_ids):
+    rec_id = rec_ids[0]
+    record(rec_id, "like", NOW)
+    assert stored(rec_id) == (3.0, NOW, trending_key(3.0, NOW))
+
+    later = NOW + HALF_LIFE
+    record(rec_id, "view", later)
+    score, scored_at, key = stored(rec_id)
+    assert score == pytest.approx(2.5)  # 3 halved, plus 1
+    assert scored_at == later
+    assert key == pytest.approx(trending_key(2.5, later))
+
+    # Unliking can't push the score below zero, and a zero score has no key
+    record(rec_id, "unlike", later)
+    assert stored(rec_id) == (0.0, later, None)
+    record(rec_id, "view", later)
+    assert stored(rec_id)[0] == pytest.approx(1.0)
+
+    # Long-decayed scores count as zero instead of underflowing
+    record(rec_id, "view", later + HALF_LIFE * 2000)
+    assert stored(rec_id)[0] == pytest.approx(1.0)
+
+
+def test_order_follows_decayed_score(rec_ids):
+    commented, viewed, liked, untouched = rec_ids
+    record(commented, "comment", NOW - 2 * HALF_LIFE)  # 1.25 now
+    record(viewed, "view", NOW)                          # 1.0
+    record(liked, "like", NOW - 4 * HALF_LIFE)          # 0.1875
+
+    with app.app_context():
+        ordered = [rec.id for rec in order_by_trending(db.session.query(Recommendation)).all()]
+        assert ordered == [commented, viewed, liked, untouched]
+        assert [rec.id for rec in get_trending()] == [commented, viewed, liked]
+
+
+def test_concurrent_first_events_both_count(rec_ids):
+    rec_id = rec_ids[0]
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def view():
+        try:
+            with app.app_context():
+                barrier.wait()
+                record_event(rec_id, "view", NOW)
+                db.session.commit()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=view) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert stored(rec_id)[0] == pytest.approx(2.0)
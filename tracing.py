@@ -0,0 +1,215 @@
+"""
+Request timeline tracing for CUR8tr - spans exported as Chrome trace-event JSON
+
+A sampled request records one complete ("X") event per span: the request
+itself, session cookie load/save, each SQL statement, Jinja renders and
+whatever code wraps itself in `span()` (safe_image placeholders, QR codes,
+SMTP). The file written to TRACE_DIR opens directly in https://ui.perfetto.dev
+or chrome://tracing, no collector needed.
+
+Sampling: TRACE_SAMPLE_RATE (0.0-1.0, default 0) of requests at random, plus
+any request with `X-Trace: 1` from an admin (or from anyone in debug mode).
+When a request is not sampled, span() is a dict lookup on flask.g.
+
+Usage:
+    with span("smtp.send", "smtp"):
+        ...
+
+    @traced("qr.generate", "image")
+    def generate_qr_code(...):
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request, has_app_context, has_request_context, before_render_template, template_rendered
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from query_stats import normalize_statement
+
+TRACE_DIR = os.environ.get("TRACE_DIR", "traces")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0))
+TRACE_HEADER = "X-Trace"
+
+
+class Trace:
+    """Span collector for one request"""
+
+    def __init__(self, forced):
+        self.forced = forced
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.origin = time.perf_counter()
+        self.events = []
+        self._open = []
+
+    def _now_us(self):
+        return (time.perf_counter() - self.origin) * 1_000_000
+
+    def begin(self, name, category, args=None):
+        self._open.append((name, category, self._now_us(), args or {}))
+
+    def end(self, **extra_args):
+        if not self._open:
+            return
+        name, category, started, args = self._open.pop()
+        args.update(extra_args)
+        self.events.append({
+            "name": name, "cat": category, "ph": "X",
+            "ts": round(started, 1), "dur": round(self._now_us() - started, 1),
+            "pid": self.pid, "tid": self.tid, "args": args,
+        })
+
+    def to_chrome_trace(self, metadata):
+        return {"traceEvents": self.events, "displayTimeUnit": "ms", "otherData": metadata}
+
+
+def current_trace():
+    """The active Trace for this request, or None"""
+    if not has_app_context():
+        return None
+    return g.get("_trace")
+
+
+@contextmanager
+def span(name, category="app", **args):
+    """Record the wrapped block as a span when the current request is traced"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    trace.begin(name, category, args)
+    try:
+        yield
+    finally:
+        trace.end()
+
+
+def traced(name, category="app"):
+    """Decorator form of span()"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with span(name, category):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def _start_trace():
+    """Decide sampling at the start of a request (called when the session is opened)"""
+    forced = request.headers.get(TRACE_HEADER) == "1"
+    if forced or (TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE):
+        g._trace = Trace(forced)
+        g._trace.begin(f"{request.method} {request.path}", "request")
+
+
+class TracedSessionInterface(SecureCookieSessionInterface):
+    """Cookie sessions that start the trace and time cookie load/save"""
+
+    def open_session(self, app, request):
+        _start_trace()
+        with span("session.open", "session"):
+            return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with span("session.save", "session"):
+            return super().save_session(app, session, response)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace()
+    if trace is not None:
+        trace.begin(normalize_statement(statement)[:80], "sql", {
+            "statement": normalize_statement(statement),
+            "database": conn.engine.url.database,
+        })
+        conn.info["traced_statement"] = True
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if conn.info.pop("traced_statement", False):
+        trace = current_trace()
+        if trace is not None:
+            trace.end(rowcount=cursor.rowcount)
+
+
+def _handle_error(context):
+    conn = context.connection
+    if conn is not None and conn.info.pop("traced_statement", False):
+        trace = current_trace()
+        if trace is not None:
+            trace.end(error=type(context.original_exception).__name__)
+
+
+def _write_trace(trace, status):
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    endpoint = (request.endpoint or "none").replace(".", "_")
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{endpoint}.trace.json"
+    with open(os.path.join(TRACE_DIR, name), "w") as f:
+        json.dump(trace.to_chrome_trace({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": status,
+        }), f)
+    return name
+
+
+def init_tracing(app):
+    """Install the traced session interface, SQL/Jinja listeners and the trace writer"""
+    app.session_interface = TracedSessionInterface()
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    def begin_template(sender, template, context, **extra):
+        trace = current_trace()
+        if trace is not None:
+            trace.begin(f"render {template.name}", "jinja")
+
+    def end_template(sender, template, context, **extra):
+        trace = current_trace()
+        if trace is not None:
+            trace.end()
+
+    before_render_template.connect(begin_template, app, weak=False)
+    template_rendered.connect(end_template, app, weak=False)
+
+    @app.before_request
+    def drop_unauthorized_forced_trace():
+        trace = g.get("_trace")
+        if trace is None or not trace.forced or app.debug:
+            return
+        from identity import get_current_user
+        user = get_current_user()
+        if user is None or not user.is_admin:
+            g._trace = None
+
+    @app.after_request
+    def remember_status(response):
+        if g.get("_trace") is not None:
+            g._trace_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def write_trace(exc):
+        trace = g.pop("_trace", None)
+        if trace is None or not has_request_context():
+            return
+        while trace._open:
+            trace.end()
+        try:
+            name = _write_trace(trace, g.get("_trace_status", 500 if exc else None))
+            logging.info(f"Request trace written: {name} ({len(trace.events)} spans)")
+        except OSError as e:
+            logging.warning(f"Could not write request trace: {e}")
@@ -0,0 +1,143 @@
+"""
+Trending recommendations for CUR8tr - incrementally updated time-decayed scores
+
+Every view, like and comment adds a weight to the recommendation's score, and
+the score decays exponentially with a configurable half-life. Instead of
+re-decaying every row over time, each row stores
+
+    trending_key = ln(score) + (scored_at - EPOCH) / TAU
+
+which orders recommendations by their decayed score at *any* later moment,
+because all scores decay by the same factor. The key is indexed, so
+/trending and "sort by popular" are a plain ORDER BY ... LIMIT.
+
+The key also carries the whole score (score at `now` is
+exp(trending_key - (now - EPOCH) / TAU)), so recording an event is a single
+upsert that the database evaluates against the stored row; no read, no lock.
+SQLite needs its math functions (exp, ln), which builds since 3.35 include.
+"""
+
+import os
+import math
+from datetime import datetime
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import insert as postgres_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from models import Recommendation, Category, Profile, Like, Comment, TrendingScore
+
+HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 48))
+TAU_SECONDS = HALF_LIFE_HOURS * 3600 / math.log(2)
+EPOCH = datetime(2024, 1, 1)
+
+# Below this, exp() underflows a double (and PostgreSQL raises instead of returning 0)
+MIN_EXPONENT = -700.0
+
+EVENT_WEIGHTS = {
+    'view': 1.0,
+    'like': 3.0,
+    'unlike': -3.0,
+    'comment': 5.0,
+}
+
+
+def decayed(score, scored_at, now):
+    """Decay a score from scored_at to now"""
+    return score * math.exp(-(now - scored_at).total_seconds() / TAU_SECONDS)
+
+
+def trending_key(score, scored_at):
+    """Time-independent sort key for a score observed at scored_at"""
+    if score <= 0:
+        return None
+    return math.log(score) + (scored_at - EPOCH).total_seconds() / TAU_SECONDS
+
+
+def record_event(recommendation_id, kind, when=None):
+    """
+    Fold one engagement event into a recommendation's trending score
+
+    One INSERT ... ON CONFLICT (recommendation_id) DO UPDATE: the database
+    decays the stored score to `now` and adds the weight, so concurrent events
+    on the same recommendation (including two first events) neither race nor
+    hold a lock beyond the statement's own row update. The caller owns the
+    transaction.
+    """
+    now = when or datetime.utcnow()
+    weight = EVENT_WEIGHTS[kind]
+    elapsed = (now - EPOCH).total_seconds() / TAU_SECONDS
+    table = TrendingScore.__table__
+
+    # Stored score decayed to now. A NULL key means the score was zero, and
+    # PostgreSQL raises on exp() underflow, so long-decayed scores count as zero too
+    exponent = table.c.trending_key - elapsed
+    score = case((exponent > MIN_EXPONENT, func.exp(exponent)), else_=0.0) + weight
+
+    insert = postgres_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    statement = insert(table).values(
+        recommendation_id=recommendation_id,
+        score=max(weight, 0.0),
+        scored_at=now,
+        trending_key=trending_key(weight, now),
+    ).on_conflict_do_update(
+        index_elements=[table.c.recommendation_id],
+        set_={
+            'score': case((score > 0, score), else_=0.0),
+            'scored_at': now,
+            'trending_key': case((score > 0, func.ln(score) + elapsed), else_=None),
+        },
+    )
+    db.session.execute(statement)
+
+
+def order_by_trending(query):
+    """Order a Recommendation query by trending score, unscored rows last"""
+    return query.outerjoin(
+        TrendingScore, TrendingScore.recommendation_id == Recommendation.id
+    ).order_by(
+        TrendingScore.trending_key.desc().nullslast(),
+        Recommendation.created_at.desc()
+    )
+
+
+def get_trending(limit=24):
+    """Top public recommendations by current trending score"""
+    query = db.session.query(Recommendation).join(Category).join(Profile).join(
+        TrendingScore, TrendingScore.recommendation_id == Recommendation.id
+    ).filter(
+        Profile.is_public == True,
+        TrendingScore.trending_key.isnot(None)
+    ).options(
+        joinedload(Recommendation.category).joinedload(Category.profile)
+    )
+    return query.order_by(TrendingScore.trending_key.desc()).limit(limit).all()
+
+
+def rebuild_trending_scores():
+    """Recompute every score from stored likes and comments (views are not persisted)"""
+    now = datetime.utcnow()
+    scores = {}
+    events = [(rec_id, created_at, 'like') for rec_id, created_at in
+              db.session.query(Like.recommendation_id, Like.created_at)]
+    events += [(rec_id, created_at, 'comment') for rec_id, created_at in
+               db.session.query(Comment.recommendation_id, Comment.created_at)]
+
+    for rec_id, created_at, kind in events:
+        scores[rec_id] = scores.get(rec_id, 0.0) + decayed(EVENT_WEIGHTS[kind], created_at or now, now)
+
+    db.session.query(TrendingScore).delete()
+    db.session.add_all([
+        TrendingScore(recommendation_id=rec_id, score=score, scored_at=now,
+                      trending_key=trending_key(score, now))
+        for rec_id, score in scores.items()
+    ])
+    db.session.commit()
+    return len(scores)
+
+
+if __name__ == "__main__":
+    from app import app
+    with app.app_context():
+        print("Rebuilding trending scores from likes and comments...")
+        print(f"Scored {rebuild_trending_scores()} recommendations")
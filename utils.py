@@ -1,9 +1,9 @@
 import os
 import re
-import qrcode
+import hmac
 from io import BytesIO
-from PIL import Image
 import unicodedata
+from tracing import traced
 
 def slugify(text):
     """
@@ -19,11 +19,14 @@ def slugify(text):
     
     return text
 
+@traced("qr.generate", "image")
 def generate_qr_code(url, filename_prefix):
     """
     Generate QR code for the given URL and save it to static/qrcodes/
     Returns the filename of the generated QR code
     """
+    import qrcode  # Deferred: pulls in PIL, only the share page needs it
+    
     # Create qrcodes directory if it doesn't exist
     qr_dir = os.path.join('static', 'qrcodes')
     os.makedirs(qr_dir, exist_ok=True)
@@ -50,31 +53,14 @@ def generate_qr_code(url, filename_prefix):
 
 def send_verification_email(email, code, username=None):
     """
-    Send verification email using Gmail SMTP
+    Queue the verification email for the background sender (see email_outbox.py)
+    Returns False if email isn't configured or the message couldn't be queued
     """
-    import smtplib
-    import os
     import logging
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
+    from email_outbox import enqueue_email
     
     try:
-        # Get email configuration from environment variables
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        app_email = os.environ.get('APP_EMAIL')
-        app_password = os.environ.get('APP_PASSWORD')  # App-specific password
-        admin_email = os.environ.get('ADMIN_EMAIL')
-        
-        if not app_email or not app_password:
-            logging.error("Email configuration missing. Please set APP_EMAIL and APP_PASSWORD environment variables.")
-            return False
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = "Verify your Cur8tr account"
-        msg['From'] = "support@cur8tr.space"
-        msg['To'] = email
+        subject = "Verify your Cur8tr account"
         
         # Create HTML email body
         html_body = f"""
@@ -158,24 +144,10 @@ def send_verification_email(email, code, username=None):
         The Cur8tr Team
         """
         
-        # Attach parts
-        part1 = MIMEText(text_body, 'plain')
-        part2 = MIMEText(html_body, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(app_email, app_password)
-        server.send_message(msg)
-        server.quit()
-        
-        logging.info(f"Verification email sent successfully to {email}")
-        return True
+        return enqueue_email(email, subject, text_body, html_body)
         
     except Exception as e:
-        logging.error(f"Failed to send verification email to {email}: {str(e)}")
+        logging.error(f"Failed to queue verification email to {email}: {str(e)}")
         return False
 
 def format_url(url):
@@ -219,12 +191,30 @@ def get_domain_from_url(url):
     except:
         return url
 
+def bearer_token_matches(authorization, token):
+    """
+    Constant-time check of an Authorization header against "Bearer <token>"
+    """
+    # compare_digest raises TypeError on str with non-ASCII characters, which any
+    # client can put in a header, so compare bytes
+    expected = f"Bearer {token}".encode('utf-8')
+    return hmac.compare_digest((authorization or "").encode('utf-8', 'replace'), expected)
+
 def create_default_categories(profile):
     """
     Create default categories for a new profile
+
+    Missing defaults are inserted with one multi-row INSERT. Slugs are picked
+    from the profile's existing slugs (one query); if a concurrent request
+    takes one first, the unique constraint rejects the batch and it is retried.
+
+    Returns the names of the categories that were created
     """
+    from sqlalchemy import select, insert
+    from sqlalchemy.exc import IntegrityError
     from models import Category
     from app import db
+    from slugs import next_free_slug, SLUG_RETRY_ATTEMPTS
     
     default_categories = [
         ("Books", "Your favorite books and reading recommendations"),
@@ -235,32 +225,30 @@ def create_default_categories(profile):
         ("Products", "Products and services you love")
     ]
     
-    created_categories = []
-    
-    # Get existing category names to avoid duplicates
-    existing_categories = Category.query.filter_by(profile_id=profile.id).all()
-    existing_names = [cat.name for cat in existing_categories]
-    
-    for name, description in default_categories:
-        if name not in existing_names:  # Only create if it doesn't exist
-            slug = slugify(name)
-            # Ensure unique slug within profile
-            counter = 1
-            original_slug = slug
-            while Category.query.filter_by(profile_id=profile.id, slug=slug).first():
-                slug = f"{original_slug}-{counter}"
-                counter += 1
-            
-            category = Category(
-                name=name,
-                description=description,
-                slug=slug,
-                profile_id=profile.id
-            )
-            db.session.add(category)
-            created_categories.append(category)
-    
-    return created_categories
+    for attempt in range(SLUG_RETRY_ATTEMPTS):
+        existing = db.session.execute(
+            select(Category.name, Category.slug).where(Category.profile_id == profile.id)
+        ).all()
+        existing_names = {name for name, _ in existing}
+        taken = {slug for _, slug in existing}
+        
+        rows = []
+        for name, description in default_categories:
+            if name in existing_names:  # Only create if it doesn't exist
+                continue
+            slug = next_free_slug(slugify(name), taken)
+            taken.add(slug)
+            rows.append({'name': name, 'description': description, 'slug': slug, 'profile_id': profile.id})
+        
+        if not rows:
+            return []
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Category).values(rows))
+            return [row['name'] for row in rows]
+        except IntegrityError:
+            if attempt == SLUG_RETRY_ATTEMPTS - 1:
+                raise
 
 def get_personalized_welcome_message(user, profile):
     """
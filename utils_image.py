@@ -1,12 +1,16 @@
 """
 Enhanced image utilities for CUR8tr with robust placeholder generation
+
+PIL is imported inside the functions that use it so importing this module
+(and therefore the app) stays cheap on cold start.
 """
 
 import base64
 import hashlib
-from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
+from tracing import traced
 
+@traced("placeholder.render", "image")
 def create_modern_placeholder(title, size=(400, 300), style='gradient'):
     """
     Create a beautiful modern placeholder image as base64 data URL
@@ -19,6 +23,8 @@ def create_modern_placeholder(title, size=(400, 300), style='gradient'):
     Returns:
         Base64 data URL string
     """
+    from PIL import Image, ImageDraw, ImageFont
+
     # Generate consistent color based on title
     title_hash = hashlib.md5(title.encode()).hexdigest()
     hue = int(title_hash[:2], 16)
@@ -136,6 +142,8 @@ def validate_image_data_url(data_url):
     if not data_url or not data_url.startswith('data:image/'):
         return False
     
+    from PIL import Image
+    
     try:
         # Extract base64 data
         if ';base64,' not in data_url: